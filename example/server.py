@@ -5,7 +5,9 @@ from cloudmesh.common.util import readfile
 from cloudmesh.common.util import writefile
 import oyaml as yaml
 import os
+from cloudmesh.common.util import path_expand
 from cloudmesh.inventory.__version__ import version
+from cloudmesh.inventory.inventory import Inventory
 """
 pip install fastapi
 pip install uvicorn
@@ -41,6 +43,7 @@ d2:
 """
 
 data = {}
+inventory = None
 
 app = FastAPI(
     title="Cloudmesh Inventory API",
@@ -49,14 +52,25 @@ app = FastAPI(
 )
 
 
+def changed(inventory, names):
+    # called by the watcher when the inventory file was changed, for
+    # example with cms inventory set
+    for name in names:
+        if name in inventory.data:
+            data[name] = dict(inventory.data[name])
+        else:
+            data.pop(name, None)
+
+
 def load(filename=None):
-    global data
-    filename = filename or "~/.cloudmesh/inventory.yaml"
+    global data, inventory
+    filename = path_expand(filename or "~/.cloudmesh/inventory.yaml")
     if os.path.exists(filename):
-        content = readfile(filename)
+        inventory = Inventory(filename)
+        data = {name: dict(entry) for name, entry in inventory.data.items()}
+        inventory.watch(changed)
     else:
-        content = sample
-    data = yaml.safe_load(content)
+        data = yaml.safe_load(sample)
 
 
 def save(filename=None):
@@ -72,6 +86,8 @@ async def startup_event():
 
 @app.on_event("shutdown")
 async def startup_event():
+    if inventory is not None:
+        inventory.unwatch()
     save()
 
 # this is not yet used ....
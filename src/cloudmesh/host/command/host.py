@@ -1,27 +1,14 @@
 import os
 import platform
-
-from pprint import pprint
-from getpass import getpass
 import textwrap
 
-from cloudmesh.common.Host import Host
-from cloudmesh.common.Printer import Printer
-from cloudmesh.common.Shell import Shell
 from cloudmesh.common.console import Console
-from cloudmesh.common.debug import VERBOSE
-from cloudmesh.common.parameter import Parameter
-from cloudmesh.common.util import banner
-from cloudmesh.common.util import path_expand
-from cloudmesh.common.util import yn_choice
-from cloudmesh.common.util import readfile
-from cloudmesh.common.util import writefile
-from cloudmesh.common.util import str_bool
 from cloudmesh.shell.command import PluginCommand
 from cloudmesh.shell.command import command
 from cloudmesh.shell.command import map_parameters
-from cloudmesh.host.HostCreate import HostCreate
-from cloudmesh.common.sudo import Sudo
+
+# cms loads every plugin on startup, so the modules needed to run the
+# command are imported when it runs, see tests/test_import_time.py
 
 
 class HostCommand(PluginCommand):
@@ -232,8 +219,20 @@ class HostCommand(PluginCommand):
                 Example:
                     cms host config proxy pi@red.lcaol red00[1-2]
         """
+        from cloudmesh.common.Host import Host
+        from cloudmesh.common.Shell import Shell
+        from cloudmesh.common.debug import VERBOSE
+        from cloudmesh.common.parameter import Parameter
+        from cloudmesh.common.util import banner
+        from cloudmesh.common.util import path_expand
+        from cloudmesh.common.util import yn_choice
+        from cloudmesh.common.util import readfile
+        from cloudmesh.common.util import writefile
+        from cloudmesh.common.util import str_bool
 
         def _print(results):
+            from cloudmesh.common.Printer import Printer
+            from pprint import pprint
             arguments.output = arguments.output or 'table'
 
             if arguments.output in ['table', 'yaml']:
@@ -244,6 +243,8 @@ class HostCommand(PluginCommand):
                 pprint(results)
 
         def _print_pis(results):
+            from cloudmesh.common.Printer import Printer
+            from pprint import pprint
             arguments.output = arguments.output or 'table'
 
             if arguments.output in ['table', 'yaml']:
@@ -339,6 +340,7 @@ class HostCommand(PluginCommand):
 
         elif arguments.setup:
 
+            from cloudmesh.host.HostCreate import HostCreate
             HostCreate.setup(workers=arguments.WORKERS, laptop=arguments.LAPTOP)
 
         elif arguments.scp and not arguments.key:
@@ -736,6 +738,7 @@ class HostCommand(PluginCommand):
 
         elif arguments.tunnel and arguments.create:
 
+            from cloudmesh.common.sudo import Sudo
             wlan_ip = Shell.run("hostname -I | awk '{print $2}'").strip()
             print(f'\nUsing wlan0 IP = {wlan_ip}')
             hostname = Shell.run("hostname").strip()
@@ -850,6 +853,7 @@ class HostCommand(PluginCommand):
                 _print(results)
 
         elif arguments.passwd:
+            from getpass import getpass
             names = Parameter.expand(arguments.NAMES)
             user = arguments.USER
 
@@ -0,0 +1,301 @@
+"""
+A benchmark of the inventory operations on synthetic inventories.
+
+For each size an inventory of hosts red0000001, red0000002, ... with
+consecutive ip addresses is created and the common operations are timed:
+adding the hosts with hostlist ranges, with and without compression,
+saving, reading cold from YAML and warm from the snapshot, find and
+query, a loop of set calls, validation, listing in each streamed format
+and info. The peak memory of an operation is measured with tracemalloc
+in a second run, so that tracing does not distort the times.
+
+    python -m cloudmesh.inventory.benchmark --sizes=1000,10000,100000 \\
+        --output=benchmark.json
+    python -m cloudmesh.inventory.benchmark --sizes=1000 \\
+        --compare=benchmark.json
+
+The results are written as JSON, so the results of two versions can be
+compared with --compare.
+"""
+import argparse
+import contextlib
+import io
+import ipaddress
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from cloudmesh.inventory import __version__
+from cloudmesh.inventory import snapshot
+from cloudmesh.inventory import storage
+from cloudmesh.inventory.inventory import Inventory
+
+SIZES = [1000, 10000, 100000]
+
+SETS = 1000
+
+
+def hosts(size):
+    """
+    returns the hostlist of the synthetic inventory
+
+    :param size: the number of hosts
+    :type size: int
+    :return: the hostlist, such as red[0000001-0001000]
+    :rtype: str
+    """
+    return "red[{:07d}-{:07d}]".format(1, size)
+
+
+def ips(size, first="10.0.0.1"):
+    """
+    returns the consecutive ip addresses of the synthetic inventory as a
+    parameter expression with one range per /24 network
+
+    :param size: the number of hosts
+    :type size: int
+    :param first: the first address
+    :type first: str
+    :return: the expression, such as 10.0.0.[1-255],10.0.1.[0-255]
+    :rtype: str
+    """
+    start = int(ipaddress.ip_address(first))
+    end = start + size - 1
+    ranges = []
+    while start <= end:
+        stop = min(end, start | 0xff)
+        network = str(ipaddress.ip_address(start)).rsplit(".", 1)[0]
+        ranges.append("{:}.[{:}-{:}]".format(network, start & 0xff, stop & 0xff))
+        start = stop + 1
+    return ",".join(ranges)
+
+
+def operations(directory, size):
+    """
+    returns the operations to measure for one size. Each operation is a
+    name, a setup function that is not timed and a function that is timed
+    with the result of the setup.
+
+    :param directory: the directory for the inventory files
+    :type directory: str
+    :param size: the number of hosts
+    :type size: int
+    :return: the operations
+    :rtype: list of tuples
+    """
+    filename = os.path.join(directory, "inventory-{:}.yaml".format(size))
+    compressed = os.path.join(directory, "compressed-{:}.yaml".format(size))
+    names = hosts(size)
+    addresses = ips(size)
+    count = min(size, SETS)
+
+    def empty(name):
+        def setup():
+            storage.remove(name)
+            return Inventory(name)
+        return setup
+
+    def add(i):
+        i.add(host=names, ip=addresses, service="worker", cluster="red")
+
+    def added():
+        i = empty(filename)()
+        add(i)
+        return i
+
+    def add_compressed(i):
+        i.add(host=names, ip=addresses, service="worker", cluster="red",
+              compress=True)
+        i.save()
+
+    def loaded():
+        i = Inventory(filename)
+        i.read()
+        return i
+
+    def cold():
+        snapshot.remove(filename)
+        return Inventory(filename)
+
+    def warm():
+        Inventory(filename).read()
+        return Inventory(filename)
+
+    def set_loop(i):
+        for j in range(1, count + 1):
+            i.set("red{:07d}".format(j), "status", "active")
+        i.save()
+
+    def listing(format):
+        def run(i):
+            i.write(io.StringIO(), format=format)
+        return run
+
+    def info(i):
+        with contextlib.redirect_stdout(io.StringIO()):
+            i.info()
+
+    return [
+        ("add", empty(filename), add),
+        ("save", added, Inventory.compact),
+        ("add compressed", empty(compressed), add_compressed),
+        ("read cold", cold, Inventory.read),
+        ("read warm", warm, Inventory.read),
+        ("find", loaded, lambda i: i.find(service="worker")),
+        ("query", loaded,
+         lambda i: i.query("status = active or ip in 10.0.0.0/24")),
+        ("set {:}".format(count), loaded, set_loop),
+        ("compact", loaded, Inventory.compact),
+        ("validate", loaded, Inventory.validate),
+        ("list table", warm, listing("table")),
+        ("list yaml", warm, listing("yaml")),
+        ("list json", warm, listing("json")),
+        ("info", lambda: Inventory(filename), info),
+    ]
+
+
+def measure(setup, run, memory=True):
+    """
+    times the function and measures its peak memory in a second run
+
+    :param setup: the function that prepares the argument, or None
+    :type setup: callable
+    :param run: the function to measure
+    :type run: callable
+    :param memory: if True the peak memory is measured
+    :type memory: bool
+    :return: the seconds and the peak memory in bytes or None
+    :rtype: tuple
+    """
+    argument = setup() if setup else None
+    start = time.perf_counter()
+    run(argument)
+    seconds = time.perf_counter() - start
+    if not memory:
+        return seconds, None
+    argument = setup() if setup else None
+    tracemalloc.start()
+    try:
+        run(argument)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return seconds, peak
+
+
+def run(sizes=None, memory=True, directory=None, verbose=True):
+    """
+    runs the benchmark
+
+    :param sizes: the numbers of hosts
+    :type sizes: list of int
+    :param memory: if True the peak memory is measured
+    :type memory: bool
+    :param directory: the directory for the inventory files, a temporary
+                      directory if None
+    :type directory: str
+    :param verbose: if True each result is printed
+    :type verbose: bool
+    :return: the results
+    :rtype: dict
+    """
+    temporary = directory is None
+    if temporary:
+        directory = tempfile.mkdtemp(prefix="cloudmesh-inventory-")
+    results = []
+    try:
+        for size in sizes or SIZES:
+            for name, setup, function in operations(directory, size):
+                seconds, peak = measure(setup, function, memory=memory)
+                result = {"hosts": size, "operation": name,
+                          "time": seconds, "memory": peak}
+                results.append(result)
+                if verbose:
+                    print(format_result(result), flush=True)
+    finally:
+        if temporary:
+            shutil.rmtree(directory, ignore_errors=True)
+    return {
+        "version": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results
+    }
+
+
+def format_result(result, previous=None):
+    """
+    formats a result as one line
+
+    :param result: the result
+    :type result: dict
+    :param previous: the result of the same operation to compare with
+    :type previous: dict
+    :return: the line
+    :rtype: str
+    """
+    line = "{:>9,} {:<16} {:>10.1f} ms".format(
+        result["hosts"], result["operation"], result["time"] * 1000)
+    if result.get("memory") is not None:
+        line += " {:>10.1f} MB".format(result["memory"] / 1e6)
+    if previous:
+        line += " {:>7.2f}x".format(result["time"] / previous["time"])
+    return line
+
+
+def compare(results, previous):
+    """
+    prints the results next to the ratio of their times to the previous
+    results of the same operations and sizes
+
+    :param results: the results
+    :type results: dict
+    :param previous: the results to compare with, for example of the
+                     last release
+    :type previous: dict
+    """
+    before = {(result["hosts"], result["operation"]): result
+              for result in previous["results"]}
+    print("compared with version {:} of {:}".format(
+        previous.get("version"), previous.get("date")))
+    for result in results["results"]:
+        print(format_result(
+            result, before.get((result["hosts"], result["operation"]))))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m cloudmesh.inventory.benchmark",
+        description="benchmarks the inventory on synthetic inventories")
+    parser.add_argument(
+        "--sizes", default=",".join(str(size) for size in SIZES),
+        help="comma separated numbers of hosts, for example 1000,1000000")
+    parser.add_argument("--output", help="the JSON file for the results")
+    parser.add_argument("--compare",
+                        help="a JSON file with earlier results")
+    parser.add_argument("--no-memory", action="store_true",
+                        help="do not measure the peak memory")
+    parser.add_argument("--directory",
+                        help="the directory for the inventory files")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    results = run(sizes=sizes, memory=not args.no_memory,
+                  directory=args.directory, verbose=args.compare is None)
+    if args.compare:
+        with open(args.compare) as stream:
+            compare(results, json.load(stream))
+    if args.output:
+        with open(args.output, "w") as stream:
+            json.dump(results, stream, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
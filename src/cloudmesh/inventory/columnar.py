@@ -0,0 +1,329 @@
+"""
+A read-only columnar file format for very large inventories.
+
+The file stores one column per attribute and a sorted string table. Each
+column holds for every host the number of its value in the string table,
+so a host costs four bytes per attribute and every distinct value is
+stored once. The file is opened with mmap, which lets several processes
+share the pages, and entries are only decoded into a dict when a host is
+accessed.
+
+Layout, all numbers are unsigned 32 bit integers in the byte order of the
+machine that wrote the file:
+
+    magic        8 bytes   b"CMINVCOL"
+    header       4 bytes   length of the JSON header that follows
+    JSON header            version, byteorder, hosts, strings, columns
+    padding                to a multiple of 4
+    names        hosts     the string number of each host name
+    columns      hosts     one block per column, MISSING if not set
+    offsets      strings + 1
+    strings                the JSON encoded values, sorted
+
+The hosts are sorted by their encoded name, so a host is found with a
+binary search over the names.
+"""
+import json
+import mmap
+import sys
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping
+
+MAGIC = b"CMINVCOL"
+VERSION = 1
+MISSING = 0xFFFFFFFF
+
+
+def encode(value):
+    return json.dumps(value, sort_keys=True).encode("utf-8")
+
+
+def dumps(data):
+    """
+    returns the columnar representation of the data
+
+    :param data: the hosts
+    :type data: dict
+    :return: the content of a columnar file
+    :rtype: bytes
+    """
+    cache = {}
+
+    def number_of(value):
+        # strings and numbers are encoded once, other values every time
+        key = (type(value), value) if isinstance(value, (str, int, float)) \
+            else None
+        if key is not None and key in cache:
+            return cache[key]
+        string = encode(value)
+        found = strings.setdefault(string, len(strings))
+        if key is not None:
+            cache[key] = found
+        return found
+
+    strings = {}
+    columns = {}
+    names = []
+    for name, entry in data.items():
+        numbers = {}
+        for attribute, value in entry.items():
+            if attribute not in columns:
+                columns[attribute] = None
+            numbers[attribute] = number_of(value)
+        names.append((encode(name), number_of(name), numbers))
+    columns = sorted(columns)
+    names.sort(key=lambda item: item[0])
+
+    # renumber the strings in sorted order
+    ordered = sorted(strings)
+    renumber = array("I", [0] * len(ordered))
+    for i, string in enumerate(ordered):
+        renumber[strings[string]] = i
+
+    header = json.dumps({
+        "version": VERSION,
+        "byteorder": sys.byteorder,
+        "hosts": len(names),
+        "strings": len(ordered),
+        "columns": columns
+    }).encode("utf-8")
+
+    content = bytearray(MAGIC)
+    content += array("I", [len(header)]).tobytes()
+    content += header
+    content += b"\0" * (-len(content) % 4)
+    content += array("I", [renumber[number] for _, number, _ in names]).tobytes()
+    for attribute in columns:
+        column = array("I", [MISSING] * len(names))
+        for row, (_, _, numbers) in enumerate(names):
+            if attribute in numbers:
+                column[row] = renumber[numbers[attribute]]
+        content += column.tobytes()
+    strings = ordered
+    offsets = array("I", [0])
+    for string in strings:
+        offsets.append(offsets[-1] + len(string))
+    content += offsets.tobytes()
+    for string in strings:
+        content += string
+    return bytes(content)
+
+
+class ColumnarData(Mapping):
+    """
+    A read-only mapping from host names to entries backed by a memory
+    mapped columnar file.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        with open(filename, "rb") as stream:
+            self.map = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = view = memoryview(self.map)
+        if bytes(view[:8]) != MAGIC:
+            raise ValueError("{:} is not a columnar inventory".format(filename))
+        length = view[8:12].cast("I")[0]
+        header = json.loads(bytes(view[12:12 + length]))
+        if header["byteorder"] != sys.byteorder:
+            raise ValueError("{:} was written with byte order {:}".format(
+                filename, header["byteorder"]))
+        self.hosts = header["hosts"]
+        self.columns = header["columns"]
+        self.strings = header["strings"]
+
+        position = 12 + length
+        position += -position % 4
+        size = 4 * self.hosts
+        self.names = view[position:position + size].cast("I")
+        position += size
+        self.column = {}
+        self.start = {}
+        for attribute in self.columns:
+            self.start[attribute] = position
+            self.column[attribute] = view[position:position + size].cast("I")
+            position += size
+        size = 4 * (self.strings + 1)
+        self.offsets = view[position:position + size].cast("I")
+        self.base = position + size
+
+    def close(self):
+        for attribute in self.columns:
+            self.column[attribute].release()
+        self.names.release()
+        self.offsets.release()
+        self.view.release()
+        self.map.close()
+
+    def string(self, number):
+        start = self.base + self.offsets[number]
+        end = self.base + self.offsets[number + 1]
+        return self.map[start:end]
+
+    def value(self, number):
+        return json.loads(self.string(number))
+
+    def number(self, value):
+        """
+        returns the number of the value in the string table
+
+        :param value: the value
+        :type value: object
+        :return: the number or None if the value does not occur
+        :rtype: int
+        """
+        wanted = encode(value)
+        low, high = 0, self.strings
+        while low < high:
+            middle = (low + high) // 2
+            if self.string(middle) < wanted:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.strings and self.string(low) == wanted:
+            return low
+        return None
+
+    def row(self, name):
+        number = self.number(name)
+        if number is None:
+            return None
+        row = bisect_left(self.names, number)
+        if row < self.hosts and self.names[row] == number:
+            return row
+        return None
+
+    def entry(self, row):
+        """
+        builds the dict of the host in the given row
+
+        :param row: the row
+        :type row: int
+        :return: the entry
+        :rtype: dict
+        """
+        entry = {}
+        for attribute in self.columns:
+            number = self.column[attribute][row]
+            if number != MISSING:
+                entry[attribute] = self.value(number)
+        return entry
+
+    def rows(self, attribute, value):
+        """
+        returns the rows in which the attribute has the value. The column
+        is searched with mmap.find, so the scan runs at memory speed.
+
+        :param attribute: the attribute
+        :type attribute: str
+        :param value: the value
+        :type value: object
+        :return: the rows
+        :rtype: list
+        """
+        if attribute not in self.column:
+            return []
+        number = self.number(value)
+        if number is None:
+            return []
+        pattern = array("I", [number]).tobytes()
+        start = self.start[attribute]
+        end = start + 4 * self.hosts
+        found = []
+        position = self.map.find(pattern, start, end)
+        while position != -1:
+            offset = position - start
+            if offset % 4 == 0:
+                found.append(offset // 4)
+                position = self.map.find(pattern, position + 4, end)
+            else:
+                position = self.map.find(pattern, position + 1, end)
+        return found
+
+    def find(self, kwargs):
+        """
+        returns the entries whose attributes equal the values
+
+        :param kwargs: the attributes and the values to match
+        :type kwargs: dict
+        :return: the matching entries
+        :rtype: list
+        """
+        if not kwargs:
+            return [self.entry(row) for row in range(self.hosts)]
+        found = None
+        for attribute, value in kwargs.items():
+            rows = self.rows(attribute, value)
+            found = set(rows) if found is None else found.intersection(rows)
+            if not found:
+                return []
+        return [self.entry(row) for row in sorted(found)]
+
+    def distinct(self, attribute):
+        """
+        returns the distinct values of the attribute
+
+        :param attribute: the attribute
+        :type attribute: str
+        :return: the values
+        :rtype: list
+        """
+        if attribute not in self.column:
+            return []
+        numbers = set(self.column[attribute])
+        numbers.discard(MISSING)
+        return [self.value(number) for number in sorted(numbers)]
+
+    def table(self, order):
+        """
+        yields for each host the values of the attributes in the order
+        without building the entries
+
+        :param order: the attributes
+        :type order: list
+        """
+        columns = [self.column.get(attribute) for attribute in order]
+        cache = {}
+        for row in range(self.hosts):
+            values = []
+            for column in columns:
+                number = MISSING if column is None else column[row]
+                if number == MISSING:
+                    values.append(None)
+                else:
+                    if number not in cache:
+                        if len(cache) > 65536:
+                            cache.clear()
+                        cache[number] = self.value(number)
+                    values.append(cache[number])
+            yield values
+
+    def __getitem__(self, name):
+        row = self.row(name)
+        if row is None:
+            raise KeyError(name)
+        return self.entry(row)
+
+    def __contains__(self, name):
+        return self.row(name) is not None
+
+    def __setitem__(self, name, entry):
+        raise TypeError(
+            "The columnar inventory {:} is read only".format(self.filename))
+
+    __delitem__ = __setitem__
+
+    def __iter__(self):
+        for row in range(self.hosts):
+            yield self.value(self.names[row])
+
+    def items(self):
+        """
+        yields the names and the entries of the hosts in the order in
+        which they are stored
+        """
+        for row in range(self.hosts):
+            yield self.value(self.names[row]), self.entry(row)
+
+    def __len__(self):
+        return self.hosts
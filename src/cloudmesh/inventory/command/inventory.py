@@ -1,13 +1,64 @@
-from pprint import pprint
+import glob
+import json
 import os
+import sys
 
 from cloudmesh.common.console import Console
 from cloudmesh.common.parameter import Parameter
-from cloudmesh.inventory.inventory import Inventory
+from cloudmesh.inventory import profiling
+from cloudmesh.inventory.names import NameMatcher
+from cloudmesh.inventory.query import Query
 from cloudmesh.shell.command import PluginCommand
 from cloudmesh.shell.command import command, map_parameters
-from cloudmesh.common.Host import Host
-from cloudmesh.common.util import path_expand
+
+# cms loads every plugin on startup, so the inventory and the modules
+# that only some subcommands need, such as yaml and Printer, are
+# imported when the command runs, see tests/test_import_time.py
+
+
+def _paging(arguments):
+    """
+    converts the options --limit and --offset to numbers
+
+    :return: False if they are not valid
+    :rtype: bool
+    """
+    try:
+        arguments.limit = None if arguments.limit is None else int(arguments.limit)
+        arguments.offset = int(arguments.offset or 0)
+    except ValueError:
+        Console.error("--limit and --offset have to be numbers")
+        return False
+    if (arguments.limit or 0) < 0 or arguments.offset < 0:
+        Console.error("--limit and --offset can not be negative")
+        return False
+    return True
+
+
+def _write(hosts, format, order):
+    """
+    writes the hosts to stdout as yaml, json or, for all other formats,
+    as table with the columns in the order
+    """
+    from cloudmesh.inventory import streaming
+    with profiling.profile.phase("write"):
+        if format in ["yaml", "json"]:
+            count = streaming.writers[format](hosts, sys.stdout)
+        else:
+            count = streaming.write_table(hosts, sys.stdout, order=order)
+    profiling.profile.count("hosts written", count)
+
+
+def _subcommand(arguments):
+    """
+    returns the name of the subcommand, such as list
+    """
+    for name in ["add", "create", "set", "define", "delete", "clone", "list",
+                 "info",
+                 "validate", "where", "remove", "convert", "diff", "merge"]:
+        if arguments[name]:
+            return name
+    return "inventory"
 
 
 class InventoryCommand(PluginCommand):
@@ -34,31 +85,82 @@ class InventoryCommand(PluginCommand):
                                   [--router=ROUTER]
                                   [--locale=LOCALE]
                                   [--timezone=TIMEZONE]
+                                  [--compress]
+                                  [--profile]
               inventory create TAG [--hostnames=NAMES]
                                    [--ip=IP]
                                    [--inventory=INVENTORY]
                                    [--keyfile=KEYFILE]
+                                   [--profile]
               inventory set NAMES ATTRIBUTE to VALUES [--inventory=INVENTORY] [--listvalue]
-              inventory delete NAMES [--inventory=INVENTORY]
-              inventory clone NAMES from SOURCE [--inventory=INVENTORY]
-              inventory list [NAMES] [--format=FORMAT] [--columns=COLUMNS] [--inventory=INVENTORY]
-              inventory info [--inventory=INVENTORY]
+                            [--profile]
+              inventory delete NAMES [--inventory=INVENTORY] [--profile]
+              inventory define PROFILE [ATTRIBUTE to VALUES] [--inventory=INVENTORY] [--listvalue]
+                               [--profile]
+              inventory clone NAMES from SOURCE [--inventory=INVENTORY] [--profile]
+              inventory list [NAMES] [--format=FORMAT] [--columns=COLUMNS] [--inventory=INVENTORY] [--where=EXPR]
+                             [--collapse] [--sort=COLUMNS] [--limit=LIMIT] [--offset=OFFSET]
+                             [--all] [--profile]
+              inventory where NAMES [--profile]
+              inventory info [--inventory=INVENTORY] [--timing] [--profile]
+              inventory validate [--inventory=INVENTORY] [--format=FORMAT] [--profile]
               inventory remove --inventory=INVENTORY
+              inventory convert SOURCE [DESTINATION] [--profile]
+              inventory diff FIRST SECOND [--format=FORMAT] [--profile]
+              inventory merge BASE OURS THEIRS [--dryrun] [--profile]
 
           Arguments:
             NAMES     Name of the resources (example i[10-20])
             FORMAT    The format of the output is either txt,
-                      yaml, dict, table [default: table].
+                      yaml, json, dict, table [default: table].
+                      The hosts are written one at a time, so
+                      large inventories are not held in memory.
+                      The column widths of a table are taken from
+                      its first 1000 rows.
             OWNERS    a comma separated list of owners for this resource
+            EXPR      a query such as
+                      "service=worker and cluster in (red,blue)".
+                      Comparisons are =, !=, ~ (shell pattern),
+                      in (a,b), in CIDR and contains; they are
+                      combined with and, or, not and parentheses.
             LABEL     a unique label for this resource
             SERVICE   a string that identifies the service
             PROJECT   a string that identifies the project
-            SOURCE    a single host name to clone from
+            SOURCE    a single host name or profile to clone from,
+                      or the inventory file to convert
+            PROFILE   the name of a profile with the attributes that
+                      the hosts referring to it share
+            DESTINATION  the inventory file to convert to
+            FIRST     the inventory file to compare
+            SECOND    the inventory file to compare with
+            BASE      the common ancestor of OURS and THEIRS
+            OURS      the inventory file to merge into
+            THEIRS    the inventory file with the changes to merge
             COMMENT   a comment
 
           Options:
              -v       verbose mode
              --keyfile=KEYFILE      Keyfile to assign [default: ~/.ssh/id_rsa.pub]
+             --timing               measure the cold and warm load time
+             --compress             store the hosts as one range group with
+                                    shared attributes and consecutive ips
+             --collapse             show hosts with identical rows as one
+                                    row in hostlist notation
+             --dryrun               show the changes without merging them
+             --sort=COLUMNS         sort the hosts by the comma separated
+                                    columns. Digits in names and ip
+                                    addresses are compared as numbers.
+             --limit=LIMIT          list at most LIMIT hosts
+             --offset=OFFSET        skip the first OFFSET hosts
+             --all                  list the hosts of all inventory files
+                                    in ~/.cloudmesh with the column
+                                    inventory
+             --profile              print the time of the phases of the
+                                    command, such as reading and parsing
+                                    the file, to stderr. The variable
+                                    CLOUDMESH_INVENTORY_PROFILE=FILE
+                                    writes them to a .json file, or the
+                                    cProfile statistics to a .prof file
 
           Description:
 
@@ -66,13 +168,44 @@ class InventoryCommand(PluginCommand):
                 list -- lists the resources in the given format
                 delete -- deletes objects from the table
                 clone -- copies the content of an existing object
-                         and creates new once with it
+                         and creates new once with it. If SOURCE is a
+                         profile the new hosts refer to it with the
+                         attribute profile and store only their name.
+                define -- sets an attribute of a profile and shows the
+                         profile. The hosts that refer to the profile
+                         inherit the attributes they do not set
+                         themselves, so changing the profile changes
+                         all of them. Only YAML inventories support
+                         profiles.
                 set   -- sets for the specified objects the attribute
                          to the given value or values. If multiple values
                          are used the values are assigned to the and
                          objects in order. See examples
                 map   -- allows to set attributes on a set of objects
                          with a set of values
+                convert -- converts inventory files in ~/.cloudmesh
+                         between the YAML and the SQLite format. The
+                         format is selected by the extension .yaml or
+                         .db. Without DESTINATION the other format is
+                         used. SOURCE can be a pattern such as
+                         "inventory*.yaml". The extension .columnar
+                         creates a read-only memory mapped file for
+                         very large inventories.
+                diff -- shows the hosts that are added and removed and
+                         the attributes that are set and removed
+                         between two inventory files
+                where -- shows the inventory files in ~/.cloudmesh that
+                         define the hosts. The host names of the files are
+                         kept in ~/.cloudmesh/inventory.federation and
+                         read again when a file changes.
+                validate -- checks all hosts with the schema in
+                         schema/inventory.settings.py and reports every
+                         violation. add and set refuse values that
+                         violate the schema.
+                merge -- merges the changes from BASE to THEIRS into
+                         OURS. If both change the same attribute of a
+                         host differently, the value of OURS is kept and
+                         the conflict is reported.
 
           Examples:
 
@@ -80,9 +213,34 @@ class InventoryCommand(PluginCommand):
                 adds hosts x0, x1, x2, x3 and puts the string
                 openstack into the service column
 
+            cms inventory add red[001-250] --service=worker --ip=10.1.0.[1-250] --compress
+                stores the 250 hosts as one range in the inventory file
+
             cms inventory list
                 lists the repository
 
+            cms inventory list --collapse
+                lists hosts that differ only in their name and in
+                consecutive ips as one row such as red[0001-9999]
+
+            cms inventory list --where="ip in 10.1.0.0/16 and status != active"
+                lists the inactive hosts in the network 10.1.0.0/16
+
+            cms inventory list --columns=host,ip --offset=100 --limit=50
+                lists the name and the ip of the hosts 101 to 150
+
+            cms inventory list --where="service=worker" --sort=ip --limit=20
+                lists the first 20 workers by ip address
+
+            cms inventory list --sort=tag,host
+                lists the hosts sorted by tag and then by name
+
+            cms inventory list --all --where="service=manager"
+                lists the managers of all inventories
+
+            cms inventory where red01
+                shows the inventory files that define red01
+
             cms inventory set x[3-4] temperature to 32
                 sets for the resources x3, x4 the value of the
                 temperature to 32
@@ -96,7 +254,34 @@ class InventoryCommand(PluginCommand):
                 The --listvalue option indicates the value set is a list
 
             cms inventory clone x[5-6] from x3
-                clones the values for x5, x6 from x3
+                clones the values for x5, x6 from x3, which fails if x3
+                has an ip as the addresses have to be unique
+
+            cms inventory define worker-default service to worker
+            cms inventory clone red[001-999] from worker-default
+            cms inventory define worker-default os to ubuntu
+                creates 999 workers that refer to the profile
+                worker-default and then changes the os of all of
+                them with one change
+
+            cms inventory convert "inventory*.yaml"
+                converts all YAML inventories in ~/.cloudmesh into
+                SQLite databases with the same name and the extension .db
+
+            cms inventory validate --format=json
+                lists the hosts with attributes that violate the schema,
+                such as an ip that is not an address
+
+            cms inventory diff site-a.yaml site-b.yaml
+                shows the changes that turn site-a.yaml into site-b.yaml
+
+            cms inventory merge base.yaml ours.yaml theirs.yaml
+                applies the changes from base.yaml to theirs.yaml to
+                ours.yaml
+
+            cms inventory list --where="service=worker" --profile
+                lists the workers and shows how long reading, querying
+                and writing the hosts took
 
         """
         map_parameters(arguments,
@@ -105,7 +290,29 @@ class InventoryCommand(PluginCommand):
                        'hostnames',
                        'inventory',
                        'keyfile',
-                       'listvalue')
+                       'listvalue',
+                       'timing',
+                       'compress',
+                       'collapse',
+                       'dryrun',
+                       'all',
+                       'limit',
+                       'offset',
+                       'profile',
+                       'sort')
+
+        with profiling.session(enabled=arguments.profile) as profile:
+            with profile.phase(_subcommand(arguments)):
+                return self._inventory(arguments)
+
+    def _inventory(self, arguments):
+        """
+        runs the subcommand of do_inventory
+        """
+        from cloudmesh.common.util import path_expand
+        from cloudmesh.inventory import storage
+        from cloudmesh.inventory import streaming
+        from cloudmesh.inventory.inventory import Inventory
 
         if arguments.info:
 
@@ -113,36 +320,193 @@ class InventoryCommand(PluginCommand):
                 i = Inventory()
             else:
                 i = Inventory(f'~/.cloudmesh/{arguments.inventory}')
-            i.read()
-            i.info()
+            i.info(measure=arguments.timing)
+
+        elif arguments.validate:
+
+            if arguments.inventory is None:
+                i = Inventory()
+            else:
+                i = Inventory(f'~/.cloudmesh/{arguments.inventory}')
+            violations = i.validate()
+            if arguments["--format"] == "json":
+                print(json.dumps(violations, indent=2, default=str))
+                return ""
+            for violation in violations:
+                Console.error("{host} {attribute}: {message} ({value!r})".format(
+                    **violation))
+            if violations:
+                Console.error("{:} violations of the schema".format(
+                    len(violations)))
+            else:
+                Console.ok("The hosts are valid")
 
         elif arguments.remove and arguments.inventory:
 
-            os.system("rm -f " + path_expand(f'~/.cloudmesh/{arguments.inventory}'))
+            filename = path_expand(f'~/.cloudmesh/{arguments.inventory}')
+            storage.remove(filename)
+
+        elif arguments.convert:
+
+            directory = path_expand('~/.cloudmesh')
+            sources = sorted(glob.glob(os.path.join(directory, arguments.SOURCE)))
+            if not sources:
+                Console.error("The inventory {:} does not exist".format(
+                    arguments.SOURCE))
+                return ""
+            if arguments.DESTINATION and len(sources) > 1:
+                Console.error("Only one source can be converted to {:}".format(
+                    arguments.DESTINATION))
+                return ""
+
+            for source in sources:
+                if arguments.DESTINATION:
+                    destination = os.path.join(directory, arguments.DESTINATION)
+                else:
+                    base, extension = os.path.splitext(source)
+                    if storage.backend(source) == "sqlite":
+                        destination = base + ".yaml"
+                    else:
+                        destination = base + ".db"
+                i = Inventory.convert(source, destination)
+                Console.ok("Converted {:} to {:} ({:} hosts)".format(
+                    source, destination, len(i.data)))
+
+        elif arguments.diff or arguments.merge:
+
+            from cloudmesh.inventory import diff
+            from cloudmesh.inventory import snapshot
+
+            directory = path_expand('~/.cloudmesh')
+            if arguments.diff:
+                names = [arguments.FIRST, arguments.SECOND]
+            else:
+                names = [arguments.BASE, arguments.OURS, arguments.THEIRS]
+            filenames = [os.path.join(directory, path_expand(name))
+                         for name in names]
+            for name, filename in zip(names, filenames):
+                if not os.path.exists(filename):
+                    Console.error("The inventory {:} does not exist".format(
+                        name))
+                    return ""
+            inventories = [Inventory(filename) for filename in filenames]
+
+            if arguments.diff:
+                changes = diff.diff(*inventories)
+                conflicts = []
+            else:
+                changes, conflicts = diff.merge(*inventories)
+            if arguments.diff or arguments.dryrun:
+                if arguments["--format"] == "json":
+                    print(json.dumps(changes.dump(), indent=2, default=str))
+                else:
+                    print(snapshot.dump(changes.dump()), end="")
+            else:
+                try:
+                    changes.apply(inventories[1])
+                except ValueError as e:
+                    Console.error(str(e))
+                    return ""
+                Console.ok("Merged {:} changes into {:}".format(
+                    len(changes), arguments.OURS))
+            for conflict in conflicts:
+                where = conflict["host"]
+                if conflict["attribute"] is not None:
+                    where += " " + conflict["attribute"]
+                Console.error("Conflict in {:}: ours {:}, theirs {:}".format(
+                    where, conflict["ours"], conflict["theirs"]))
+
+        elif arguments.where:
+
+            from cloudmesh.inventory.federation import Federation
+
+            hosts = NameMatcher(arguments.NAMES)
+            found = Federation().where(arguments.NAMES)
+            for name in hosts.select(found):
+                print("{:}: {:}".format(name, ", ".join(
+                    os.path.basename(filename) for filename in found[name])))
+            if not found:
+                Console.error("The hosts {:} are not in an inventory".format(
+                    arguments.NAMES))
+
+        elif arguments.list and arguments.all:
+
+            from cloudmesh.inventory import sorting
+            from cloudmesh.inventory.federation import Federation
+
+            if not _paging(arguments):
+                return ""
+            limit, offset = arguments.limit, arguments.offset
+            try:
+                found = Federation().hosts(names=arguments.NAMES,
+                                           where=arguments["--where"])
+            except ValueError as e:
+                Console.error(str(e))
+                return ""
+            hosts = []
+            for filename, name, entry in found:
+                entry["inventory"] = os.path.basename(filename)
+                hosts.append((name, entry))
+            if arguments.sort:
+                hosts = sorting.top(
+                    hosts, arguments.sort.split(","),
+                    limit=None if limit is None else offset + limit)
+            if arguments["--columns"]:
+                order = arguments["--columns"].split(",")
+            elif found:
+                order = ["inventory"] + Inventory.order
+            else:
+                order = ["inventory", "host"]
+            _write(streaming.page(hosts, limit=limit, offset=offset),
+                   arguments["--format"], order)
 
         elif arguments.NAMES is not None and arguments.list:
 
-            hosts = Parameter.expand(arguments.NAMES)
+            hosts = NameMatcher(arguments.NAMES)
+            if not _paging(arguments):
+                return ""
+            limit, offset = arguments.limit, arguments.offset
 
             if arguments.inventory is None:
                 i = Inventory()
             else:
                 i = Inventory(f'~/.cloudmesh/{arguments.inventory}')
-            i.read()
-            d = dict(i.data)
-            r = {}
-            for key in d:
-                if key in hosts:
-                    r[key] = d[key]
 
-            pprint(r)
-            i.data = r
+            query = None
+            if arguments["--where"]:
+                try:
+                    query = Query(arguments["--where"])
+                except ValueError as e:
+                    Console.error(str(e))
+                    return ""
 
             if arguments["--columns"]:
                 order = arguments["--columns"].split(",")
             else:
                 order = i.order
-            print(i.list(format="table", order=order))
+
+            if not arguments.collapse:
+                if arguments.sort:
+                    selected = i.sort(
+                        arguments.sort,
+                        limit=None if limit is None else offset + limit,
+                        match=lambda name, entry: name in hosts and (
+                            query is None or query.match(entry)))
+                else:
+                    selected = ((name, entry) for name, entry in i.iter_hosts()
+                                if name in hosts
+                                if query is None or query.match(entry))
+                _write(streaming.page(selected, limit=limit, offset=offset),
+                       arguments["--format"], order)
+                return ""
+
+            r = {}
+            for name in hosts.select(i.data):
+                entry = i.data[name]
+                if query is None or query.match(entry):
+                    r[name] = entry
+            i.data = r
+            print(i.list(format="table", order=order, collapse=True))
 
         # elif arguments["set"]:
         #    hosts = hostlist.expand_hostlist(arguments.NAMES)
@@ -163,6 +527,7 @@ class InventoryCommand(PluginCommand):
         #    print (i.list(format="table"))
 
         elif arguments.create:
+            from cloudmesh.common.Host import Host
             tag = arguments.TAG
 
             hostnames = Parameter.expand(arguments.hostnames)
@@ -192,81 +557,141 @@ class InventoryCommand(PluginCommand):
                 i = Inventory()
             else:
                 i = Inventory(f'~/.cloudmesh/{arguments.inventory}')
-            i.read()
 
             inventory_name = arguments.inventory.split('.')[0]
 
-            i.add(host=manager,
-                  name=manager,
-                  tag=tag,
-                  cluster=inventory_name,
-                  service='manager',
-                  ip=manager_ip,
-                  keyfile=keyfile,
-                  status="inactive"
-                  )
-
-            for worker, ip in zip(worker_hostnames, worker_ips):
-                i.add(host=worker,
-                      name=worker,
-                      tag=tag,
-                      cluster=inventory_name,
-                      service='worker',
-                      ip=ip,
-                      keyfile=keyfile,
-                      status="inactive"
-                )  # noqa: E124
-
-            i.save()
+            records = []
+            if manager is not None:
+                records.append({'host': manager,
+                                'name': manager,
+                                'service': 'manager',
+                                'ip': manager_ip})
+            records.extend({'host': worker,
+                            'name': worker,
+                            'service': 'worker',
+                            'ip': ip}
+                           for worker, ip in zip(worker_hostnames, worker_ips))
+
+            try:
+                with i.batch():
+                    i.add_many(records,
+                               tag=tag,
+                               cluster=inventory_name,
+                               keyfile=keyfile,
+                               status="inactive")
+                    i.save()
+            except ValueError as e:
+                Console.error(str(e))
+                return ""
             Console.ok(f"Successfuly saved to ~/.cloudmesh/{arguments.inventory}")
 
         elif arguments.list:
 
+            if not _paging(arguments):
+                return ""
+            limit, offset = arguments.limit, arguments.offset
             if arguments.inventory is None:
                 i = Inventory()
             else:
                 i = Inventory(f'~/.cloudmesh/{arguments.inventory}')
-            i.read()
+            if arguments["--where"]:
+                try:
+                    i.data = i.query(arguments["--where"])
+                except ValueError as e:
+                    Console.error(str(e))
+                    return ""
             if arguments["--columns"]:
                 order = arguments["--columns"].split(",")
             else:
                 order = i.order
-            print(i.list(format="table", order=order))
+            if arguments.collapse:
+                print(i.list(format="table", order=order, collapse=True))
+                return ""
+            if i.storage.kind == "columnar" and \
+                    arguments["--format"] not in ["yaml", "json"] and \
+                    not (arguments["--where"] or arguments.sort) and \
+                    limit is None and not offset:
+                # the table is read straight from the columns
+                print(i.list(format="table", order=order))
+                return ""
+            if arguments.sort:
+                selected = i.sort(
+                    arguments.sort,
+                    limit=None if limit is None else offset + limit)
+            else:
+                selected = i.iter_hosts()
+            _write(streaming.page(selected, limit=limit, offset=offset),
+                   arguments["--format"], order)
+
+        elif arguments.define:
+
+            name = arguments.PROFILE
+            if arguments.inventory is None:
+                i = Inventory()
+            else:
+                i = Inventory(f'~/.cloudmesh/{arguments.inventory}')
+
+            if arguments.ATTRIBUTE is not None:
+                if arguments.listvalue:
+                    value = Parameter.expand(arguments.VALUES)
+                else:
+                    value = arguments.VALUES
+                try:
+                    with i.batch():
+                        i.define(name, **{arguments.ATTRIBUTE: value})
+                        i.save()
+                except ValueError as e:
+                    Console.error(str(e))
+                    return ""
+            elif name not in i.profiles:
+                Console.error("The profile {:} does not exist".format(name))
+                return ""
+
+            _write([(name, i.profiles[name])], "yaml", None)
 
         elif arguments.set:
 
-            hosts = Parameter.expand(arguments.NAMES)
+            hosts = NameMatcher(arguments.NAMES)
             values = Parameter.expand(arguments.VALUES)
-            if len(values) == 1:
-                values = values * len(hosts)
             attribute = arguments.ATTRIBUTE
-            if not arguments.listvalue and len(hosts) != len(values):
+            if not arguments.listvalue and len(values) != 1 and \
+                    hosts.count != len(values):
                 Console.error(
                     "Number of names {:} != number of values{:}".format(
-                        len(hosts), len(values)))
+                        hosts.count, len(values)))
+                return ""
             if arguments.inventory is None:
                 i = Inventory()
             else:
                 i = Inventory(f'~/.cloudmesh/{arguments.inventory}')
-            i.read()
-
-            for index in range(0, len(hosts)):
-                host = hosts[index]
-                value = values if arguments.listvalue else values[index]
-
-                if not i.has_host(host):
-                    i.add(host=host)
 
-                i.set(host, attribute, value)
-                # object = {'host': host,
-                #           attribute: value}
-
-                # i.add(**object)
-                i.save()
+            try:
+                with i.batch():
+                    for index, host in enumerate(hosts.expand()):
+                        if arguments.listvalue:
+                            value = values
+                        elif len(values) == 1:
+                            value = values[0]
+                        else:
+                            value = values[index]
+
+                        if not i.has_host(host):
+                            i.add(host=host)
+
+                        i.set(host, attribute, value)
+                        # object = {'host': host,
+                        #           attribute: value}
+
+                        # i.add(**object)
+                    i.save()
+            except ValueError as e:
+                Console.error(str(e))
+                return ""
 
             print(i.list(format="table"))
 
         elif arguments.add and arguments.cluster:
+            from cloudmesh.common.Host import Host
             names = Parameter.expand(arguments.NAMES)
             manager, workers = Host.get_hostnames(names)
             if manager is None:
@@ -289,7 +714,6 @@ class InventoryCommand(PluginCommand):
                 i = Inventory()
             else:
                 i = Inventory(f'~/.cloudmesh/{arguments.inventory}')
-            i.read()
             element = {}
 
             for attribute in i.order:
@@ -301,39 +725,48 @@ class InventoryCommand(PluginCommand):
                     pass
             element['host'] = arguments.NAMES
             element['status'] = 'inactive'
-            i.add(**element)
-            i.save()
+            try:
+                with i.batch():
+                    i.add(compress=arguments.compress, **element)
+                    i.save()
+            except ValueError as e:
+                Console.error(str(e))
+                return ""
             print(i.list(format="table"))
 
         elif arguments.delete:
 
-            hosts = Parameter.expand(arguments.NAMES)
+            hosts = NameMatcher(arguments.NAMES)
             if arguments.inventory is None:
                 i = Inventory()
             else:
                 i = Inventory(f'~/.cloudmesh/{arguments.inventory}')
-            i.read()
 
-            for host in hosts:
-                i.delete(host)
-            i.save()
+            with i.batch():
+                for host in hosts.select(i.data):
+                    i.delete(host)
+                i.save()
 
         elif arguments.clone:
 
-            hosts = Parameter.expand(arguments.NAMES)
+            hosts = NameMatcher(arguments.NAMES)
             source = arguments.SOURCE
 
             if arguments.inventory is None:
                 i = Inventory()
             else:
                 i = Inventory(f'~/.cloudmesh/{arguments.inventory}')
-            i.read()
 
-            if source in i.data:
+            if source in i.data or source in i.profiles:
 
-                for host in hosts:
-                    i.data[host] = dict(i.data[source])
-                i.save()
+                try:
+                    with i.batch():
+                        for host in hosts.expand():
+                            i.clone(host, source)
+                        i.save()
+                except ValueError as e:
+                    Console.error(str(e))
+                    return ""
             else:
                 Console.error("The source {:} does not exist".format(source))
 
@@ -0,0 +1,306 @@
+"""
+Differences between inventories and three-way merges.
+
+Each host is summarized by a hash of its entry. Two inventories are
+compared by their hashes first, so only the hosts whose hashes differ
+are compared attribute by attribute. The hashes of a YAML inventory are
+kept in a file beside it with the suffix .digests and are valid as long
+as the inventory file and its journal are unchanged.
+
+The differences are a ChangeSet of added and removed hosts and of the
+attributes that are set or removed on the other hosts:
+
+    added:
+      red05: {host: red05, service: worker}
+    removed:
+    - red03
+    changed:
+      red01: {status: active}
+    unset:
+      red02: [comment]
+
+It can be applied to an Inventory with add_many, delete, set and unset.
+"""
+import hashlib
+import os
+import pickle
+
+from cloudmesh.inventory import journal
+
+_missing = object()
+
+
+def digest(entry):
+    """
+    returns the hash of the entry of a host
+
+    :param entry: the entry
+    :type entry: dict
+    :return: the hash
+    :rtype: bytes
+    """
+    content = pickle.dumps(sorted(entry.items(), key=_first),
+                           protocol=pickle.HIGHEST_PROTOCOL)
+    return hashlib.blake2b(content, digest_size=8).digest()
+
+
+def _first(item):
+    return item[0]
+
+
+def digests(data):
+    """
+    returns the hash of each host
+
+    :param data: the hosts
+    :type data: dict
+    :return: the hashes by host name
+    :rtype: dict
+    """
+    return {name: digest(entry) for name, entry in data.items()}
+
+
+def sidecar(filename):
+    """
+    returns the name of the file with the hashes of the inventory file
+
+    :param filename: the name of the inventory file
+    :type filename: str
+    :return: the name of the file with the hashes
+    :rtype: str
+    """
+    return filename + ".digests"
+
+
+def signature(filename):
+    """
+    returns the key under which the hashes of the inventory file are
+    valid
+
+    :param filename: the name of the inventory file
+    :type filename: str
+    :return: the key
+    :rtype: tuple
+    """
+    status = os.stat(filename)
+    return status.st_mtime_ns, status.st_size, journal.size(filename)
+
+
+def read(filename, key):
+    """
+    reads the hashes of the inventory file if they match the key
+
+    :return: the hashes or None
+    :rtype: dict
+    """
+    try:
+        with open(sidecar(filename), "rb") as stream:
+            if pickle.load(stream) != key:
+                return None
+            return pickle.load(stream)
+    except (OSError, EOFError, pickle.UnpicklingError, TypeError,
+            ValueError):
+        return None
+
+
+def write(filename, key, hashes):
+    """
+    writes the hashes of the inventory file. Errors are ignored as the
+    hashes are only a cache.
+    """
+    name = sidecar(filename)
+    tmp = "{:}.{:}.tmp".format(name, os.getpid())
+    try:
+        with open(tmp, "wb") as stream:
+            pickle.dump(key, stream, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(hashes, stream, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, name)
+    except OSError:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+class ChangeSet(object):
+    """
+    The changes that turn one inventory into another
+    """
+
+    def __init__(self, added=None, removed=None, changed=None, unset=None):
+        """
+        :param added: the entries of the added hosts by name
+        :type added: dict
+        :param removed: the names of the removed hosts
+        :type removed: list
+        :param changed: the attributes that are set by host name
+        :type changed: dict
+        :param unset: the attributes that are removed by host name
+        :type unset: dict
+        """
+        self.added = dict(added or {})
+        self.removed = list(removed or [])
+        self.changed = dict(changed or {})
+        self.unset = dict(unset or {})
+
+    def __len__(self):
+        return len(self.added) + len(self.removed) + \
+            sum(len(values) for values in self.changed.values()) + \
+            sum(len(attributes) for attributes in self.unset.values())
+
+    def dump(self):
+        """
+        returns the changes as dict that can be written as YAML or JSON
+
+        :return: the changes
+        :rtype: dict
+        """
+        return {
+            "added": {name: dict(entry)
+                      for name, entry in self.added.items()},
+            "removed": list(self.removed),
+            "changed": {name: dict(values)
+                        for name, values in self.changed.items()},
+            "unset": {name: list(attributes)
+                      for name, attributes in self.unset.items()}
+        }
+
+    def apply(self, inventory):
+        """
+        applies the changes to the inventory in one batch
+
+        :param inventory: the inventory
+        :type inventory: Inventory
+        """
+        with inventory.batch():
+            for name in self.removed:
+                if inventory.has_host(name):
+                    inventory.delete(name)
+            for name, values in self.changed.items():
+                for attribute, value in values.items():
+                    inventory.set(name, attribute, value)
+            for name, attributes in self.unset.items():
+                for attribute in attributes:
+                    inventory.unset(name, attribute)
+            if self.added:
+                inventory.add_many(self.added.values())
+
+
+def _compare(old, new):
+    """
+    returns the attributes that are set and removed in the new entry
+    """
+    values = {attribute: value for attribute, value in new.items()
+              if old.get(attribute, _missing) != value}
+    unset = [attribute for attribute in old if attribute not in new]
+    return values, unset
+
+
+def diff(first, second):
+    """
+    returns the changes that turn the first inventory into the second.
+    The hosts are compared by their hashes first, so the inventories are
+    only loaded if they differ.
+
+    :param first: the first inventory
+    :type first: Inventory
+    :param second: the second inventory
+    :type second: Inventory
+    :return: the changes
+    :rtype: ChangeSet
+    """
+    old, new = first.digests(), second.digests()
+    changes = ChangeSet()
+    names = [name for name, value in new.items() if old.get(name) != value]
+    changes.removed = [name for name in old if name not in new]
+    for name in names:
+        entry = second.data[name]
+        if name not in old:
+            changes.added[name] = entry
+            continue
+        values, unset = _compare(first.data[name], entry)
+        if values:
+            changes.changed[name] = values
+        if unset:
+            changes.unset[name] = unset
+    return changes
+
+
+def changed(old, new):
+    """
+    returns the names of the hosts that are added, removed or changed
+    between two versions of the hosts
+
+    :param old: the hosts before
+    :type old: dict
+    :param new: the hosts after
+    :type new: dict
+    :return: the names
+    :rtype: set
+    """
+    names = {name for name in old if name not in new}
+    for name, entry in new.items():
+        if old.get(name) != entry:
+            names.add(name)
+    return names
+
+
+def merge(base, ours, theirs):
+    """
+    merges the changes from base to theirs into ours. A change conflicts
+    if ours changes the same attribute of the same host to a different
+    value, or if one side removes a host the other changes. In a
+    conflict the value of ours is kept.
+
+    :param base: the common ancestor
+    :type base: Inventory
+    :param ours: the inventory the changes are merged into
+    :type ours: Inventory
+    :param theirs: the inventory with the changes to merge
+    :type theirs: Inventory
+    :return: the changes to apply to ours and the conflicts, each a dict
+             with the host, the attribute and the values of both sides
+    :rtype: tuple
+    """
+    mine, other = diff(base, ours), diff(base, theirs)
+    result = ChangeSet()
+    conflicts = []
+
+    def conflict(name, attribute, value, their_value):
+        conflicts.append({"host": name, "attribute": attribute,
+                          "ours": value, "theirs": their_value})
+
+    for name, entry in other.added.items():
+        if name not in mine.added:
+            result.added[name] = entry
+            continue
+        values, unset = _compare(mine.added[name], entry)
+        for attribute, value in values.items():
+            conflict(name, attribute,
+                     mine.added[name].get(attribute), value)
+        for attribute in unset:
+            conflict(name, attribute, mine.added[name][attribute], None)
+
+    for name in other.removed:
+        if name in mine.changed or name in mine.unset:
+            conflict(name, None, "changed", "removed")
+        elif name not in mine.removed:
+            result.removed.append(name)
+
+    for name in dict.fromkeys(list(other.changed) + list(other.unset)):
+        if name in mine.removed:
+            conflict(name, None, "removed", "changed")
+            continue
+        our_values = mine.changed.get(name, {})
+        our_unset = mine.unset.get(name, [])
+        for attribute, value in other.changed.get(name, {}).items():
+            if attribute in our_unset:
+                conflict(name, attribute, None, value)
+            elif attribute not in our_values:
+                result.changed.setdefault(name, {})[attribute] = value
+            elif our_values[attribute] != value:
+                conflict(name, attribute, our_values[attribute], value)
+        for attribute in other.unset.get(name, []):
+            if attribute in our_values:
+                conflict(name, attribute, our_values[attribute], None)
+            elif attribute not in our_unset:
+                result.unset.setdefault(name, []).append(attribute)
+    return result, conflicts
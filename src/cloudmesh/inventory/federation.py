@@ -0,0 +1,204 @@
+"""
+Queries over all inventory files in a directory such as ~/.cloudmesh.
+
+The inventory files are inventory.yaml, the files inventory-<cluster>.yaml
+that inventory add cluster creates, and inventories with the same names
+in the SQLite and columnar formats. The names of the hosts of each file
+are kept in the index file inventory.federation in the same directory,
+so where a host is defined is answered without opening the inventory
+files. The names of a file are valid as long as its modification time,
+its size and the size of its journal are unchanged. The files that
+changed, and the files whose hosts are listed, are read in parallel by
+a pool of processes.
+
+    federation = Federation()
+    federation.where("red01")
+    federation.hosts(where="service=manager")
+"""
+import glob
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from cloudmesh.common.util import path_expand
+from cloudmesh.inventory import diff
+from cloudmesh.inventory import storage
+from cloudmesh.inventory.inventory import Inventory
+from cloudmesh.inventory.names import NameMatcher
+from cloudmesh.inventory.query import Query
+
+PATTERN = "inventory*"
+
+EXTENSIONS = (".yaml", ".db", ".columnar")
+
+INDEX = "inventory.federation"
+
+
+def _names(filename):
+    """
+    returns the names of the hosts of the inventory file, from its
+    metadata if it is valid
+    """
+    return sorted(Inventory(filename).metadata(names=True)["names"], key=str)
+
+
+def _select(filename, names=None, where=None):
+    """
+    returns the hosts of the inventory file that match the hostlist
+    pattern and the query
+    """
+    i = Inventory(filename)
+    matcher = None if names is None else NameMatcher(names)
+    query = None if where is None else Query(where)
+    if matcher is None:
+        selected = i.data
+    else:
+        selected = matcher.select(i.data)
+    return [(name, dict(i.data[name])) for name in selected
+            if query is None or query.match(i.data[name])]
+
+
+def _map(function, calls):
+    """
+    calls the function with each of the arguments, in a pool of processes
+    if there is more than one call
+
+    :param function: a function of the module, so it can be pickled
+    :type function: callable
+    :param calls: the arguments of each call
+    :type calls: list of tuples
+    :return: the results in the order of the calls
+    :rtype: list
+    """
+    if len(calls) <= 1:
+        return [function(*arguments) for arguments in calls]
+    workers = min(len(calls), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(function, *zip(*calls)))
+
+
+class Federation(object):
+    """
+    All inventory files of a directory
+    """
+
+    def __init__(self, directory="~/.cloudmesh"):
+        """
+        :param directory: the directory with the inventory files
+        :type directory: str
+        """
+        self.directory = path_expand(directory)
+        self.filename = os.path.join(self.directory, INDEX)
+        self._files = None
+        self._owners = None
+        self._signatures = None
+
+    def files(self):
+        """
+        returns the inventory files of the directory
+
+        :return: the names of the files
+        :rtype: list
+        """
+        return sorted(
+            filename
+            for filename in glob.glob(os.path.join(self.directory, PATTERN))
+            if filename.endswith(EXTENSIONS) and os.path.isfile(filename))
+
+    def index(self):
+        """
+        returns the names of the hosts of each inventory file. The names
+        of the files that changed since the index was written are read
+        again and the index is updated.
+
+        :return: the names of the hosts by file
+        :rtype: dict
+        """
+        try:
+            with open(self.filename) as stream:
+                cached = json.load(stream)
+        except (OSError, ValueError):
+            cached = {}
+        files = {}
+        stale = []
+        for filename in self.files():
+            key = list(diff.signature(filename))
+            entry = cached.get(filename)
+            if entry is not None and entry["signature"] == key:
+                files[filename] = entry
+            else:
+                files[filename] = {"signature": key}
+                stale.append(filename)
+        for filename, names in zip(
+                stale, _map(_names, [(filename,) for filename in stale])):
+            files[filename]["names"] = names
+        if stale or set(cached) != set(files):
+            storage.atomic_write(
+                self.filename, json.dumps(files).encode("utf-8"))
+        signatures = {filename: entry["signature"]
+                      for filename, entry in files.items()}
+        if signatures != self._signatures:
+            self._signatures = signatures
+            self._files = {filename: set(entry["names"])
+                           for filename, entry in files.items()}
+            self._owners = None
+        return self._files
+
+    @property
+    def owners(self):
+        """
+        the inventory files that define each host
+
+        :return: the names of the files by host
+        :rtype: dict
+        """
+        files = self.index()
+        if self._owners is None:
+            owners = {}
+            for filename, names in files.items():
+                for name in names:
+                    owners.setdefault(name, []).append(filename)
+            self._owners = owners
+        return self._owners
+
+    def where(self, names):
+        """
+        returns the inventory files that define the hosts
+
+        :param names: the host names as hostlist pattern, such as red[01-03]
+        :type names: str
+        :return: the names of the files by host, for the hosts that are
+                 defined
+        :rtype: dict
+        """
+        owners = self.owners
+        return {name: owners[name]
+                for name in NameMatcher(names).select(owners)}
+
+    def hosts(self, names=None, where=None):
+        """
+        returns the hosts of all inventory files that match the hostlist
+        pattern and the query. Only the files that define one of the
+        names are read.
+
+        :param names: the host names as hostlist pattern, all if None
+        :type names: str
+        :param where: a query such as "service=manager", see
+                      cloudmesh.inventory.query
+        :type where: str
+        :return: the file, the name and the entry of each host
+        :rtype: list of tuples
+        """
+        if where is not None:
+            # a wrong query is reported before any file is read
+            Query(where)
+        files = self.index()
+        if names is not None:
+            matcher = NameMatcher(names)
+            files = {filename: found for filename, found in files.items()
+                     if matcher.select(found)}
+        found = _map(_select, [(filename, names, where)
+                               for filename in files])
+        return [(filename, name, entry)
+                for filename, hosts in zip(files, found)
+                for name, entry in hosts]
@@ -0,0 +1,313 @@
+import ipaddress
+from bisect import bisect_left
+from bisect import bisect_right
+from bisect import insort
+
+
+def address(value):
+    """
+    converts an IP address to a (version, integer) pair
+
+    :param value: the address, such as 10.1.0.1 or fe80::1
+    :type value: str
+    :return: the version and the integer or None if it is not an address
+    :rtype: tuple
+    """
+    if not value or isinstance(value, bool) or \
+            not isinstance(value, (str, int)):
+        return None
+    try:
+        ip = ipaddress.ip_address(value)
+    except ValueError:
+        return None
+    return ip.version, int(ip)
+
+
+class IPIndex(object):
+    """
+    An index over the ip attribute of the inventory entries.
+
+    The addresses are kept as integers, separately for IPv4 and IPv6.
+    A dict maps each address to the hosts that own it, and a sorted list
+    of the addresses answers range and network queries with a binary
+    search. Entries whose ip is not a valid address are not indexed.
+    """
+
+    def __init__(self):
+        self.owners = {}
+        self.sorted = {4: [], 6: []}
+
+    def build(self, data):
+        """
+        (re)builds the index from the given data
+
+        :param data: the inventory data
+        :type data: dict
+        """
+        self.owners = {}
+        for name, entry in data.items():
+            key = address(entry.get("ip"))
+            if key is not None:
+                self.owners.setdefault(key, set()).add(name)
+        self.sorted = {4: [], 6: []}
+        for version, number in self.owners:
+            self.sorted[version].append(number)
+        for numbers in self.sorted.values():
+            numbers.sort()
+
+    def insert(self, name, value):
+        key = address(value)
+        if key is None:
+            return
+        names = self.owners.get(key)
+        if names is None:
+            self.owners[key] = {name}
+            insort(self.sorted[key[0]], key[1])
+        else:
+            names.add(name)
+
+    def insert_many(self, hosts):
+        """
+        adds the addresses of many hosts and sorts the new addresses
+        once instead of inserting them one by one
+
+        :param hosts: the names and the ip values of the hosts
+        :type hosts: iterable of tuples
+        """
+        added = {4: [], 6: []}
+        for name, value in hosts:
+            key = address(value)
+            if key is None:
+                continue
+            names = self.owners.get(key)
+            if names is None:
+                self.owners[key] = {name}
+                added[key[0]].append(key[1])
+            else:
+                names.add(name)
+        for version, numbers in added.items():
+            if numbers:
+                # sort merges the sorted list with the sorted new run
+                numbers.sort()
+                self.sorted[version].extend(numbers)
+                self.sorted[version].sort()
+
+    def discard(self, name, value):
+        key = address(value)
+        names = self.owners.get(key)
+        if names is None:
+            return
+        names.discard(name)
+        if not names:
+            del self.owners[key]
+            numbers = self.sorted[key[0]]
+            del numbers[bisect_left(numbers, key[1])]
+
+    def owner(self, value):
+        """
+        returns the hosts that own the address
+
+        :param value: the address
+        :type value: str
+        :return: the names of the hosts
+        :rtype: set
+        """
+        return set(self.owners.get(address(value), ()))
+
+    def range(self, first, last):
+        """
+        returns the hosts whose address lies between first and last,
+        both included
+
+        :param first: the first address
+        :type first: str or ipaddress.IPv4Address or ipaddress.IPv6Address
+        :param last: the last address
+        :type last: str or ipaddress.IPv4Address or ipaddress.IPv6Address
+        :return: the names of the hosts
+        :rtype: set
+        """
+        first = ipaddress.ip_address(first)
+        last = ipaddress.ip_address(last)
+        if first.version != last.version:
+            raise ValueError("{:} and {:} are of different versions".format(
+                first, last))
+        numbers = self.sorted[first.version]
+        names = set()
+        start = bisect_left(numbers, int(first))
+        end = bisect_right(numbers, int(last))
+        for number in numbers[start:end]:
+            names |= self.owners[(first.version, number)]
+        return names
+
+    def network(self, value):
+        """
+        returns the hosts whose address lies in the network
+
+        :param value: the network, such as 10.1.0.0/16
+        :type value: str or ipaddress.IPv4Network or ipaddress.IPv6Network
+        :return: the names of the hosts
+        :rtype: set
+        """
+        network = ipaddress.ip_network(value, strict=False)
+        return self.range(network.network_address, network.broadcast_address)
+
+    def duplicates(self):
+        """
+        returns the addresses that are owned by more than one host
+
+        :return: the addresses and the names of their hosts
+        :rtype: dict
+        """
+        return {str(ipaddress.IPv6Address(number) if version == 6
+                    else ipaddress.IPv4Address(number)): names
+                for (version, number), names in self.owners.items()
+                if len(names) > 1}
+
+
+class AttributeIndex(object):
+    """
+    A hash index over selected attributes of the inventory entries.
+
+    For each indexed attribute the index keeps a dict that maps a value
+    to the set of host names carrying that value. Lookups therefore cost
+    time proportional to the number of matches and not to the size of
+    the inventory. Values that are lists or dicts are frozen into
+    hashable tuples so that attributes such as services can be indexed
+    as well. The ip attribute is in addition kept in an IPIndex.
+    """
+
+    default = ["service", "cluster", "tag", "status"]
+
+    def __init__(self, attributes=None):
+        self.attributes = list(attributes or self.default)
+        self.values = {}
+        for attribute in self.attributes:
+            self.values[attribute] = {}
+        self.addresses = IPIndex()
+
+    @staticmethod
+    def key(value):
+        """
+        returns a hashable representation of the value
+
+        :param value: the value of an attribute
+        :type value: object
+        :return: the value or a frozen copy of it
+        :rtype: object
+        """
+        if isinstance(value, list):
+            return tuple(AttributeIndex.key(v) for v in value)
+        elif isinstance(value, dict):
+            return tuple(sorted((k, AttributeIndex.key(v))
+                                for k, v in value.items()))
+        return value
+
+    def indexed(self, attribute):
+        return attribute in self.values
+
+    def build(self, data):
+        """
+        (re)builds the index from the given data
+
+        :param data: the inventory data
+        :type data: dict
+        """
+        for attribute in self.attributes:
+            self.values[attribute] = {}
+        for name, entry in data.items():
+            for attribute, values in self.values.items():
+                if attribute in entry:
+                    key = self.key(entry[attribute])
+                    values.setdefault(key, set()).add(name)
+        self.addresses.build(data)
+
+    def insert(self, name, entry):
+        """
+        adds all indexed attributes of the entry
+
+        :param name: the host name
+        :type name: str
+        :param entry: the entry of the host
+        :type entry: dict
+        """
+        for attribute, values in self.values.items():
+            if attribute in entry:
+                key = self.key(entry[attribute])
+                values.setdefault(key, set()).add(name)
+        self.addresses.insert(name, entry.get("ip"))
+
+    def insert_many(self, hosts):
+        """
+        adds all indexed attributes of many entries
+
+        :param hosts: the names and the entries of the hosts
+        :type hosts: list of tuples
+        """
+        for attribute, values in self.values.items():
+            for name, entry in hosts:
+                if attribute in entry:
+                    key = self.key(entry[attribute])
+                    values.setdefault(key, set()).add(name)
+        self.addresses.insert_many(
+            (name, entry.get("ip")) for name, entry in hosts)
+
+    def remove(self, name, entry):
+        """
+        removes all indexed attributes of the entry
+
+        :param name: the host name
+        :type name: str
+        :param entry: the entry of the host
+        :type entry: dict
+        """
+        for attribute in self.values:
+            if attribute in entry:
+                self.discard(name, attribute, entry[attribute])
+        self.addresses.discard(name, entry.get("ip"))
+
+    def discard(self, name, attribute, value):
+        values = self.values[attribute]
+        key = self.key(value)
+        names = values.get(key)
+        if names is not None:
+            names.discard(name)
+            if not names:
+                del values[key]
+
+    def update(self, name, attribute, old, value, exists=True):
+        """
+        moves the host from the old value to the new value
+
+        :param name: the host name
+        :type name: str
+        :param attribute: the attribute that is changed
+        :type attribute: str
+        :param old: the previous value
+        :type old: object
+        :param value: the new value
+        :type value: object
+        :param exists: False if the attribute was not set before
+        :type exists: bool
+        """
+        if attribute == "ip":
+            if exists:
+                self.addresses.discard(name, old)
+            self.addresses.insert(name, value)
+        if attribute not in self.values:
+            return
+        if exists:
+            self.discard(name, attribute, old)
+        self.values[attribute].setdefault(self.key(value), set()).add(name)
+
+    def lookup(self, attribute, value):
+        """
+        returns the set of host names whose attribute equals the value
+
+        :param attribute: an indexed attribute
+        :type attribute: str
+        :param value: the value to look up
+        :type value: object
+        :return: the names of the matching hosts
+        :rtype: set
+        """
+        return self.values[attribute].get(self.key(value), set())
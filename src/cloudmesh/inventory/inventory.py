@@ -1,35 +1,112 @@
+import codecs
+import functools
 import os.path
 import sys
+import threading
+from contextlib import contextmanager
 from pathlib import Path
 
 import hostlist
-import yaml
-from cloudmesh.common.Printer import Printer
-from cloudmesh.common.Shell import Shell
 from cloudmesh.common.console import Console
 from cloudmesh.common.parameter import Parameter
 from cloudmesh.common.util import banner
 from cloudmesh.common.util import path_expand
-from cloudmesh.common.variables import Variables
+from cloudmesh.inventory.profiling import profile
+from cloudmesh.inventory.record import HostRecord
+from cloudmesh.inventory.record import columns
+
+
+def _locked(method):
+    """
+    runs the method while the inventory is locked, so the watcher thread
+    does not replace or change the hosts while they are used
+    """
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+
+    return wrapper
 
 
 class Inventory(object):
 
-    def info(self):
+    # the default columns of the hosts, see cloudmesh.inventory.record
+    order = list(columns)
+
+    def info(self, measure=False):
+        """
+        prints information about the inventory. The information is taken
+        from the metadata, so the inventory is not loaded unless it has
+        been changed by another program since the metadata was written.
+
+        :param measure: if True the cold and warm load times are measured
+        :type measure: bool
+        """
         self.filename = path_expand(self.filename)
+        if measure and self.storage.kind == "yaml":
+            self.storage.measure(self.timing)
+        meta = self.metadata()
+        timing = dict(meta.get("timing") or {})
+        timing.update({key: value for key, value in self.timing.items()
+                       if value is not None})
 
         banner("Configuration")
         Console.ok('Data File: {:}'.format(self.filename))
         Console.ok('Object Attributes: {:}'.format(', '.join(self.order)))
-        Console.ok('Objects: {:}'.format(len(self.data)))
+        Console.ok('Objects: {:}'.format(meta["hosts"]))
+        Console.ok('Clusters: {:}'.format(', '.join(meta["clusters"])))
+        Console.ok('Schema: {:}'.format(meta["schema"]))
+        if "load" in timing:
+            Console.ok('Load: {:} from {:}'.format(
+                self._ms(timing.get("load")), timing.get("source")))
+        if self.storage.kind == "yaml":
+            Console.ok('Load (cold, yaml): {:}'.format(
+                self._ms(timing.get("parse"))))
+            Console.ok('Load (warm, snapshot): {:}'.format(
+                self._ms(timing.get("snapshot"))))
         print(70 * "#")
 
-    def __init__(self, filename=None):
+    def metadata(self, names=False):
+        """
+        returns the number of hosts, the clusters and the schema version of
+        the inventory. If the inventory is not yet loaded they are read
+        from the metadata of the storage.
+
+        :param names: if True the metadata includes the set of host names
+        :type names: bool
+        :return: the metadata
+        :rtype: dict
+        """
+        from cloudmesh.inventory import metadata
+        if self._data is None:
+            meta = self.storage.metadata(names=names)
+            if meta is not None:
+                return meta
+        meta = metadata.summary(self.data)
+        if names:
+            meta["names"] = set(self.data)
+        return meta
+
+    @staticmethod
+    def _ms(seconds):
+        if seconds is None:
+            return "unknown"
+        return "{:.1f} ms".format(seconds * 1000)
+
+    def __init__(self, filename=None, backend=None):
 
         if filename is None:
+            from cloudmesh.common.variables import Variables
             variables = Variables()
+            backend = backend or variables["inventory_backend"]
+            if backend == "sqlite":
+                default = "~/.cloudmesh/inventory.db"
+            else:
+                default = "~/.cloudmesh/inventory.yaml"
             self.filename = \
-                variables["inventory"] or path_expand("~/.cloudmesh/inventory.yaml")
+                variables["inventory"] or path_expand(default)
 
         else:
             self.filename = path_expand(filename)
@@ -69,43 +146,74 @@ class Inventory(object):
             "Keyfile"]
         # "Status"
 
-        self.order = [
-            "host",
-            # "name",
-            # "type",
-            "tag",
-            "cluster",
-            # "label",
-            "service",
-            "services",
-            "ip",
-            "dns",
-            "router",
-            "locale",
-            "timezone",
-            # "project",
-            "owners",
-            "comment",
-            "description",
-            "keyfile"]
-        # "status"
+        self.order = list(Inventory.order)
 
         self.entry = {}
         for key in self.order:
             self.entry[key] = ""
 
-        self.data = {}
+        self._data = None
+        self._index = None
+        self._batch = 0
+        self._dirty = False
+        self._changes = []
+        self._callbacks = []
+        self._watcher = None
+        self._lock = threading.RLock()
+        self.timing = {}
 
         # self.filename = path_expand("~/.cloudmesh/inventory.yaml")
         # if not os.path.exists(self.filename):
         #     source = Path(os.path.dirname(etc.__file__) + "/inventory.yaml")
         #     shutil.copyfile(source, self.filename)
 
-        if not os.path.exists(self.filename):
+        from cloudmesh.inventory import storage
+        exists = os.path.exists(self.filename)
+        self.storage = storage.open_storage(self.filename, backend)
+        if not exists:
             Path(self.filename).touch()
+            self.data = {}
             self.save()
+            if self.storage.kind != "yaml":
+                # the hosts are written through the mapping of the storage
+                self.read()
+
+    @property
+    @_locked
+    def data(self):
+        """
+        the hosts of the inventory. They are loaded on first access.
+
+        :return: the hosts
+        :rtype: dict
+        """
+        if self._data is None:
+            self.read()
+        return self._data
+
+    @data.setter
+    def data(self, data):
+        # changes to data that is replaced can not be journaled or merged
+        self._data = data
+        self._index = None
+        self._changes = None
+
+    @property
+    @_locked
+    def index(self):
+        """
+        the attribute index of the inventory. It is build on first use and
+        kept up to date by add, set, unset, delete and clone.
 
-        self.read(self.filename)
+        :return: the attribute index
+        :rtype: AttributeIndex
+        """
+        from cloudmesh.inventory.index import AttributeIndex
+        if self._index is None:
+            data = self.data
+            self._index = AttributeIndex()
+            self._index.build(data)
+        return self._index
 
     def has_host(self, host):
         """
@@ -116,26 +224,124 @@ class Inventory(object):
         :return: If host is in specified inventory
         :rtype: Bool
         """
+        if self._data is None:
+            meta = self.storage.metadata(names=True)
+            if meta is not None:
+                return host in meta["names"]
         return host in self.data
 
+    @profile.timed("find")
+    @_locked
     def find(self, **kwargs):
         """
-        return the list of items eapal to the arguments set
+        return the list of items eqal to the arguments set.
 
-        :param kwargs:
-        :type kwargs:
-        :return:
-        :rtype:
+        Attributes that are indexed are looked up in the index, starting
+        with the smallest candidate set. All other attributes are checked
+        by scanning the candidates.
+
+        :param kwargs: the attributes and the values to match
+        :type kwargs: dict
+        :return: the matching entries as dicts
+        :rtype: list
         """
+        if self._data is None:
+            self.read()
+        found = self.storage.find(kwargs)
+        if found is not None:
+            return [dict(entry) for entry in found]
+
+        index = self.index
+        candidates = None
+        scan = {}
+        for attribute, value in kwargs.items():
+            if index.indexed(attribute):
+                names = index.lookup(attribute, value)
+                if candidates is None or len(names) < len(candidates):
+                    if candidates is not None:
+                        names = names & candidates
+                    candidates = names
+                else:
+                    candidates = candidates & names
+                if not candidates:
+                    return []
+            else:
+                scan[attribute] = value
+
+        if candidates is None:
+            candidates = self.data
+        else:
+            # the saved inventory is sorted by host name
+            candidates = sorted(candidates, key=str)
+
+        missing = object()
         found = []
-        for entry in self.data:
-            match = True
-            for t in kwargs:
-                match = match and kwargs[t] == self.data[entry][t]
-            if match:
-                found.append(self.data[entry])
+        for name in candidates:
+            entry = self.data[name]
+            if all(entry.get(t, missing) == v for t, v in scan.items()):
+                found.append(dict(entry))
+        profile.count("hosts found", len(found))
         return found
 
+    @profile.timed("query")
+    @_locked
+    def query(self, expression):
+        """
+        returns the hosts that match the query expression, for example
+        "service=worker and cluster in (red,blue)". See
+        cloudmesh.inventory.query for the syntax.
+
+        :param expression: the query
+        :type expression: str
+        :return: the matching hosts by name
+        :rtype: dict
+        """
+        from cloudmesh.inventory.query import Query
+        return {name: dict(entry) for name, entry in
+                Query(expression).select(self.data, self.index)}
+
+    @profile.timed("sort")
+    @_locked
+    def sort(self, columns, limit=None, match=None):
+        """
+        returns the hosts in the natural order of the columns, see
+        cloudmesh.inventory.sorting. With a limit only the first hosts
+        are kept while the hosts are read. If the index is built and
+        covers the first column, the hosts are taken from it in order.
+
+        Example:
+
+            i.sort("ip", limit=20, match=lambda name, entry:
+                   entry.get("service") == "worker")
+
+        :param columns: the columns, as list or comma separated string
+        :type columns: list or str
+        :param limit: the number of hosts to return, all if None
+        :type limit: int
+        :param match: a function of the name and the entry that selects
+                      the hosts, all if None
+        :type match: callable
+        :return: the names and the entries of the hosts
+        :rtype: list of tuples
+        """
+        from cloudmesh.inventory import sorting
+        if isinstance(columns, str):
+            columns = columns.split(",")
+        data = self.data
+        if self._index is not None:
+            found = sorting.indexed(data, self._index, columns,
+                                    limit=limit, match=match)
+        else:
+            found = None
+        if found is None:
+            hosts = data.items()
+            if match is not None:
+                hosts = ((name, entry) for name, entry in hosts
+                         if match(name, entry))
+            found = sorting.top(hosts, columns, limit=limit)
+        return [(name, dict(entry)) for name, entry in found]
+
+    @_locked
     def set(self, name, attribute, value):
         """
         sets for the named element the attribute to the value
@@ -146,8 +352,79 @@ class Inventory(object):
         :return:
         :rtype: void
         """
-        self.data[name][attribute] = value
+        from cloudmesh.inventory import validation
+        entry = self.data[name]
+        violations = validation.validator().values(name, {attribute: value})
+        if violations:
+            raise ValueError(validation.message(violations))
+        if attribute == "ip":
+            self._check_ips([(name, value)])
+        if self._index is not None:
+            self._index.update(name, attribute,
+                               entry.get(attribute), value,
+                               exists=attribute in entry)
+        entry[attribute] = value
+        self.data[name] = entry
+        self._record(("set", name, attribute, value))
+        self._dirty = True
 
+    @_locked
+    def unset(self, name, attribute):
+        """
+        removes the attribute from the named element
+
+        :param name: the name of the host
+        :type name: str
+        :param attribute: the attribute
+        :type attribute: str
+        """
+        if attribute == "host":
+            raise ValueError("the attribute host can not be removed")
+        entry = self.data[name]
+        if attribute not in entry:
+            return
+        if self._index is not None:
+            self._index.remove(name, entry)
+        del entry[attribute]
+        self.data[name] = entry
+        if self._index is not None:
+            self._index.insert(name, entry)
+        self._record(("unset", name, attribute))
+        self._dirty = True
+
+    def owner(self, ip):
+        """
+        returns the names of the hosts that have the ip address
+
+        :param ip: the address
+        :type ip: str
+        :return: the names
+        :rtype: set
+        """
+        return self.index.addresses.owner(ip)
+
+    def _check_ips(self, hosts):
+        """
+        raises a ValueError if one of the addresses is already used by
+        another host or given to more than one of the hosts
+
+        :param hosts: the names of the hosts and their new addresses
+        :type hosts: iterable of tuples
+        """
+        from cloudmesh.inventory.index import address
+        addresses = self.index.addresses
+        given = {}
+        for name, ip in hosts:
+            if address(ip) is None:
+                continue
+            owners = (addresses.owner(ip) | given.get(ip, set())) - {name}
+            if owners:
+                raise ValueError(
+                    "The ip {:} of {:} is already used by {:}".format(
+                        ip, name, ", ".join(sorted(owners, key=str))))
+            given.setdefault(ip, set()).add(name)
+
+    @_locked
     def get(self, name, attribute):
         """
         returns the value of the attribute of the named element
@@ -199,6 +476,7 @@ class Inventory(object):
         """
         order = order or self.order
         header = header or self.header
+        from cloudmesh.common.Printer import Printer
         print(Printer.write(self.data, order=order, header=header))
 
     def workers(self):
@@ -223,64 +501,702 @@ class Inventory(object):
         else:
             return manager
 
+    @profile.timed("read")
+    @_locked
     def read(self, filename=None):
-        if filename is not None:
-            self.filename = filename
+        from cloudmesh.inventory import storage
+        if filename is not None and path_expand(filename) != self.filename:
+            self.filename = path_expand(filename)
+            self.storage = storage.open_storage(self.filename)
 
         # if not os.path.isfile(filename):
         #    self.save(filename)
-        stream = open(self.filename, "r")
-        self.data = yaml.safe_load(stream)
-        stream.close()
+        self.data, timing = self.storage.load()
+        self._changes = []
+        if profile.enabled:
+            profile.count("hosts read", len(self._data))
+        if timing["source"] == "snapshot":
+            timing["snapshot"] = timing["load"]
+        self.timing = timing
+
+    @profile.timed("refresh")
+    def refresh(self):
+        """
+        applies the changes other processes have saved since the hosts
+        were loaded. Records appended to the journal are applied one by
+        one, otherwise the file is loaded again and compared with the
+        hosts in memory. An inventory that is not loaded or has unsaved
+        changes is left as it is. The names of the changed hosts are
+        passed to the callbacks registered with watch.
+
+        :return: the names of the hosts that were added, changed or
+                 removed
+        :rtype: set
+        """
+        from cloudmesh.inventory import diff
+        from cloudmesh.inventory import journal
+        with self._lock:
+            if self._data is None or self._dirty or self._changes != []:
+                return set()
+            records = self.storage.poll()
+            if records is None:
+                old, index = self._data, self._index
+                self.read()
+                names = diff.changed(old, self._data)
+                before = {name: old.get(name) for name in names}
+            else:
+                names = set()
+                for record in records:
+                    names.update(journal.hosts(record, self._data))
+                before = {name: HostRecord(self._data[name])
+                          for name in names if name in self._data}
+                index = self._index
+                for record in records:
+                    self._data = journal.apply(self._data, record)
+            if index is not None:
+                for name in names:
+                    if before.get(name) is not None:
+                        index.remove(name, before[name])
+                    if name in self._data:
+                        index.insert(name, self._data[name])
+            self._index = index
+        if not names:
+            return names
+        for callback in list(self._callbacks):
+            callback(self, names)
+        return names
+
+    def watch(self, callback=None, interval=1.0):
+        """
+        keeps the inventory current by calling refresh every interval
+        seconds in a background thread. The callback is called with the
+        inventory and the names of the changed hosts from that thread.
+        The hosts are changed while the inventory is locked, so find,
+        query, sort, iter_hosts and the mutations see them either before
+        or after a refresh.
+
+        :param callback: the function to call on changes
+        :type callback: callable
+        :param interval: the seconds between two polls
+        :type interval: float
+        :return: the watcher thread
+        :rtype: Watcher
+        """
+        from cloudmesh.inventory.watch import Watcher
+        if callback is not None:
+            self._callbacks.append(callback)
+        if self._watcher is None:
+            # the hosts are loaded now, so later changes are detected
+            if self._data is None:
+                self.read()
+            self._watcher = Watcher(self, interval=interval)
+            self._watcher.start()
+        return self._watcher
 
+    def unwatch(self, callback=None):
+        """
+        removes the callback, or stops watching if no callback is given
+
+        :param callback: the function registered with watch
+        :type callback: callable
+        """
+        if callback is not None:
+            self._callbacks.remove(callback)
+            return
+        if self._watcher is not None:
+            self._watcher.stop()
+            self._watcher = None
+        self._callbacks = []
+
+    @profile.timed("save")
+    @_locked
     def save(self, filename=None, format="yaml"):
-        if filename is None:
+        """
+        writes the inventory to the file. Inside of a batch the write to
+        the inventory file is deferred until the batch ends.
+
+        :param filename: the file to write to, defaults to the inventory file
+        :type filename: str
+        :param format: the format of the file
+        :type format: str
+        """
+        from cloudmesh.inventory import storage
+        from cloudmesh.inventory import streaming
+        if filename is None or path_expand(filename) == self.filename:
+            if self._batch:
+                self._dirty = True
+                return
+            if format == "yaml" or self.storage.kind != "yaml":
+                with self.storage.lock():
+                    if self._changes is None or \
+                            not self.storage.append(self.data, self._changes):
+                        self._write()
+                self._changes = []
+                self._dirty = False
+                return
             filename = self.filename
-        with open(filename, 'w') as yaml_file:
-            yaml_file.write(self.list(format=format))
+        if format in streaming.writers:
+            with storage.atomic_writer(path_expand(filename)) as stream:
+                self.write(codecs.getwriter("utf-8")(stream), format=format)
+            return
+        content = self.list(format=format)
+        storage.atomic_write(path_expand(filename), content.encode("utf-8"))
+
+    @profile.timed("compact")
+    @_locked
+    def compact(self):
+        """
+        writes the inventory file completely, which also removes the
+        journal of a YAML inventory
+        """
+        with self.storage.lock():
+            self._write()
+        self._changes = []
+        self._dirty = False
+
+    def _write(self):
+        if self.storage.changed() and self._changes is not None:
+            self._merge()
+        self.storage.save(self.data, timing=self.timing)
+
+    def _record(self, change):
+        """
+        remembers a change for the journal and for merging with writes
+        of other processes
+
+        :param change: the change, such as ("set", host, attribute, value)
+        :type change: tuple
+        """
+        if self._changes is not None:
+            self._changes.append(change)
+
+    def _merge(self):
+        """
+        reads the inventory file that another process has written since
+        it was read and applies the changes made through add, set,
+        delete and clone again, so that concurrent writers only overwrite
+        each other for the same attributes of the same hosts. If a change
+        can not be applied, for example because the other process has
+        given its ip to another host, the hosts and the changes are left
+        as they were, so the file is merged again on the next save.
+        """
+        changes = self._changes
+        saved = (self._data, self._index, self._dirty, self.timing,
+                 self.storage.mark())
+        self.read()
+        try:
+            for change in changes:
+                kind, name = change[0], change[1]
+                if kind == "set":
+                    if name in self.data:
+                        self.set(name, change[2], change[3])
+                elif kind == "unset":
+                    if name in self.data:
+                        self.unset(name, change[2])
+                elif kind == "delete":
+                    if name in self.data:
+                        self.delete(name)
+                elif kind == "add":
+                    self.add_many([change[2]])
+                elif kind == "range":
+                    self._add_group(change[2])
+                elif kind == "profile":
+                    self.define(name, **change[2])
+        except BaseException:
+            (self._data, self._index, self._dirty, self.timing,
+             mark) = saved
+            self._changes = changes
+            self.storage.reset(mark)
+            raise
+
+    def digests(self):
+        """
+        returns a hash of the entry of each host, see
+        cloudmesh.inventory.diff. The hashes of a YAML inventory without
+        unsaved changes are kept beside the inventory file.
+
+        :return: the hashes by host name
+        :rtype: dict
+        """
+        from cloudmesh.inventory import diff
+        if self.storage.kind != "yaml" or self._changes != [] or \
+                self._dirty:
+            return diff.digests(self.data)
+        with self.storage.lock(shared=True):
+            key = diff.signature(self.filename)
+            hashes = diff.read(self.filename, key)
+            if hashes is None:
+                if self._data is not None and self.storage.changed():
+                    self.read()
+                hashes = diff.digests(self.data)
+                diff.write(self.filename, key, hashes)
+        return hashes
+
+    @_locked
+    def iter_hosts(self):
+        """
+        yields the hosts one at a time. If the inventory is not yet loaded
+        and kept in a YAML file, the file is parsed event by event in the
+        order of the file, so only one entry is held in memory. Changes
+        in the journal require the inventory to be loaded. A columnar
+        inventory yields its hosts in the order in which they are stored.
+
+        :return: the name and the entry of each host
+        :rtype: generator of tuples
+        """
+        from cloudmesh.inventory import journal
+        from cloudmesh.inventory import storage
+        from cloudmesh.inventory import streaming
+        if self._data is None and self.storage.kind == "yaml" and \
+                not journal.size(self.filename):
+            return streaming.iter_hosts(self.filename)
+        if self.storage.kind == "columnar":
+            # the hosts are stored sorted by name
+            return self.data.items()
+        if self.storage.kind == "yaml":
+            # refresh changes the loaded hosts in place, so the entries
+            # are taken while the inventory is locked
+            return iter(list(storage.sorted_hosts(self.data)))
+        return storage.sorted_hosts(self.data)
+
+    @profile.timed("write")
+    def write(self, stream, format="yaml", order=None, limit=None, offset=0):
+        """
+        writes the hosts one at a time to the stream
+
+        :param stream: the text stream, such as sys.stdout
+        :type stream: file
+        :param format: yaml, json or table
+        :type format: str
+        :param order: the columns of the table
+        :type order: list
+        :param limit: the number of hosts to write, all if None
+        :type limit: int
+        :param offset: the number of hosts to skip
+        :type offset: int
+        :return: the number of hosts written
+        :rtype: int
+        """
+        from cloudmesh.inventory import streaming
+        if format not in streaming.writers:
+            raise ValueError("format {:} can not be streamed".format(format))
+        hosts = streaming.page(self.iter_hosts(), limit=limit, offset=offset)
+        if format == "table":
+            count = streaming.write_table(hosts, stream,
+                                          order=order or self.order)
+        else:
+            count = streaming.writers[format](hosts, stream)
+        profile.count("hosts written", count)
+        return count
+
+    def _dict(self):
+        """
+        returns the data as dict, reading all hosts from the storage if
+        needed
+        """
+        if isinstance(self.data, dict):
+            return self.data
+        return dict(self.data.items())
+
+    @contextmanager
+    def batch(self):
+        """
+        groups mutations so that the inventory file is written only once
+        when the outermost batch ends. If the batch is left with an
+        exception nothing is written and changes already sent to a
+        database are rolled back. The inventory stays locked during the
+        batch, so a watcher refreshes it only after the batch.
+
+        Example:
+
+            with inventory.batch():
+                inventory.add(host="red[01-10]", service="worker")
+                inventory.set("red01", "status", "active")
+
+        :return: the inventory
+        :rtype: Inventory
+        """
+        with self._lock:
+            outer = self._batch == 0
+            if outer:
+                self._dirty = False
+                self.storage.begin()
+                saved = self._saved()
+            self._batch += 1
+            try:
+                yield self
+            except BaseException:
+                self._batch -= 1
+                if outer:
+                    self.storage.rollback()
+                    self._restore(saved)
+                raise
+            self._batch -= 1
+            if outer and self._dirty:
+                self.save()
+
+    def _saved(self):
+        """
+        returns what is needed to restore the hosts if a batch is aborted:
+        the changes since they were read, or a copy of the hosts if they
+        were replaced and can not be read again
+        """
+        if self._data is None or self._changes is not None:
+            return list(self._changes or []), None
+        return None, {name: HostRecord(entry)
+                      for name, entry in self._data.items()}
+
+    def _restore(self, saved):
+        """
+        discards the changes of an aborted batch. The hosts are read
+        again and the changes made before the batch are applied, or the
+        copy of the hosts is put back.
+        """
+        changes, copy = saved
+        if copy is not None:
+            self.data = copy
+        elif self._data is not None:
+            self._changes = changes
+            self._merge()
+        self._dirty = bool(changes) or copy is not None
 
+    @_locked
     def delete(self, name):
         """
         Given a hostname, delete it from the inventory
         """
+        if self._index is not None:
+            self._index.remove(name, self.data[name])
         del self.data[name]
+        self._record(("delete", name))
+        self._dirty = True
+
+    @_locked
+    def clone(self, name, source):
+        """
+        Copies the entry of the source host to the named host. If the
+        source is a profile and not a host, the named host refers to the
+        profile instead, so it stores only its name and later changes of
+        the profile apply to it.
+
+        :param name: the name of the new host
+        :type name: str
+        :param source: the name of the host or profile to copy from
+        :type source: str
+        """
+        from cloudmesh.inventory import profiles
+        if source not in self.data and source in self.profiles:
+            entry = profiles.resolve(
+                self.profiles,
+                HostRecord(host=name, **{profiles.ATTRIBUTE: source}))
+        else:
+            entry = HostRecord(self.data[source])
+            entry['host'] = name
+        self._check_ips([(name, entry.get("ip"))])
+        if name in self.data:
+            self.delete(name)
+        self.data[name] = entry
+        if self._index is not None:
+            self._index.insert(name, entry)
+        self._record(("add", name, entry))
+        self._dirty = True
+
+    @property
+    def profiles(self):
+        """
+        the profiles that hosts refer to with the attribute profile, see
+        cloudmesh.inventory.profiles
+
+        :return: the attributes of the profiles by name
+        :rtype: dict
+        """
+        return getattr(self.data, "profiles", {})
+
+    @_locked
+    def define(self, name, **attributes):
+        """
+        sets the attributes of the profile and creates it if it does not
+        exist. The hosts that refer to the profile change with it, so a
+        group of hosts is reconfigured with one change. Only YAML
+        inventories support profiles.
+
+        Example:
 
-    def add(self, **kwargs):
+            i.define("worker-default", service="worker", cluster="red")
+            i.clone("red[01-99]", "worker-default")
+
+        :param name: the name of the profile
+        :type name: str
+        :param attributes: the attributes and their values
+        :type attributes: dict
+        """
+        from cloudmesh.inventory import profiles
+        from cloudmesh.inventory import validation
+        if self.storage.kind != "yaml":
+            raise ValueError("Only YAML inventories support profiles")
+        for attribute in ("host", profiles.ATTRIBUTE):
+            if attribute in attributes:
+                raise ValueError(
+                    "the attribute {:} can not be set in a profile".format(
+                        attribute))
+        violations = validation.validator().values(name, attributes)
+        if violations:
+            raise ValueError(validation.message(violations))
+        data = self._compressed()
+        if name in data.profiles:
+            entry = HostRecord(data.profiles[name])
+        else:
+            entry = HostRecord.blank()
+            entry["ip"] = None
+            del entry["host"]
+        entry.update(attributes)
+        members = data.members(name)
+        if self._index is not None:
+            for member in members:
+                self._index.remove(member, data[member])
+        data.profiles[name] = entry
+        if self._index is not None:
+            for member in members:
+                self._index.insert(member, data[member])
+        self._record(("profile", name, entry))
+        self._dirty = True
+
+    @profile.timed("add")
+    @_locked
+    def add(self, compress=False, **kwargs):
+        """
+        adds the hosts given in hostlist notation with the attributes
 
+        :param compress: if True the hosts are stored as range group that
+                         keeps the shared attributes once and derives the
+                         ip of each host from the first ip. Existing
+                         entries of the hosts are replaced. Only YAML
+                         inventories support range groups.
+        :type compress: bool
+        :param kwargs: the attributes, host and ip may be hostlists
+        :type kwargs: dict
+        """
+        from cloudmesh.inventory.ranges import RangeGroup
         if "host" not in kwargs:
             Console.error("no id specified")
             sys.exit(1)
 
-        hosts = hostlist.expand_hostlist(kwargs['host'])
-        if 'ip' in kwargs:
-            ips = Parameter.expand(kwargs['ip'])
-        else:
-            ips = [None for i in hosts]
+        with profile.phase("expand"):
+            hosts = hostlist.expand_hostlist(kwargs['host'])
+            if 'ip' in kwargs:
+                ips = Parameter.expand(kwargs['ip'])
+            else:
+                ips = [None for i in hosts]
         if ips is None:
             ips = [None for i in hosts]
 
-        for host, ip in zip(hosts, ips):
-            if host in self.data:
-                entry = self.data[host]
+        if compress and len(hosts) > 1 and len(ips) == len(hosts) and \
+                self.storage.kind == "yaml":
+            self._validate([{"host": host, "ip": ip}
+                            for host, ip in zip(hosts, ips)],
+                           {key: value for key, value in kwargs.items()
+                            if key not in ("host", "ip")})
+            self._check_ips(zip(hosts, ips))
+            entry = HostRecord.blank()
+            entry.update(kwargs)
+            self._add_group(RangeGroup.create(kwargs['host'], entry, ips))
+            return
+        # hosts without an ip are ignored as in zip
+        count = min(len(hosts), len(ips))
+        shared = {key: value for key, value in kwargs.items()
+                  if key not in ("host", "ip")}
+        self.add_many(columns={"host": hosts[:count], "ip": ips[:count]},
+                      **shared)
+
+    @profile.timed("add")
+    @_locked
+    def add_many(self, records=None, columns=None, **shared):
+        """
+        adds many hosts in one pass. The hosts are given either as records
+        or as columns with one value per host. The ip addresses are checked
+        once for all hosts and the index is updated at the end.
+
+        Example:
+
+            i.add_many(columns={"host": "red[01-99]",
+                                "ip": "10.1.1.[2-100]"},
+                       service="worker", cluster="red")
+            i.add_many([{"host": "red", "service": "manager"}])
+
+        :param records: the entries of the hosts, each with a host key
+        :type records: iterable of dict
+        :param columns: the attributes with a list of one value per host.
+                        host is required; host may be given in hostlist
+                        notation and ip as parameter expression.
+        :type columns: dict
+        :param shared: attributes with the same value for all hosts
+        :type shared: dict
+        :return: the number of hosts added or updated
+        :rtype: int
+        """
+        if records is not None:
+            rows = list(records)
+            if not all("host" in row for row in rows):
+                raise ValueError("every record needs a host")
+        else:
+            columns = dict(columns or {})
+            if "host" not in columns:
+                raise ValueError("the column host is required")
+            with profile.phase("expand"):
+                if isinstance(columns["host"], str):
+                    columns["host"] = hostlist.expand_hostlist(columns["host"])
+                if isinstance(columns.get("ip"), str):
+                    columns["ip"] = Parameter.expand(columns["ip"])
+            count = len(columns["host"])
+            for attribute, values in columns.items():
+                if len(values) != count:
+                    raise ValueError(
+                        "The column {:} has {:} values for {:} hosts".format(
+                            attribute, len(values), count))
+            names = list(columns)
+            rows = [dict(zip(names, values))
+                    for values in zip(*columns.values())]
+
+        self._validate(rows, shared)
+        self._check_ips((row["host"], row.get("ip", shared.get("ip")))
+                        for row in rows)
+        data = self.data
+        index = self._index
+        added = []
+        for row in rows:
+            host = row["host"]
+            if host in data:
+                entry = data[host]
+                if index is not None:
+                    index.remove(host, entry)
             else:
-                entry = dict(self.entry)
-                self.data[host] = entry
-            for key, value in kwargs.items():
-                entry[key] = value
-            entry['ip'] = ip
-            entry['host'] = host
-            for attribute in entry:
-                self.data[host][attribute] = entry[attribute]
-
-    def list(self, format='dict', sort_keys=True, order=None):
+                entry = HostRecord.blank()
+                entry["ip"] = None
+            entry.update(shared)
+            entry.update(row)
+            data[host] = entry
+            added.append((host, entry))
+        if index is not None:
+            index.insert_many(added)
+        if self._changes is not None:
+            self._changes.extend(("add", host, entry) for host, entry in added)
+        self._dirty = True
+        profile.count("hosts added", len(added))
+        return len(added)
+
+    def _validate(self, rows, shared):
+        """
+        raises a ValueError with all violations of the schema by the new
+        hosts. The shared attributes are checked once.
+
+        :param rows: the entries of the hosts, each with a host key
+        :type rows: list of dict
+        :param shared: attributes with the same value for all hosts
+        :type shared: dict
+        """
+        from cloudmesh.inventory import validation
+        validator = validation.validator()
+        violations = validator.values(None, shared) if shared else []
+        if violations:
+            names = hostlist.collect_hostlist(
+                [str(row["host"]) for row in rows])
+            for violation in violations:
+                violation["host"] = names
+        violations += validator.validate((row["host"], row) for row in rows)
+        if violations:
+            raise ValueError(validation.message(violations))
+
+    @profile.timed("validate")
+    def validate(self):
+        """
+        checks all hosts with the schema in one pass. Hosts that are not
+        loaded are read one at a time from the file.
+
+        :return: the violations with host, attribute, value and message
+        :rtype: list of dict
+        """
+        from cloudmesh.inventory import validation
+        return validation.validator(check=True).validate(
+            self.iter_hosts())
+
+    def _add_group(self, group):
+        """
+        adds the hosts of the range group, replacing existing entries
+        """
+        data = self._compressed()
+        for _, name in group:
+            if name in data:
+                self.delete(name)
+        data.add_group(group)
+        if self._index is not None:
+            self._index.insert_many([(name, group.entry(name, position))
+                                     for position, name in group])
+        self._record(("range", group.hosts, group))
+        self._dirty = True
+
+    def _compressed(self):
+        """
+        returns the data as RangeData, converting it if needed
+        """
+        from cloudmesh.inventory.ranges import RangeData
+        data = self.data
+        if not isinstance(data, RangeData):
+            index, changes = self._index, self._changes
+            self.data = data = RangeData(data)
+            self._index, self._changes = index, changes
+        return data
+
+    @profile.timed("list")
+    def list(self, format='dict', sort_keys=True, order=None, collapse=False):
+        """
+        returns the inventory in the format
+
+        :param format: the format, such as table, yaml, json or dict
+        :type format: str
+        :param sort_keys: sort the keys
+        :type sort_keys: bool
+        :param order: the columns of the table
+        :type order: list
+        :param collapse: if True hosts with the same values in the columns
+                         are shown as one row in hostlist notation
+        :type collapse: bool
+        :return: the formatted inventory
+        """
+        from cloudmesh.inventory import ranges
         if order is None:
             order = self.order
         header = order
-        return Printer.dict(self.data,
-                            header=header,
-                            order=order,
-                            output=format,
-                            sort_keys=sort_keys)
+        if collapse:
+            data = ranges.collapse(self.data, order)
+        elif format == "table" and hasattr(self.data, "table"):
+            return self._table(order)
+        else:
+            data = self._dict()
+        if format not in ["table", "dict"]:
+            data = {name: dict(entry) for name, entry in data.items()}
+        from cloudmesh.common.Printer import Printer
+        with profile.phase("format"):
+            return Printer.dict(data,
+                                header=header,
+                                order=order,
+                                output=format,
+                                sort_keys=sort_keys)
+
+    def _table(self, order):
+        """
+        creates the table directly from the columns of the data without
+        building an entry per host
+        """
+        from cloudmesh.common.prettytable import PrettyTable
+        if len(self.data) == 0:
+            return None
+        table = PrettyTable(order)
+        table.max_width = 48
+        for values in self.data.table(order):
+            table.add_row(["" if value is None else str(value)
+                           for value in values])
+        table.align = "l"
+        return table
 
     def _str(self, data, with_empty=False):
         print()
@@ -290,6 +1206,26 @@ class Inventory(object):
             else:
                 print(self.data[key])
 
+    @staticmethod
+    def convert(source, destination):
+        """
+        copies all hosts of the source inventory into the destination
+        inventory. The storage of each is selected by its file extension,
+        so this converts for example a YAML inventory to a SQLite inventory.
+
+        :param source: the name of the source inventory file
+        :type source: str
+        :param destination: the name of the destination inventory file
+        :type destination: str
+        :return: the destination inventory
+        :rtype: Inventory
+        """
+        source = Inventory(filename=source)
+        destination = Inventory(filename=destination)
+        destination.storage.write(source._dict())
+        destination.read()
+        return destination
+
     @staticmethod
     def build_default_inventory(filename, manager, workers, ips=None,
                                 manager_image='latest-lite',
@@ -306,6 +1242,7 @@ class Inventory(object):
         # --router=10.1.1.1 --tag=latest-lite  --timezone="America/Indiana/Indianapolis" --locale="us"
         # cms inventory set "red0[1-3]" dns to "8.8.8.8,8.8.4.4" --listvalue
 
+        from cloudmesh.common.Shell import Shell
         Console.info("No inventory found or forced rebuild. Buidling inventory "
                     "with defaults.")
         Shell.execute("rm", arguments=[
@@ -320,53 +1257,48 @@ class Inventory(object):
             manager_ip  = None
             dns = None
 
-        image = gui_images[0] if gui_images else manager_image
-        element = {}
-        element['host'] = manager
-        element['status'] = 'inactive'
-        element['service'] = 'manager'
-        element['ip'] = manager_ip
-        element['tag'] = image
-        element['timezone'] = timezone
-        element['locale'] = locale
-        element['services'] = ['bridge', 'wifi']
-        element['keyfile'] = '~/.ssh/id_rsa.pub'
-        i.add(**element)
-        i.save()
-
-        last_octet = 2
-        index = 1
-        if workers is not None:
-            for worker in workers:
-                if network in ['internal']:
-                    ip = ips[index] if ips else f'10.1.1.{last_octet}'
-                else:
-                    ip = None
-                image = gui_images[index] if gui_images else worker_image
-                element = {}
-                element['host'] = worker
-                element['status'] = 'inactive'
-                element['service'] = 'worker'
-                element['network'] = network
-                element['ip'] = ip
-                element['tag'] = image
-                element['timezone'] = timezone
-                element['locale'] = locale
-                element['router'] = manager_ip
-                element['dns'] = dns
-                element['keyfile'] = '~/.ssh/id_rsa.pub'
-                i.add(**element)
-                i.save()
-                last_octet += 1
-                index += 1
-
-        i.save()
+        with i.batch():
+            image = gui_images[0] if gui_images else manager_image
+            element = {}
+            element['host'] = manager
+            element['status'] = 'inactive'
+            element['service'] = 'manager'
+            element['ip'] = manager_ip
+            element['tag'] = image
+            element['timezone'] = timezone
+            element['locale'] = locale
+            element['services'] = ['bridge', 'wifi']
+            element['keyfile'] = '~/.ssh/id_rsa.pub'
+            i.add_many([element])
+
+            workers = workers or []
+            count = len(workers)
+            if network in ['internal']:
+                worker_ips = ips[1:count + 1] if ips else \
+                    [f'10.1.1.{last_octet}' for last_octet in range(2, count + 2)]
+            else:
+                worker_ips = [None] * count
+            images = gui_images[1:count + 1] if gui_images else \
+                [worker_image] * count
+            i.add_many(columns={'host': workers,
+                                'ip': worker_ips,
+                                'tag': images},
+                       status='inactive',
+                       service='worker',
+                       network=network,
+                       timezone=timezone,
+                       locale=locale,
+                       router=manager_ip,
+                       dns=dns,
+                       keyfile='~/.ssh/id_rsa.pub')
+
         print(i.list(format="table"))
 
 
 class CommandSystem(object):
     @classmethod
     def status(cls, host):
+        from cloudmesh.common.Shell import Shell
         msg = "Unknown host"
         try:
             msg = Shell.ping("-c", "1", host)
@@ -0,0 +1,281 @@
+"""
+An append-only journal of the changes to an inventory file.
+
+Instead of rewriting the inventory file on every save, the changes made
+through add, set, unset, delete, clone and define are appended to a journal beside the
+file, one JSON line per change:
+
+    {"v": 8, "t": 1700000000.0, "op": "set", "host": "red01",
+     "attribute": "status", "value": "active"}
+
+v is the version of the save that wrote the change. It continues the
+version stamp of the inventory file, so the changes with a version that
+is not larger than the one of the file are already contained in it.
+Readers replay the journal on top of the inventory file. When the
+journal grows beyond LIMIT bytes the inventory file is written
+completely and the journal is removed. Until then the journal is also a
+record of who changed what and when.
+"""
+import json
+import os
+import time
+
+from cloudmesh.inventory.profiling import profile
+from cloudmesh.inventory.ranges import RangeData
+from cloudmesh.inventory.ranges import RangeGroup
+from cloudmesh.inventory.record import HostRecord
+
+LIMIT = 1 << 20
+
+
+def sidecar(filename):
+    """
+    returns the name of the journal for the inventory file
+
+    :param filename: the name of the inventory file
+    :type filename: str
+    :return: the name of the journal
+    :rtype: str
+    """
+    return filename + ".journal"
+
+
+def size(filename):
+    """
+    returns the size of the journal in bytes, 0 if there is none
+
+    :param filename: the name of the inventory file
+    :type filename: str
+    :return: the size
+    :rtype: int
+    """
+    try:
+        return os.stat(sidecar(filename)).st_size
+    except FileNotFoundError:
+        return 0
+
+
+def encode(change, version, stamp):
+    """
+    encodes a change as it is recorded by the inventory
+
+    :param change: the change, such as ("set", host, attribute, value)
+    :type change: tuple
+    :param version: the version of the save
+    :type version: int
+    :param stamp: the time of the save
+    :type stamp: float
+    :return: the JSON line
+    :rtype: str
+    """
+    kind, name = change[0], change[1]
+    record = {"v": version, "t": stamp, "op": kind, "host": name}
+    if kind == "set":
+        record["attribute"] = change[2]
+        record["value"] = change[3]
+    elif kind == "unset":
+        record["attribute"] = change[2]
+    elif kind == "add":
+        record["entry"] = dict(change[2])
+    elif kind == "range":
+        record["group"] = change[2].dump()
+    elif kind == "profile":
+        record["entry"] = dict(change[2])
+    return json.dumps(record, default=str) + "\n"
+
+
+def append(filename, changes, version):
+    """
+    appends the changes of one save to the journal
+
+    :param filename: the name of the inventory file
+    :type filename: str
+    :param changes: the changes
+    :type changes: list of tuples
+    :param version: the version of the save
+    :type version: int
+    :return: the size of the journal
+    :rtype: int
+    """
+    stamp = round(time.time(), 3)
+    content = "".join(encode(change, version, stamp) for change in changes)
+    with open(sidecar(filename), "a") as stream:
+        stream.write(content)
+        stream.flush()
+        os.fsync(stream.fileno())
+        return stream.tell()
+
+
+def last_version(filename):
+    """
+    returns the version of the last complete change in the journal by
+    reading only its end
+
+    :param filename: the name of the inventory file
+    :type filename: str
+    :return: the version or 0 if the journal is empty
+    :rtype: int
+    """
+    try:
+        with open(sidecar(filename), "rb") as stream:
+            end = stream.seek(0, os.SEEK_END)
+            block = 4096
+            while True:
+                start = max(0, end - block)
+                stream.seek(start)
+                lines = stream.read(end - start).splitlines()
+                # the first line may be cut unless we read from the start
+                for line in reversed(lines if start == 0 else lines[1:]):
+                    try:
+                        return json.loads(line)["v"]
+                    except (ValueError, KeyError):
+                        continue
+                if start == 0:
+                    return 0
+                block *= 2
+    except FileNotFoundError:
+        return 0
+
+
+def apply(data, record):
+    """
+    applies a change read from the journal to the data
+
+    :param data: the hosts
+    :type data: dict or RangeData
+    :param record: the change
+    :type record: dict
+    :return: the data, which is converted to RangeData by a range or
+             a profile
+    :rtype: dict or RangeData
+    """
+    kind, name = record["op"], record["host"]
+    if kind == "set":
+        if name in data:
+            entry = data[name]
+            entry[record["attribute"]] = record["value"]
+            data[name] = entry
+    elif kind == "unset":
+        if name in data:
+            entry = data[name]
+            entry.pop(record["attribute"], None)
+            data[name] = entry
+    elif kind == "delete":
+        if name in data:
+            del data[name]
+    elif kind == "add":
+        if name in data:
+            entry = data[name]
+            entry.update(record["entry"])
+        else:
+            entry = HostRecord(record["entry"])
+        data[name] = entry
+    elif kind == "range":
+        if not isinstance(data, RangeData):
+            data = RangeData(data)
+        data.add_group(RangeGroup.load(record["group"]))
+    elif kind == "profile":
+        if not isinstance(data, RangeData):
+            data = RangeData(data)
+        data.profiles[name] = HostRecord(record["entry"])
+    return data
+
+
+@profile.timed("journal")
+def replay(filename, data, version):
+    """
+    applies the changes of the journal that are newer than the version
+    of the inventory file to the data
+
+    :param filename: the name of the inventory file
+    :type filename: str
+    :param data: the hosts read from the inventory file
+    :type data: dict
+    :param version: the version of the inventory file
+    :type version: int
+    :return: the data, the version of the last change and the number of
+             changes applied
+    :rtype: tuple
+    """
+    count = 0
+    last = version
+    try:
+        with open(sidecar(filename), "r") as stream:
+            for line in stream:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # the last line of an interrupted save
+                    continue
+                if record["v"] <= version:
+                    continue
+                data = apply(data, record)
+                last = record["v"]
+                count += 1
+    except FileNotFoundError:
+        pass
+    profile.count("journal records", count)
+    return data, last, count
+
+
+def follow(filename, offset):
+    """
+    reads the complete records that were appended to the journal after
+    the offset
+
+    :param filename: the name of the inventory file
+    :type filename: str
+    :param offset: the size of the journal that was already read
+    :type offset: int
+    :return: the records and the size of the journal read so far
+    :rtype: tuple
+    """
+    try:
+        with open(sidecar(filename), "rb") as stream:
+            stream.seek(offset)
+            content = stream.read()
+    except FileNotFoundError:
+        return [], offset
+    # a record that is still being written is read the next time
+    end = content.rfind(b"\n") + 1
+    records = []
+    for line in content[:end].splitlines():
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            continue
+    return records, offset + end
+
+
+def hosts(record, data=None):
+    """
+    returns the names of the hosts changed by the record
+
+    :param record: the change
+    :type record: dict
+    :param data: the hosts before the change, which tell the hosts that
+                 refer to a changed profile
+    :type data: dict or RangeData
+    :return: the names
+    :rtype: list
+    """
+    if record["op"] == "range":
+        return RangeGroup.load(record["group"]).names
+    if record["op"] == "profile":
+        if isinstance(data, RangeData):
+            return data.members(record["host"])
+        return []
+    return [record["host"]]
+
+
+def remove(filename):
+    """
+    removes the journal of the inventory file
+
+    :param filename: the name of the inventory file
+    :type filename: str
+    """
+    try:
+        os.remove(sidecar(filename))
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,132 @@
+"""
+A small JSON file with the metadata of an inventory file.
+
+The metadata is kept beside the inventory file. Its first line contains
+the number of hosts, the clusters, the schema version and the measured
+load times, the second line the host names, so the summary can be read
+without reading the names. It is valid as long as the modification time
+and the size of the inventory file and the size of its journal are
+unchanged, so questions such as
+the number of hosts or whether a host exists can be answered without
+parsing the inventory.
+"""
+import json
+import os
+
+from cloudmesh.inventory import journal
+
+SCHEMA = 1
+
+
+def sidecar(filename):
+    """
+    returns the name of the metadata file for the inventory file
+
+    :param filename: the name of the inventory file
+    :type filename: str
+    :return: the name of the metadata file
+    :rtype: str
+    """
+    return filename + ".meta"
+
+
+def summary(data):
+    """
+    returns the metadata of the hosts
+
+    :param data: the hosts
+    :type data: dict
+    :return: the metadata
+    :rtype: dict
+    """
+    clusters = set()
+    for entry in data.values():
+        cluster = entry.get("cluster")
+        if cluster:
+            clusters.add(str(cluster))
+    return {
+        "schema": SCHEMA,
+        "hosts": len(data),
+        "clusters": sorted(clusters)
+    }
+
+
+def read(filename, names=False):
+    """
+    reads the metadata of the inventory file
+
+    :param filename: the name of the inventory file
+    :type filename: str
+    :param names: if True the host names are read as set into names
+    :type names: bool
+    :return: the metadata or None if it is missing or outdated
+    :rtype: dict
+    """
+    try:
+        status = os.stat(filename)
+        with open(sidecar(filename), "r") as stream:
+            meta = json.loads(stream.readline())
+            if meta.get("schema") != SCHEMA or \
+                    meta.get("mtime") != status.st_mtime_ns or \
+                    meta.get("size") != status.st_size or \
+                    meta.get("journal", 0) != journal.size(filename):
+                return None
+            if names:
+                meta["names"] = set(json.loads(stream.readline()))
+    except (OSError, ValueError):
+        return None
+    return meta
+
+
+def write(filename, data, timing=None, status=None, journal=0):
+    """
+    writes the metadata of the inventory file. Errors are ignored as the
+    metadata is only a cache.
+
+    :param filename: the name of the inventory file
+    :type filename: str
+    :param data: the hosts
+    :type data: dict
+    :param timing: the measured load times
+    :type timing: dict
+    :param status: the result of os.stat of the inventory file
+    :type status: os.stat_result
+    :param journal: the size of the journal that is contained in the data
+    :type journal: int
+    :return: the metadata
+    :rtype: dict
+    """
+    meta = summary(data)
+    name = sidecar(filename)
+    tmp = "{:}.{:}.tmp".format(name, os.getpid())
+    try:
+        status = status or os.stat(filename)
+        meta["mtime"] = status.st_mtime_ns
+        meta["size"] = status.st_size
+        meta["journal"] = journal
+        meta["timing"] = {
+            key: timing.get(key) for key in ["parse", "snapshot"]
+        } if timing else {}
+        with open(tmp, "w") as stream:
+            stream.write(json.dumps(meta))
+            stream.write("\n")
+            stream.write(json.dumps(list(data)))
+            stream.write("\n")
+        os.replace(tmp, name)
+    except OSError:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return meta
+
+
+def remove(filename):
+    """
+    removes the metadata of the inventory file
+
+    :param filename: the name of the inventory file
+    :type filename: str
+    """
+    try:
+        os.remove(sidecar(filename))
+    except FileNotFoundError:
+        pass
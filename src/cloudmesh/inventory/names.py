@@ -0,0 +1,177 @@
+"""
+Matching of host names against hostlist patterns without expanding them.
+
+A pattern such as red[001-100,200],blue[1-3]n[1-4] is parsed into terms
+of literal text and number ranges. A name is matched by checking the
+literal text and whether its numbers fall into the ranges with the
+right number of digits, so the cost of a match does not depend on the
+number of names the pattern describes. The names are only generated on
+demand, one at a time.
+"""
+import re
+
+import hostlist
+
+_brackets = re.compile(r"\[([^\]]*)\]")
+
+
+def _split(pattern):
+    """
+    splits the pattern at the commas outside of brackets
+    """
+    terms = []
+    depth = 0
+    start = 0
+    for position, character in enumerate(pattern):
+        if character == "[":
+            depth += 1
+        elif character == "]":
+            depth -= 1
+        elif character == "," and depth == 0:
+            terms.append(pattern[start:position])
+            start = position + 1
+    terms.append(pattern[start:])
+    return [term for term in terms if term]
+
+
+def _ranges(text):
+    """
+    parses the content of brackets such as 001-100,200 into a list of
+    (low, high, width) tuples
+    """
+    ranges = []
+    for part in text.split(","):
+        low, _, high = part.partition("-")
+        if not low.isdigit() or (high and not high.isdigit()):
+            raise hostlist.BadHostlist("bad range: {:}".format(part))
+        if not high:
+            # a single number is kept as it is written
+            ranges.append((int(low), int(low), len(low)))
+        elif int(high) < int(low):
+            raise hostlist.BadHostlist("start > stop: {:}".format(part))
+        else:
+            ranges.append((int(low), int(high), len(low)))
+    return ranges
+
+
+def _contains(ranges, digits):
+    number = int(digits)
+    for low, high, width in ranges:
+        if low <= number <= high and "%0*d" % (width, number) == digits:
+            return True
+    return False
+
+
+class NameMatcher(object):
+    """
+    A hostlist pattern that can be matched against names
+
+    Example:
+
+        matcher = NameMatcher("red[001-100]")
+        "red042" in matcher   # True
+        "red42" in matcher    # False
+        matcher.count         # 100
+    """
+
+    def __init__(self, pattern):
+        self.pattern = pattern
+        self.terms = []
+        for term in _split(pattern):
+            parts = _brackets.split(term)
+            # parts alternate between literal text and ranges
+            self.terms.append([part if i % 2 == 0 else _ranges(part)
+                               for i, part in enumerate(parts)])
+
+    @property
+    def count(self):
+        """
+        the number of names described by the pattern, counting names
+        that occur in several terms more than once
+        """
+        total = 0
+        for term in self.terms:
+            size = 1
+            for ranges in term[1::2]:
+                size *= sum(high - low + 1 for low, high, _ in ranges)
+            total += size
+        return total
+
+    def match(self, name):
+        """
+        returns True if the name is described by the pattern
+
+        :param name: the host name
+        :type name: str
+        :return: True if the name matches
+        :rtype: bool
+        """
+        name = str(name)
+        return any(self._match(term, 0, name, 0) for term in self.terms)
+
+    __contains__ = match
+
+    def _match(self, term, part, name, position):
+        if part == len(term):
+            return position == len(name)
+        if part % 2 == 0:
+            literal = term[part]
+            if not name.startswith(literal, position):
+                return False
+            return self._match(term, part + 1, name, position + len(literal))
+        end = position
+        while end < len(name) and name[end].isdigit():
+            end += 1
+        # try the longest run of digits first, as hostlist would
+        for stop in range(end, position, -1):
+            if _contains(term[part], name[position:stop]) and \
+                    self._match(term, part + 1, name, stop):
+                return True
+        return False
+
+    def expand(self):
+        """
+        yields the names described by the pattern in the order of
+        hostlist.expand_hostlist
+
+        :return: the names
+        :rtype: generator of str
+        """
+        seen = set() if len(self.terms) > 1 else None
+        for term in self.terms:
+            for name in self._expand(term, 0):
+                if seen is not None:
+                    if name in seen:
+                        continue
+                    seen.add(name)
+                yield name
+
+    def _expand(self, term, part):
+        if part == len(term):
+            yield ""
+            return
+        if part % 2 == 0:
+            prefixes = [term[part]]
+        else:
+            prefixes = ("%0*d" % (width, number)
+                        for low, high, width in term[part]
+                        for number in range(low, high + 1))
+        for prefix in prefixes:
+            for rest in self._expand(term, part + 1):
+                yield prefix + rest
+
+    def select(self, names):
+        """
+        returns the names of the container that match the pattern. If
+        the pattern describes fewer names than the container holds, the
+        pattern is expanded and each name is looked up, otherwise the
+        names of the container are matched.
+
+        :param names: the names, such as the data of an inventory
+        :type names: dict or set
+        :return: the matching names
+        :rtype: list
+        """
+        if self.count <= len(names):
+            return [name for name in self.expand() if name in names]
+        return [name for name in names if self.match(name)]
@@ -0,0 +1,107 @@
+"""
+Profiles with the attributes that many hosts share.
+
+A host refers to a profile by name with the attribute profile and stores
+only the attributes in which it differs from the profile. In the YAML
+file the profiles are kept in the reserved key _profiles, which is
+written before the hosts:
+
+    _profiles:
+      worker-default:
+        cluster: red
+        service: worker
+    red01:
+      host: red01
+      ip: 10.1.0.1
+      profile: worker-default
+
+The entry of a host is built from its profile when it is accessed, so a
+change of the profile applies to all hosts that refer to it. Writing an
+entry back stores the attributes that differ from the profile. If an
+attribute of the profile is removed from a host, the host no longer
+refers to the profile and is stored with all of its attributes. Only
+hosts on their own refer to profiles, not the hosts of range groups.
+"""
+from cloudmesh.inventory.record import HostRecord
+
+KEY = "_profiles"
+
+ATTRIBUTE = "profile"
+
+_missing = object()
+
+
+def load(dump):
+    """
+    converts the profiles read from a file to host records
+
+    :param dump: the attributes of each profile
+    :type dump: dict
+    :return: the profiles by name
+    :rtype: dict
+    """
+    return {name: HostRecord(attributes or {})
+            for name, attributes in (dump or {}).items()}
+
+
+def dump(profiles):
+    """
+    returns the profiles sorted by name as they are stored in the file
+
+    :param profiles: the profiles by name
+    :type profiles: dict
+    :return: the profiles
+    :rtype: dict
+    """
+    return {name: profiles[name] for name in sorted(profiles, key=str)}
+
+
+def _profile(profiles, entry):
+    name = entry.get(ATTRIBUTE)
+    if not isinstance(name, str):
+        return None
+    return profiles.get(name)
+
+
+def resolve(profiles, entry):
+    """
+    builds the entry of a host from its profile and its own attributes
+
+    :param profiles: the profiles by name
+    :type profiles: dict
+    :param entry: the stored attributes of the host
+    :type entry: HostRecord
+    :return: the entry, unchanged if it refers to no known profile
+    :rtype: HostRecord
+    """
+    profile = _profile(profiles, entry)
+    if profile is None:
+        return entry
+    resolved = HostRecord(profile)
+    resolved.update(entry)
+    return resolved
+
+
+def store(profiles, entry):
+    """
+    returns the attributes of the entry that are stored, which are the
+    name, the profile and the attributes that differ from the profile
+
+    :param profiles: the profiles by name
+    :type profiles: dict
+    :param entry: the entry of the host
+    :type entry: HostRecord
+    :return: the attributes to store
+    :rtype: HostRecord
+    """
+    profile = _profile(profiles, entry)
+    if profile is None:
+        return entry
+    if any(attribute not in entry for attribute in profile):
+        stored = HostRecord(entry)
+        del stored[ATTRIBUTE]
+        return stored
+    kept = ("host", ATTRIBUTE)
+    return HostRecord(
+        (attribute, value) for attribute, value in entry.items()
+        if attribute in kept or profile.get(attribute, _missing) != value)
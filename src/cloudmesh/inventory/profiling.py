@@ -0,0 +1,223 @@
+"""
+Timers and counters for the phases of the inventory operations.
+
+Profiling is enabled with the environment variable
+CLOUDMESH_INVENTORY_PROFILE or with the option --profile of
+cms inventory. The variable is either 1 to print a summary to stderr
+when the command ends, the name of a .json file to write the timers and
+counters to, or the name of a .prof file to write the statistics of
+cProfile to, which can be read with python -m pstats.
+
+    CLOUDMESH_INVENTORY_PROFILE=1 cms inventory list
+    CLOUDMESH_INVENTORY_PROFILE=list.json cms inventory list
+    cms inventory list --profile
+
+A phase is timed with its parent phases, so that the time of parsing
+the YAML file while listing is reported as list/read/parse. When
+profiling is disabled a phase costs one attribute lookup. Only the
+thread that started profiling is recorded, so a refresh in the thread
+of Inventory.watch does not mix into the phases of a command.
+
+    with profile.phase("read"):
+        ...
+    profile.count("hosts read", len(data))
+"""
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+ENVIRONMENT = "CLOUDMESH_INVENTORY_PROFILE"
+
+
+class Profile(object):
+    """
+    The timers and counters of the phases
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.output = None
+        self.timers = {}
+        self.counters = {}
+        self._path = []
+        self._profiler = None
+        self._thread = None
+
+    def start(self, output=None):
+        """
+        resets the timers and counters and starts profiling
+
+        :param output: None or 1 for a summary on stderr, or the name of
+                       a .json or .prof file
+        :type output: str
+        """
+        self.stop(report=False)
+        self.timers = {}
+        self.counters = {}
+        self._path = []
+        self.output = None if output in [None, "", "1"] else output
+        if self.output is not None and self.output.endswith(".prof"):
+            import cProfile
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        self._thread = threading.get_ident()
+        self.enabled = True
+
+    def stop(self, report=True):
+        """
+        stops profiling and reports the result
+
+        :param report: if True the summary is printed or the output file
+                       is written
+        :type report: bool
+        """
+        if not self.enabled:
+            return
+        self.enabled = False
+        if self._profiler is not None:
+            self._profiler.disable()
+        if report:
+            if self.output is None:
+                print(self.summary(), file=sys.stderr)
+            else:
+                self.write(self.output)
+        self._profiler = None
+
+    @contextmanager
+    def phase(self, name):
+        """
+        times the enclosed statements as the phase within the current
+        phase
+
+        :param name: the name of the phase
+        :type name: str
+        """
+        if not self.enabled or threading.get_ident() != self._thread:
+            yield
+            return
+        self._path.append(name)
+        # the timer is created before the phases it contains, so the
+        # timers are kept in the order the phases start
+        timer = self.timers.setdefault("/".join(self._path), [0, 0.0])
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            timer[0] += 1
+            timer[1] += time.perf_counter() - start
+            self._path.pop()
+
+    def timed(self, name):
+        """
+        returns a decorator that times a function as a phase
+
+        :param name: the name of the phase
+        :type name: str
+        :return: the decorator
+        :rtype: callable
+        """
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled or \
+                        threading.get_ident() != self._thread:
+                    return function(*args, **kwargs)
+                with self.phase(name):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def count(self, name, number=1):
+        """
+        adds the number to the counter
+
+        :param name: the name of the counter, such as "hosts read"
+        :type name: str
+        :param number: the number to add
+        :type number: int
+        """
+        if self.enabled and threading.get_ident() == self._thread:
+            self.counters[name] = self.counters.get(name, 0) + number
+
+    def report(self):
+        """
+        returns the timers and the counters
+
+        :return: the calls and seconds of each phase and the counters
+        :rtype: dict
+        """
+        return {
+            "timers": {name: {"calls": calls, "seconds": seconds}
+                       for name, (calls, seconds) in self.timers.items()},
+            "counters": dict(self.counters)
+        }
+
+    def summary(self):
+        """
+        returns the timers as an indented tree of phases followed by the
+        counters
+
+        :return: the summary
+        :rtype: str
+        """
+        lines = ["{:<40} {:>8} {:>12}".format("Phase", "Calls", "Time")]
+        for path, (calls, seconds) in self.timers.items():
+            names = path.split("/")
+            name = "  " * (len(names) - 1) + names[-1]
+            lines.append("{:<40} {:>8} {:>9.1f} ms".format(
+                name, calls, seconds * 1000))
+        if self.counters:
+            lines.append("{:<40} {:>8}".format("Counter", "Count"))
+            for name, number in self.counters.items():
+                lines.append("{:<40} {:>8}".format(name, number))
+        return "\n".join(lines)
+
+    def write(self, filename):
+        """
+        writes the timers and counters as JSON, or the statistics of
+        cProfile if the name ends with .prof
+
+        :param filename: the name of the file
+        :type filename: str
+        """
+        if filename.endswith(".prof"):
+            if self._profiler is not None:
+                self._profiler.dump_stats(filename)
+            return
+        with open(filename, "w") as stream:
+            json.dump(self.report(), stream, indent=2)
+
+
+profile = Profile()
+
+
+@contextmanager
+def session(enabled=False):
+    """
+    profiles the enclosed statements, for example a command, if enabled
+    or if the environment variable is set, and reports the result at
+    the end
+
+    :param enabled: if True profiling is enabled without the variable
+    :type enabled: bool
+    """
+    output = os.environ.get(ENVIRONMENT)
+    if not enabled and not output:
+        yield profile
+        return
+    profile.start(output)
+    try:
+        yield profile
+    finally:
+        profile.stop()
+
+
+if os.environ.get(ENVIRONMENT):
+    # programs that use the inventory are profiled until they end
+    profile.start(os.environ[ENVIRONMENT])
+    atexit.register(profile.stop)
@@ -0,0 +1,404 @@
+"""
+A small query language to select hosts of an inventory.
+
+Examples:
+
+    service=worker and cluster in (red,blue)
+    services contains kubernetes
+    ip in 10.1.0.0/16
+    host ~ red0* and not status = active
+    status != active or (tag = gpu and cluster = red)
+
+A comparison has the form ATTRIBUTE OPERATOR VALUE with the operators
+
+    = ==      equal
+    !=        not equal, also true if the attribute is not set
+    ~         matches the shell pattern, such as red0*
+    in (a,b)  equal to one of the values
+    in CIDR   the address lies in the network, such as 10.1.0.0/16
+    contains  the list, or the comma separated string, has the value
+
+Comparisons are combined with and, or, not and parentheses. Values that
+contain blanks or special characters are quoted with ' or ".
+
+The expression is compiled into a plan. Comparisons on indexed
+attributes and on ip produce the candidate hosts from the indexes, and,
+or and not combine them, and the remaining comparisons are evaluated by
+scanning only the candidates. If no index can be used all hosts are
+scanned.
+"""
+import ipaddress
+import re
+from fnmatch import fnmatchcase
+
+from cloudmesh.inventory.index import address
+
+_tokens = re.compile(r"""
+    (?P<space>\s+)
+  | (?P<symbol>==|!=|=|~|\(|\)|,)
+  | (?P<string>"[^"]*"|'[^']*')
+  | (?P<word>[^\s()=!~,"']+)
+""", re.VERBOSE)
+
+_missing = object()
+
+
+def tokenize(expression):
+    """
+    splits the expression into tokens
+
+    :param expression: the query
+    :type expression: str
+    :return: the kind, the text and the position of each token
+    :rtype: list of tuples
+    """
+    tokens = []
+    position = 0
+    while position < len(expression):
+        match = _tokens.match(expression, position)
+        if match is None:
+            raise ValueError("unexpected {:} at position {:} in: {:}".format(
+                expression[position], position, expression))
+        kind = match.lastgroup
+        text = match.group(kind)
+        if kind == "string":
+            text = text[1:-1]
+        if kind != "space":
+            tokens.append((kind, text, position))
+        position = match.end()
+    tokens.append(("end", "", position))
+    return tokens
+
+
+def _text(value):
+    if isinstance(value, bool):
+        return str(value).lower()
+    return str(value)
+
+
+class Compare(object):
+    """
+    A comparison of an attribute with a value
+    """
+
+    def __init__(self, attribute, operator, value):
+        self.attribute = attribute
+        self.operator = operator
+        self.value = value
+        if operator == "in" and not isinstance(value, list):
+            try:
+                self.value = ipaddress.ip_network(value, strict=False)
+            except ValueError:
+                raise ValueError(
+                    "{:} is neither a list nor a network".format(value))
+
+    def candidates(self, index):
+        """
+        returns the names of the hosts that may match, or None if the
+        comparison can not be answered from the index
+
+        :param index: the index of the inventory
+        :type index: AttributeIndex
+        :return: the names
+        :rtype: set
+        """
+        if index is None:
+            return None
+        if self.attribute == "ip":
+            return self.addresses(index.addresses)
+        if not index.indexed(self.attribute):
+            return None
+        if self.operator == "=":
+            literals = [self.value]
+        elif self.operator == "in" and isinstance(self.value, list):
+            literals = self.value
+        else:
+            return None
+        # the values are compared by their text as in match. Lists and
+        # dicts are kept as tuples in the index, so they are candidates.
+        literals = set(literals)
+        names = set()
+        for value, owners in index.values[self.attribute].items():
+            if isinstance(value, tuple) or _text(value) in literals:
+                names |= owners
+        return names
+
+    def addresses(self, index):
+        """
+        returns the names of the hosts that may match from the ip index
+
+        :param index: the ip index of the inventory
+        :type index: IPIndex
+        :return: the names
+        :rtype: set
+        """
+        if self.operator == "=":
+            literals = [self.value]
+        elif self.operator != "in":
+            return None
+        elif isinstance(self.value, list):
+            literals = self.value
+        else:
+            return index.network(self.value)
+        names = set()
+        for literal in literals:
+            # hosts with an ip that is not an address are not indexed
+            if address(literal) is None:
+                return None
+            names |= index.owner(literal)
+        return names
+
+    def match(self, entry):
+        actual = entry.get(self.attribute, _missing)
+        if self.operator == "!=":
+            return actual is _missing or _text(actual) != self.value
+        if actual is _missing:
+            return False
+        if self.operator == "=":
+            return _text(actual) == self.value
+        if self.operator == "~":
+            return fnmatchcase(_text(actual), self.value)
+        if self.operator == "contains":
+            if isinstance(actual, str):
+                actual = actual.split(",")
+            elif not isinstance(actual, (list, tuple, set)):
+                actual = [actual]
+            return self.value in [_text(value).strip() for value in actual]
+        if isinstance(self.value, list):
+            return _text(actual) in self.value
+        try:
+            return ipaddress.ip_address(str(actual)) in self.value
+        except ValueError:
+            return False
+
+    def __repr__(self):
+        if isinstance(self.value, list):
+            value = "({:})".format(",".join(self.value))
+        else:
+            value = str(self.value)
+        return "{:} {:} {:}".format(self.attribute, self.operator, value)
+
+
+class And(object):
+
+    def __init__(self, terms):
+        self.terms = terms
+
+    def candidates(self, index):
+        found = None
+        for term in self.terms:
+            names = term.candidates(index)
+            if names is not None:
+                found = names if found is None else found & names
+        return found
+
+    def match(self, entry):
+        return all(term.match(entry) for term in self.terms)
+
+    def __repr__(self):
+        return "(" + " and ".join(repr(term) for term in self.terms) + ")"
+
+
+class Or(object):
+
+    def __init__(self, terms):
+        self.terms = terms
+
+    def candidates(self, index):
+        found = set()
+        for term in self.terms:
+            names = term.candidates(index)
+            if names is None:
+                return None
+            found |= names
+        return found
+
+    def match(self, entry):
+        return any(term.match(entry) for term in self.terms)
+
+    def __repr__(self):
+        return "(" + " or ".join(repr(term) for term in self.terms) + ")"
+
+
+class Not(object):
+
+    def __init__(self, term):
+        self.term = term
+
+    def candidates(self, index):
+        return None
+
+    def match(self, entry):
+        return not self.term.match(entry)
+
+    def __repr__(self):
+        return "not " + repr(self.term)
+
+
+class Parser(object):
+    """
+    A recursive descent parser for the grammar
+
+        expression := term (or term)*
+        term       := factor (and factor)*
+        factor     := not factor | ( expression ) | comparison
+        comparison := ATTRIBUTE (= | == | != | ~ | contains) VALUE
+                    | ATTRIBUTE in ( VALUE (, VALUE)* )
+                    | ATTRIBUTE in CIDR
+    """
+
+    def __init__(self, expression):
+        self.expression = expression
+        self.tokens = tokenize(expression)
+        self.position = 0
+
+    def peek(self):
+        return self.tokens[self.position]
+
+    def next(self):
+        token = self.tokens[self.position]
+        self.position += 1
+        return token
+
+    def keyword(self, word):
+        kind, text, _ = self.peek()
+        return kind == "word" and text.lower() == word
+
+    def error(self, expected):
+        kind, text, position = self.peek()
+        found = "the end" if kind == "end" else repr(text)
+        return ValueError("expected {:} but found {:} at position {:} in: {:}"
+                          .format(expected, found, position, self.expression))
+
+    def expect(self, text):
+        if self.peek()[1] != text or self.peek()[0] != "symbol":
+            raise self.error(repr(text))
+        return self.next()
+
+    def parse(self):
+        tree = self.parse_or()
+        if self.peek()[0] != "end":
+            raise self.error("and, or or the end")
+        return tree
+
+    def parse_or(self):
+        terms = [self.parse_and()]
+        while self.keyword("or"):
+            self.next()
+            terms.append(self.parse_and())
+        return terms[0] if len(terms) == 1 else Or(terms)
+
+    def parse_and(self):
+        terms = [self.parse_factor()]
+        while self.keyword("and"):
+            self.next()
+            terms.append(self.parse_factor())
+        return terms[0] if len(terms) == 1 else And(terms)
+
+    def parse_factor(self):
+        if self.keyword("not"):
+            self.next()
+            return Not(self.parse_factor())
+        if self.peek()[:2] == ("symbol", "("):
+            self.next()
+            tree = self.parse_or()
+            self.expect(")")
+            return tree
+        return self.parse_comparison()
+
+    def value(self):
+        kind, text, _ = self.peek()
+        if kind not in ("word", "string"):
+            raise self.error("a value")
+        self.next()
+        return text
+
+    def parse_comparison(self):
+        if self.peek()[0] != "word":
+            raise self.error("an attribute")
+        attribute = self.next()[1]
+        kind, text, _ = self.peek()
+        if kind == "symbol" and text in ("=", "==", "!=", "~"):
+            self.next()
+            operator = "=" if text == "==" else text
+            return Compare(attribute, operator, self.value())
+        if self.keyword("contains"):
+            self.next()
+            return Compare(attribute, "contains", self.value())
+        if self.keyword("in"):
+            self.next()
+            if self.peek()[:2] != ("symbol", "("):
+                return Compare(attribute, "in", self.value())
+            self.next()
+            values = [self.value()]
+            while self.peek()[:2] == ("symbol", ","):
+                self.next()
+                values.append(self.value())
+            self.expect(")")
+            return Compare(attribute, "in", values)
+        raise self.error("=, !=, ~, in or contains")
+
+
+class Query(object):
+    """
+    A compiled query
+
+    Example:
+
+        query = Query("service=worker and cluster in (red,blue)")
+        hosts = query.select(inventory.data, inventory.index)
+    """
+
+    def __init__(self, expression):
+        self.expression = expression
+        self.tree = Parser(expression).parse()
+
+    def plan(self, index):
+        """
+        describes how the query is executed
+
+        :param index: the index of the inventory
+        :type index: AttributeIndex
+        :return: the plan
+        :rtype: str
+        """
+        names = self.tree.candidates(index)
+        if names is None:
+            return "scan all hosts: {:}".format(self.tree)
+        return "index gives {:} candidates, filter: {:}".format(
+            len(names), self.tree)
+
+    def match(self, entry):
+        """
+        returns True if the entry matches the query
+
+        :param entry: the entry of a host
+        :type entry: dict
+        :return: True if the entry matches
+        :rtype: bool
+        """
+        return self.tree.match(entry)
+
+    def select(self, data, index=None):
+        """
+        returns the hosts that match the query
+
+        :param data: the hosts
+        :type data: dict
+        :param index: the index of the hosts
+        :type index: AttributeIndex
+        :return: the names and the entries of the matching hosts
+        :rtype: list of tuples
+        """
+        names = self.tree.candidates(index)
+        if names is None:
+            names = data
+        else:
+            # the saved inventory is sorted by host name
+            names = sorted(names, key=str)
+        found = []
+        for name in names:
+            entry = data[name]
+            if self.match(entry):
+                found.append((name, entry))
+        return found
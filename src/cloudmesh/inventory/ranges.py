@@ -0,0 +1,410 @@
+"""
+Range compressed storage of hosts that are added with hostlist notation.
+
+A range group stores the hosts of a hostlist such as red[0001-9999]
+together with the attributes they share, the first ip address, from
+which the address of each host is derived by its position in the
+hostlist, and the attributes in which single hosts differ. In the YAML
+file the groups are kept in the reserved key _ranges:
+
+    _ranges:
+    - hosts: red[0001-9999]
+      ip: 10.1.0.1
+      attributes:
+        cluster: red
+        service: worker
+      overrides:
+        red0005:
+          status: active
+      exclude: red0007
+
+The entry of a host is only built when it is accessed, and writing an
+entry back stores the attributes that differ from the group as override.
+If an attribute of the group is removed from a host, the host leaves the
+group and is stored on its own. RangeData also keeps the profiles that
+hosts on their own refer to, see cloudmesh.inventory.profiles.
+"""
+import ipaddress
+from collections.abc import MutableMapping
+
+import hostlist
+from cloudmesh.inventory import profiles
+from cloudmesh.inventory.index import address
+from cloudmesh.inventory.record import HostRecord
+
+KEY = "_ranges"
+
+_missing = object()
+
+
+class RangeGroup(object):
+    """
+    The hosts of a hostlist with shared attributes
+    """
+
+    def __init__(self, hosts, attributes=None, ip=None, overrides=None,
+                 exclude=None):
+        """
+        :param hosts: the hostlist, such as red[0001-9999]
+        :type hosts: str
+        :param attributes: the attributes shared by the hosts
+        :type attributes: dict
+        :param ip: the address of the first host
+        :type ip: str
+        :param overrides: the attributes in which hosts differ by name
+        :type overrides: dict
+        :param exclude: the names of the removed hosts
+        :type exclude: set
+        """
+        self.hosts = hosts
+        self.names = hostlist.expand_hostlist(hosts)
+        self.attributes = dict(attributes or {})
+        self.ip = ip
+        self.first = None if ip is None else ipaddress.ip_address(ip)
+        self.overrides = dict(overrides or {})
+        self.exclude = set(exclude or ())
+        self._positions = None
+
+    @classmethod
+    def create(cls, hosts, attributes, ips):
+        """
+        creates a group. If the addresses are consecutive only the first
+        one is stored, otherwise each address is stored as override.
+
+        :param hosts: the hostlist
+        :type hosts: str
+        :param attributes: the attributes shared by the hosts
+        :type attributes: dict
+        :param ips: the address of each host, or None
+        :type ips: list
+        :return: the group
+        :rtype: RangeGroup
+        """
+        attributes = dict(attributes)
+        attributes.pop("host", None)
+        attributes.pop("ip", None)
+        group = cls(hosts, attributes)
+        keys = [address(ip) for ip in ips]
+        if len(ips) == len(group.names) and None not in keys and all(
+                key == (keys[0][0], keys[0][1] + i)
+                for i, key in enumerate(keys)):
+            group.ip = str(ips[0])
+            group.first = ipaddress.ip_address(group.ip)
+        elif any(ip is not None for ip in ips):
+            for name, ip in zip(group.names, ips):
+                group.overrides[name] = {"ip": ip}
+        else:
+            group.attributes["ip"] = None
+        return group
+
+    @classmethod
+    def load(cls, dump):
+        exclude = dump.get("exclude")
+        return cls(dump["hosts"],
+                   attributes=dump.get("attributes"),
+                   ip=dump.get("ip"),
+                   overrides=dump.get("overrides"),
+                   exclude=hostlist.expand_hostlist(exclude) if exclude else None)
+
+    def dump(self):
+        """
+        returns the group as it is stored in the file
+
+        :return: the group
+        :rtype: dict
+        """
+        dump = {"hosts": self.hosts}
+        if self.ip is not None:
+            dump["ip"] = self.ip
+        dump["attributes"] = dict(sorted(self.attributes.items()))
+        if self.overrides:
+            dump["overrides"] = {
+                name: dict(sorted(self.overrides[name].items()))
+                for name in sorted(self.overrides, key=str)}
+        if self.exclude:
+            dump["exclude"] = hostlist.collect_hostlist(list(self.exclude))
+        return dump
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state["_positions"] = None
+        return state
+
+    def position(self, name):
+        """
+        returns the position of the host in the hostlist
+
+        :param name: the name of the host
+        :type name: str
+        :return: the position or None if the host is not in the group
+        :rtype: int
+        """
+        if self._positions is None:
+            self._positions = {name: i for i, name in enumerate(self.names)}
+        position = self._positions.get(name)
+        if position is None or name in self.exclude:
+            return None
+        return position
+
+    def base(self, name, position):
+        entry = HostRecord(self.attributes)
+        entry["host"] = name
+        if self.first is not None:
+            entry["ip"] = str(self.first + position)
+        return entry
+
+    def entry(self, name, position):
+        """
+        builds the entry of the host
+
+        :param name: the name of the host
+        :type name: str
+        :param position: the position of the host in the hostlist
+        :type position: int
+        :return: the entry
+        :rtype: HostRecord
+        """
+        entry = self.base(name, position)
+        values = self.overrides.get(name)
+        if values:
+            entry.update(values)
+        return entry
+
+    def set(self, name, position, entry):
+        """
+        stores the entry of the host as override of the group
+
+        :return: False if the entry can not be stored in the group
+        :rtype: bool
+        """
+        base = self.base(name, position)
+        if any(attribute not in entry for attribute in base):
+            return False
+        values = {attribute: value for attribute, value in entry.items()
+                  if base.get(attribute, _missing) != value}
+        if values:
+            self.overrides[name] = values
+        else:
+            self.overrides.pop(name, None)
+        return True
+
+    def remove(self, name):
+        self.exclude.add(name)
+        self.overrides.pop(name, None)
+
+    def __iter__(self):
+        for position, name in enumerate(self.names):
+            if name not in self.exclude:
+                yield position, name
+
+    def __len__(self):
+        return len(self.names) - len(self.exclude)
+
+
+class RangeData(MutableMapping):
+    """
+    A mapping from host names to entries that keeps hosts on their own
+    in a dict and the hosts of range groups in RangeGroup objects. The
+    hosts on their own that refer to a profile keep only the attributes
+    that differ from it.
+    """
+
+    def __init__(self, hosts=None, groups=None, profiles=None):
+        self.hosts = {} if hosts is None else hosts
+        self.groups = list(groups or [])
+        self.profiles = {} if profiles is None else profiles
+
+    def owner(self, name):
+        """
+        returns the group of the host and its position in the group
+
+        :param name: the name of the host
+        :type name: str
+        :return: the group and the position, or None, None
+        :rtype: tuple
+        """
+        for group in self.groups:
+            position = group.position(name)
+            if position is not None:
+                return group, position
+        return None, None
+
+    def add_group(self, group):
+        for _, name in group:
+            self.pop(name, None)
+        self.groups.append(group)
+
+    def members(self, profile):
+        """
+        returns the names of the hosts that refer to the profile
+
+        :param profile: the name of the profile
+        :type profile: str
+        :return: the names
+        :rtype: list
+        """
+        return [name for name, entry in self.hosts.items()
+                if entry.get(profiles.ATTRIBUTE) == profile]
+
+    def compact(self):
+        """
+        yields the profiles under the key _profiles, the hosts on their
+        own sorted by name with only the attributes that differ from
+        their profile, and then the groups under the key _ranges, as they
+        are written to the file
+        """
+        if self.profiles:
+            yield profiles.KEY, profiles.dump(self.profiles)
+        for name in sorted(self.hosts, key=str):
+            yield name, self.hosts[name]
+        groups = [group.dump() for group in self.groups if len(group)]
+        if groups:
+            yield KEY, groups
+
+    def __getitem__(self, name):
+        if name in self.hosts:
+            if self.profiles:
+                return profiles.resolve(self.profiles, self.hosts[name])
+            return self.hosts[name]
+        group, position = self.owner(name)
+        if group is None:
+            raise KeyError(name)
+        return group.entry(name, position)
+
+    def __setitem__(self, name, entry):
+        if name not in self.hosts:
+            group, position = self.owner(name)
+            if group is not None:
+                if group.set(name, position, entry):
+                    return
+                group.remove(name)
+        if self.profiles:
+            entry = profiles.store(self.profiles, entry)
+        self.hosts[name] = entry
+
+    def __delitem__(self, name):
+        if name in self.hosts:
+            del self.hosts[name]
+            return
+        group, position = self.owner(name)
+        if group is None:
+            raise KeyError(name)
+        group.remove(name)
+
+    def __contains__(self, name):
+        return name in self.hosts or self.owner(name)[0] is not None
+
+    def __iter__(self):
+        yield from self.hosts
+        for group in self.groups:
+            for _, name in group:
+                yield name
+
+    def items(self):
+        if self.profiles:
+            for name, entry in self.hosts.items():
+                yield name, profiles.resolve(self.profiles, entry)
+        else:
+            yield from self.hosts.items()
+        for group in self.groups:
+            for position, name in group:
+                yield name, group.entry(name, position)
+
+    def values(self):
+        for _, entry in self.items():
+            yield entry
+
+    def __len__(self):
+        return len(self.hosts) + sum(len(group) for group in self.groups)
+
+
+def load(data):
+    """
+    converts the data read from a file with the key _ranges or _profiles
+    to RangeData
+
+    :param data: the data
+    :type data: dict
+    :return: the data
+    :rtype: dict or RangeData
+    """
+    if KEY not in data and profiles.KEY not in data:
+        return data
+    groups = [RangeGroup.load(dump) for dump in data.pop(KEY, None) or []]
+    return RangeData(data, groups,
+                     profiles.load(data.pop(profiles.KEY, None)))
+
+
+def iter_group(dump):
+    """
+    yields the hosts of a group as it is stored in the file
+
+    :param dump: the group
+    :type dump: dict
+    :return: the names and the entries
+    :rtype: generator of tuples
+    """
+    group = RangeGroup.load(dump)
+    for position, name in group:
+        yield name, group.entry(name, position)
+
+
+def collapse(data, order):
+    """
+    collapses hosts that have the same values in the columns of the
+    order into one row. The host column shows the hosts in hostlist
+    notation and the ip column the first and the last address if the
+    addresses are consecutive.
+
+    :param data: the hosts
+    :type data: dict
+    :param order: the columns
+    :type order: list
+    :return: the rows by their hostlist
+    :rtype: dict
+    """
+    similar = {}
+    for name, entry in data.items():
+        key = tuple(str(entry.get(attribute)) for attribute in order
+                    if attribute not in ("host", "ip"))
+        similar.setdefault(key, []).append((name, entry))
+
+    runs = []
+    for members in similar.values():
+        members.sort(key=lambda member: hostlist.numeric_sort_key(
+            str(member[0])))
+        run = []
+        for name, entry in members:
+            if run and not _follows(run[-1][1].get("ip"), entry.get("ip")):
+                runs.append(run)
+                run = []
+            run.append((name, entry))
+        runs.append(run)
+
+    runs.sort(key=lambda run: hostlist.numeric_sort_key(str(run[0][0])))
+    rows = {}
+    for run in runs:
+        name, entry = run[0]
+        if len(run) == 1:
+            rows[name] = entry
+            continue
+        label = hostlist.collect_hostlist([str(name) for name, _ in run])
+        row = dict(entry)
+        row["host"] = label
+        first, last = entry.get("ip"), run[-1][1].get("ip")
+        if first != last:
+            row["ip"] = "{:}-{:}".format(first, last)
+        rows[label] = row
+    return rows
+
+
+def _follows(previous, ip):
+    """
+    returns True if the ip is equal to or the successor of the previous
+    """
+    if previous == ip:
+        return True
+    before = address(previous)
+    after = address(ip)
+    return before is not None and after is not None and \
+        after == (before[0], before[1] + 1)
@@ -0,0 +1,163 @@
+"""
+A compact record for the entry of a host.
+
+A HostRecord keeps the attributes of Inventory.order in slots and all
+other attributes, such as status, network or name, in an overflow dict
+that is only created when it is needed. It behaves like a dict of its
+attributes, so it can be passed to Printer and to code that expects the
+entries of the inventory to be dicts, but it needs only a fraction of
+the memory of a dict with the same keys.
+"""
+from collections.abc import Mapping
+from collections.abc import MutableMapping
+
+import yaml
+
+columns = (
+    "host",
+    "tag",
+    "cluster",
+    "service",
+    "services",
+    "ip",
+    "dns",
+    "router",
+    "locale",
+    "timezone",
+    "owners",
+    "comment",
+    "description",
+    "keyfile"
+)
+
+_columns = frozenset(columns)
+
+
+class HostRecord(MutableMapping):
+
+    __slots__ = columns + ("_extra",)
+
+    def __init__(self, *args, **kwargs):
+        self._extra = None
+        if args or kwargs:
+            self.update(*args, **kwargs)
+
+    @classmethod
+    def blank(cls, value=""):
+        """
+        returns a record in which all columns are set to the value
+
+        :param value: the value of the columns
+        :type value: object
+        :return: the record
+        :rtype: HostRecord
+        """
+        record = cls()
+        for column in columns:
+            setattr(record, column, value)
+        return record
+
+    def __getitem__(self, key):
+        if key in _columns:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key)
+        if self._extra is None:
+            raise KeyError(key)
+        return self._extra[key]
+
+    def __setitem__(self, key, value):
+        if key in _columns:
+            setattr(self, key, value)
+        elif self._extra is None:
+            self._extra = {key: value}
+        else:
+            self._extra[key] = value
+
+    def __delitem__(self, key):
+        if key in _columns:
+            try:
+                delattr(self, key)
+            except AttributeError:
+                raise KeyError(key)
+        elif self._extra is None:
+            raise KeyError(key)
+        else:
+            del self._extra[key]
+            if not self._extra:
+                self._extra = None
+
+    def __contains__(self, key):
+        if key in _columns:
+            return hasattr(self, key)
+        return self._extra is not None and key in self._extra
+
+    def __iter__(self):
+        for column in columns:
+            if hasattr(self, column):
+                yield column
+        if self._extra is not None:
+            yield from self._extra
+
+    def __len__(self):
+        length = sum(1 for column in columns if hasattr(self, column))
+        if self._extra is not None:
+            length += len(self._extra)
+        return length
+
+    def get(self, key, default=None):
+        if key in _columns:
+            return getattr(self, key, default)
+        if self._extra is None:
+            return default
+        return self._extra.get(key, default)
+
+    def update(self, *args, **kwargs):
+        if args:
+            other = args[0]
+            if isinstance(other, Mapping):
+                other = other.items()
+            for key, value in other:
+                self[key] = value
+        for key, value in kwargs.items():
+            self[key] = value
+
+    def copy(self):
+        return HostRecord(self)
+
+    def __eq__(self, other):
+        if not isinstance(other, Mapping):
+            return NotImplemented
+        return dict(self.items()) == dict(other.items())
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+
+def records(data):
+    """
+    converts the entries of the data to host records
+
+    :param data: the hosts
+    :type data: dict
+    :return: the hosts with HostRecord entries
+    :rtype: dict
+    """
+    for name, entry in data.items():
+        if isinstance(entry, Mapping) and not isinstance(entry, HostRecord):
+            data[name] = HostRecord(entry)
+    return data
+
+
+def _represent(dumper, record):
+    return dumper.represent_dict(record)
+
+
+yaml.add_representer(HostRecord, _represent, Dumper=yaml.SafeDumper)
+yaml.add_representer(HostRecord, _represent, Dumper=yaml.Dumper)
+if hasattr(yaml, "CSafeDumper"):
+    yaml.add_representer(HostRecord, _represent, Dumper=yaml.CSafeDumper)
+    yaml.add_representer(HostRecord, _represent, Dumper=yaml.CDumper)
@@ -1,49 +1,112 @@
 
+# the hosts of the inventory are validated with this schema, see
+# cloudmesh.inventory.validation. Attributes that are not in the schema,
+# such as temperature, are allowed.
 host = {
+    'allow_unknown': True,
     'schema': {
+        'host': {
+            'type': 'string',
+            'required': True,
+            'empty': False
+        },
         'name': {
-            'type': 'string'
+            'type': 'string',
+            'nullable': True
+        },
+        'tag': {
+            'type': 'string',
+            'nullable': True
         },
         'cluster': {
-            'type': 'string'
+            'type': 'string',
+            'nullable': True
         },
         'label': {
-            'type': 'string'
+            'type': 'string',
+            'nullable': True
         },
         'service': {
-            'type': 'string'
+            'type': 'string',
+            'nullable': True
+        },
+        'services': {
+            'type': ['list', 'string'],
+            'nullable': True,
+            'schema': {
+                'type': 'string'
+            }
         },
         'os': {
-            'type': 'string'
+            'type': 'string',
+            'nullable': True
         },
         'ip': {
-            'type': 'dict',
+            'type': ['string', 'dict'],
+            'nullable': True,
+            'check_with': 'ip',
             'schema': {
                 'public': {
-                    'type': 'string'
+                    'type': 'string',
+                    'check_with': 'ip'
                 },
                 'private': {
-                    'type': 'string'
+                    'type': 'string',
+                    'check_with': 'ip'
                 }
             }
         },
+        'dns': {
+            'type': ['list', 'string'],
+            'nullable': True,
+            'schema': {
+                'type': 'string',
+                'check_with': 'ip'
+            }
+        },
+        'router': {
+            'type': 'string',
+            'nullable': True,
+            'check_with': 'ip'
+        },
+        'locale': {
+            'type': 'string',
+            'nullable': True
+        },
+        'timezone': {
+            'type': 'string',
+            'nullable': True
+        },
         'project': {
-            'type': 'string'
+            'type': 'string',
+            'nullable': True
         },
         'owners': {
-            'type': 'list',
+            'type': ['list', 'string'],
+            'nullable': True,
             'schema': {
                 'type': 'string'
             }
         },
         'comment': {
-            'type': 'string'
+            'type': 'string',
+            'nullable': True
         },
         'description': {
-            'type': 'string'
+            'type': 'string',
+            'nullable': True
+        },
+        'keyfile': {
+            'type': 'string',
+            'nullable': True
+        },
+        'status': {
+            'type': 'string',
+            'nullable': True
         },
         'metadata': {
-            'type': 'string'
+            'type': ['string', 'dict'],
+            'nullable': True
         }
     }
 }
@@ -0,0 +1,191 @@
+"""
+A binary snapshot of an inventory file that is kept beside the YAML file.
+
+The snapshot stores the parsed data with pickle together with the
+modification time, the size and a hash of the YAML file it was created
+from. As long as the YAML file is unchanged the snapshot is loaded instead
+of parsing the YAML file. If the snapshot is missing, stale or unreadable
+the YAML file is parsed, preferably with the libyaml loader, and a new
+snapshot is written.
+"""
+import hashlib
+import os
+import pickle
+import time
+
+import yaml
+from cloudmesh.inventory import ranges
+from cloudmesh.inventory.profiling import profile
+from cloudmesh.inventory.record import records
+
+try:
+    from yaml import CSafeLoader as SafeLoader
+    from yaml import CSafeDumper as SafeDumper
+except ImportError:  # pragma: no cover
+    from yaml import SafeLoader
+    from yaml import SafeDumper
+
+VERSION = 3
+
+
+def sidecar(filename):
+    """
+    returns the name of the snapshot file for the inventory file
+
+    :param filename: the name of the inventory file
+    :type filename: str
+    :return: the name of the snapshot file
+    :rtype: str
+    """
+    return filename + ".snapshot"
+
+
+def signature(content, status, digest=None):
+    """
+    returns the key under which a snapshot of the content is valid
+
+    :param content: the content of the inventory file
+    :type content: bytes
+    :param status: the result of os.stat of the inventory file
+    :type status: os.stat_result
+    :param digest: the hash of the content if it is already known
+    :type digest: str
+    :return: the key
+    :rtype: dict
+    """
+    return {
+        "version": VERSION,
+        "mtime": status.st_mtime_ns,
+        "size": status.st_size,
+        "hash": digest or hashlib.blake2b(content, digest_size=16).hexdigest()
+    }
+
+
+def parse(content):
+    """
+    parses the YAML content with the fastest available safe loader. The
+    entries of the hosts are returned as HostRecord and range groups as
+    RangeData.
+
+    :param content: the YAML content
+    :type content: bytes or str
+    :return: the data
+    :rtype: dict
+    """
+    return ranges.load(records(yaml.load(content, Loader=SafeLoader) or {}))
+
+
+def dump(data):
+    """
+    dumps the data as YAML with the fastest available safe dumper
+
+    :param data: the data
+    :type data: dict
+    :return: the YAML document
+    :rtype: str
+    """
+    return yaml.dump(data, Dumper=SafeDumper, default_flow_style=False)
+
+
+def read(filename, key):
+    """
+    reads the snapshot of the inventory file if it matches the key
+
+    :param filename: the name of the inventory file
+    :type filename: str
+    :param key: the signature of the inventory file
+    :type key: dict
+    :return: the header and the data, or None if there is no valid snapshot
+    :rtype: tuple
+    """
+    try:
+        with open(sidecar(filename), "rb") as stream:
+            header = pickle.load(stream)
+            if header.get("key") != key:
+                return None
+            return header, pickle.load(stream)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError,
+            ImportError, IndexError, TypeError, ValueError):
+        return None
+
+
+def write(filename, key, data, parse_time=None):
+    """
+    writes the snapshot of the inventory file. Errors are ignored as the
+    snapshot is only a cache.
+
+    :param filename: the name of the inventory file
+    :type filename: str
+    :param key: the signature of the inventory file
+    :type key: dict
+    :param data: the data of the inventory
+    :type data: dict
+    :param parse_time: the time it took to parse the YAML file
+    :type parse_time: float
+    """
+    name = sidecar(filename)
+    tmp = "{:}.{:}.tmp".format(name, os.getpid())
+    try:
+        with open(tmp, "wb") as stream:
+            pickle.dump({"key": key, "parse": parse_time}, stream,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(data, stream, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, name)
+    except (OSError, pickle.PicklingError, TypeError, AttributeError):
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def load(filename):
+    """
+    loads the inventory file, from the snapshot if it is valid and from
+    the YAML file otherwise
+
+    :param filename: the name of the inventory file
+    :type filename: str
+    :return: the data and the timing of the load. The timing contains the
+             source of the data, the load time and the time it took to
+             parse the YAML file if known, all in seconds
+    :rtype: tuple
+    """
+    start = time.perf_counter()
+    with open(filename, "rb") as stream:
+        content = stream.read()
+        status = os.fstat(stream.fileno())
+    key = signature(content, status)
+
+    with profile.phase("snapshot"):
+        found = read(filename, key)
+    if found is not None:
+        header, data = found
+        load_time = time.perf_counter() - start
+        return data, {
+            "source": "snapshot",
+            "load": load_time,
+            "snapshot": load_time,
+            "parse": header.get("parse")
+        }
+
+    with profile.phase("parse"):
+        data = parse(content)
+    parse_time = time.perf_counter() - start
+    with profile.phase("snapshot write"):
+        write(filename, key, data, parse_time=parse_time)
+    return data, {
+        "source": "yaml",
+        "load": parse_time,
+        "parse": parse_time
+    }
+
+
+def remove(filename):
+    """
+    removes the snapshot of the inventory file
+
+    :param filename: the name of the inventory file
+    :type filename: str
+    """
+    try:
+        os.remove(sidecar(filename))
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,186 @@
+"""
+Natural ordering of inventory hosts by one or more columns.
+
+Values are compared by kind first: numbers, including strings such as
+"32", come before ip addresses, which are compared as integers, then
+text, in which runs of digits are compared as numbers so that red2
+comes before red10, then lists, and empty values come last. Hosts with
+equal values are ordered by their name.
+
+With a limit only the first hosts are kept in a heap while the hosts
+are read, instead of sorting all of them. If the first column is
+indexed, the hosts are taken from the index in the order of its values
+and only the hosts with the same value are sorted. The ip index holds
+only addresses, so the hosts with other values in the ip column are
+sorted with the same key and merged with the hosts from the index.
+"""
+import heapq
+import itertools
+import re
+
+from cloudmesh.inventory.index import address
+
+_digits = re.compile(r"(\d+)")
+_number = re.compile(r"[-+]?\d+(\.\d*)?$")
+
+
+def natural(value):
+    """
+    returns the key by which the value is sorted
+
+    :param value: the value of an attribute
+    :type value: object
+    :return: the key
+    :rtype: tuple
+    """
+    if value is None or value == "":
+        return (4,)
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return 0, value
+    if isinstance(value, (list, tuple)):
+        return (3,) + tuple(natural(item) for item in value)
+    text = str(value)
+    # only text that starts with a digit or contains a colon can be a
+    # number or an address, which saves parsing host names
+    if text[0] in "+-0123456789" or ":" in text:
+        if _number.match(text):
+            return 0, float(text)
+        ip = address(text)
+        if ip is not None:
+            return (1,) + ip
+    parts = _digits.split(text)
+    return 2, tuple((0, int(part)) if i % 2 else (1, part)
+                    for i, part in enumerate(parts) if part)
+
+
+def sort_key(columns):
+    """
+    returns a function that gives the key of a host for the columns
+
+    :param columns: the names of the columns
+    :type columns: list
+    :return: the key function for (name, entry) tuples
+    :rtype: callable
+    """
+    # attributes such as service repeat, so their keys are computed once
+    keys = {}
+
+    def value_key(value):
+        try:
+            return keys[type(value), value]
+        except KeyError:
+            result = keys[type(value), value] = natural(value)
+            return result
+        except TypeError:
+            return natural(value)
+
+    def key(host):
+        name, entry = host
+        return tuple(value_key(entry.get(column)) for column in columns) + \
+            (natural(name),)
+    return key
+
+
+def top(hosts, columns, limit=None):
+    """
+    returns the hosts sorted by the columns. With a limit a heap keeps
+    only the first limit hosts.
+
+    :param hosts: the names and the entries of the hosts
+    :type hosts: iterable of tuples
+    :param columns: the names of the columns
+    :type columns: list
+    :param limit: the number of hosts to return, all if None
+    :type limit: int
+    :return: the sorted hosts
+    :rtype: list of tuples
+    """
+    key = sort_key(columns)
+    if limit is None:
+        return sorted(hosts, key=key)
+    return heapq.nsmallest(limit, hosts, key=key)
+
+
+def _groups(index, column):
+    """
+    yields the sets of names with the same sort key in the order of the
+    key, or returns None if the column is not indexed
+    """
+    if column == "ip":
+        addresses = index.addresses
+        keys = ((version, number)
+                for version in sorted(addresses.sorted)
+                for number in addresses.sorted[version])
+        return (addresses.owners[key] for key in keys)
+    if not index.indexed(column):
+        return None
+    values = index.values[column]
+    ordered = sorted(values, key=natural)
+    return (set().union(*(values[value] for value in group))
+            for _, group in itertools.groupby(ordered, key=natural))
+
+
+def indexed(data, index, columns, limit=None, match=None):
+    """
+    returns the hosts sorted by the columns using the index of the first
+    column, or None if it is not indexed
+
+    :param data: the hosts
+    :type data: dict
+    :param index: the index of the hosts
+    :type index: AttributeIndex
+    :param columns: the names of the columns
+    :type columns: list
+    :param limit: the number of hosts to return, all if None
+    :type limit: int
+    :param match: a function of the name and the entry that selects the
+                  hosts, all if None
+    :type match: callable
+    :return: the sorted hosts
+    :rtype: list of tuples
+    """
+    groups = _groups(index, columns[0])
+    if groups is None:
+        return None
+    if columns[0] == "ip":
+        names = set().union(*index.addresses.owners.values())
+        rest = top(((name, entry) for name, entry in data.items()
+                    if name not in names
+                    if match is None or match(name, entry)),
+                   columns, limit)
+        hosts = heapq.merge(_walk(data, groups, columns, match), rest,
+                            key=sort_key(columns))
+        return list(itertools.islice(hosts, limit))
+    found = []
+    seen = set()
+    for names in groups:
+        seen.update(names)
+        hosts = [(name, data[name]) for name in names]
+        if match is not None:
+            hosts = [(name, entry) for name, entry in hosts
+                     if match(name, entry)]
+        found.extend(top(hosts, columns, _remaining(limit, found)))
+        if limit is not None and len(found) >= limit:
+            return found
+    # the hosts without a value in the index come last
+    rest = ((name, entry) for name, entry in data.items()
+            if name not in seen and (match is None or match(name, entry)))
+    found.extend(top(rest, columns, _remaining(limit, found)))
+    return found
+
+
+def _walk(data, groups, columns, match):
+    """
+    yields the hosts of the groups of the index in the order of the
+    columns
+    """
+    for names in groups:
+        hosts = [(name, data[name]) for name in names]
+        if match is not None:
+            hosts = [(name, entry) for name, entry in hosts
+                     if match(name, entry)]
+        yield from top(hosts, columns)
+
+
+def _remaining(limit, found):
+    return None if limit is None else limit - len(found)
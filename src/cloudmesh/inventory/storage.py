@@ -0,0 +1,786 @@
+"""
+The storage layer of the inventory.
+
+An Inventory keeps its hosts in a storage that is selected by the file
+extension of the inventory file:
+
+* YamlStorage keeps the hosts in a YAML document that is read completely
+  into memory and written completely on save. The first line of the
+  document holds a version stamp that every save increments, and reads
+  and writes take an advisory lock on the file with the suffix .lock.
+  Saves append the changes to a journal, see cloudmesh.inventory.journal,
+  and write the document only when the journal is too large.
+* SqliteStorage keeps one row per host in a SQLite database. Hosts are
+  read on access, find is executed as indexed SQL query and changes are
+  written row by row.
+* ColumnarStorage keeps a read-only memory mapped columnar file, see
+  cloudmesh.inventory.columnar.
+"""
+import json
+import os
+import stat
+import tempfile
+import time
+from collections.abc import MutableMapping
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+from cloudmesh.inventory import columnar
+from cloudmesh.inventory import diff
+from cloudmesh.inventory import journal
+from cloudmesh.inventory import metadata
+from cloudmesh.inventory import record
+from cloudmesh.inventory import snapshot
+from cloudmesh.inventory import streaming
+from cloudmesh.inventory.profiling import profile
+from cloudmesh.inventory.ranges import RangeData
+
+SQLITE_EXTENSIONS = (".db", ".sqlite", ".sqlite3")
+COLUMNAR_EXTENSIONS = (".columnar",)
+
+
+@contextmanager
+def atomic_writer(filename):
+    """
+    opens a temporary file in the same directory for binary writing and
+    renames it to the filename when the block ends, so readers never see
+    a partial file. If the block raises an exception the file is left
+    unchanged.
+
+    :param filename: the name of the file
+    :type filename: str
+    :return: the binary stream to write to
+    :rtype: file
+    """
+    directory = os.path.dirname(os.path.abspath(filename))
+    if os.path.exists(filename):
+        mode = stat.S_IMODE(os.stat(filename).st_mode)
+    else:
+        umask = os.umask(0)
+        os.umask(umask)
+        mode = 0o666 & ~umask
+    fd, tmp = tempfile.mkstemp(dir=directory,
+                               prefix=".{:}.".format(os.path.basename(filename)),
+                               suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as stream:
+            yield stream
+            stream.flush()
+            os.fsync(stream.fileno())
+        os.chmod(tmp, mode)
+        os.replace(tmp, filename)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def atomic_write(filename, content):
+    """
+    writes the content with atomic_writer
+
+    :param filename: the name of the file
+    :type filename: str
+    :param content: the content
+    :type content: bytes
+    :return: the status of the written file
+    :rtype: os.stat_result
+    """
+    with atomic_writer(filename) as stream:
+        stream.write(content)
+    return os.stat(filename)
+
+
+def backend(filename, default=None):
+    """
+    returns the name of the backend for the inventory file
+
+    :param filename: the name of the inventory file
+    :type filename: str
+    :param default: the backend to use if the extension does not decide
+    :type default: str
+    :return: yaml, sqlite or columnar
+    :rtype: str
+    """
+    if filename.lower().endswith(SQLITE_EXTENSIONS):
+        return "sqlite"
+    if filename.lower().endswith(COLUMNAR_EXTENSIONS):
+        return "columnar"
+    return default or "yaml"
+
+
+def open_storage(filename, kind=None):
+    """
+    opens the storage for the inventory file
+
+    :param filename: the name of the inventory file
+    :type filename: str
+    :param kind: yaml, sqlite or columnar, by default derived from the
+                 extension
+    :type kind: str
+    :return: the storage
+    :rtype: Storage
+    """
+    kind = backend(filename, kind)
+    if kind == "sqlite":
+        return SqliteStorage(filename)
+    elif kind == "columnar":
+        return ColumnarStorage(filename)
+    elif kind == "yaml":
+        return YamlStorage(filename)
+    raise ValueError("unknown inventory backend: {:}".format(kind))
+
+
+def remove(filename):
+    """
+    removes the inventory file together with its snapshot, metadata, lock
+    file, journals and hashes
+
+    :param filename: the name of the inventory file
+    :type filename: str
+    """
+    for name in [filename,
+                 snapshot.sidecar(filename),
+                 metadata.sidecar(filename),
+                 filename + ".lock",
+                 journal.sidecar(filename),
+                 diff.sidecar(filename),
+                 filename + "-wal",
+                 filename + "-shm"]:
+        try:
+            os.remove(name)
+        except FileNotFoundError:
+            pass
+
+
+VERSION = "# cloudmesh inventory version: {:}\n"
+
+
+def identity(filename):
+    """
+    returns the inode, the modification time and the size of the file,
+    which change when the file is written or replaced
+
+    :param filename: the name of the file
+    :type filename: str
+    :return: the identity or None if the file does not exist
+    :rtype: tuple
+    """
+    try:
+        status = os.stat(filename)
+    except FileNotFoundError:
+        return None
+    return status.st_ino, status.st_mtime_ns, status.st_size
+
+
+def version(filename):
+    """
+    returns the version stamp in the first line of the inventory file.
+    Every save increments the version, so a writer can detect that
+    another process has changed the file since it was read.
+
+    :param filename: the name of the inventory file
+    :type filename: str
+    :return: the version or 0 if the file has none
+    :rtype: int
+    """
+    prefix = VERSION.split("{")[0]
+    try:
+        with open(filename, "r") as stream:
+            line = stream.readline()
+    except OSError:
+        return 0
+    if line.startswith(prefix):
+        try:
+            return int(line[len(prefix):])
+        except ValueError:
+            pass
+    return 0
+
+
+def sorted_hosts(data):
+    """
+    yields the hosts sorted by name
+
+    :param data: the hosts
+    :type data: dict
+    :return: the names and the entries
+    :rtype: generator of tuples
+    """
+    for name in sorted(data, key=str):
+        yield name, data[name]
+
+
+class Storage(object):
+    """
+    The interface of an inventory storage. Storages that write single
+    hosts return a mapping from load that writes the hosts on assignment
+    and deletion.
+    """
+
+    kind = None
+
+    def __init__(self, filename):
+        self.filename = filename
+
+    def load(self):
+        """
+        loads the hosts
+
+        :return: the hosts and the timing of the load
+        :rtype: tuple
+        """
+        raise NotImplementedError
+
+    def save(self, data, timing=None):
+        """
+        makes all changes to the data persistent
+
+        :param data: the hosts
+        :type data: dict
+        :param timing: the timing of the last load
+        :type timing: dict
+        """
+        raise NotImplementedError
+
+    def write(self, data):
+        """
+        replaces the stored hosts with the data
+
+        :param data: the hosts
+        :type data: dict
+        """
+        self.save(data)
+
+    def find(self, kwargs):
+        """
+        returns the matching hosts or None if the storage can not search
+
+        :param kwargs: the attributes and the values to match
+        :type kwargs: dict
+        :return: the matching entries
+        :rtype: list
+        """
+        return None
+
+    def metadata(self, names=False):
+        """
+        returns the metadata of the stored hosts without loading them, or
+        None if that is not possible
+
+        :param names: if True the metadata includes the set of host names
+        :type names: bool
+        :return: the metadata
+        :rtype: dict
+        """
+        return None
+
+    def begin(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def mark(self):
+        """
+        returns the state of the storage that tells which version of the
+        stored hosts was loaded, see reset
+
+        :return: the state
+        :rtype: object
+        """
+        return None
+
+    def reset(self, mark):
+        """
+        returns to the state of mark, so the hosts loaded since then are
+        considered not loaded
+
+        :param mark: the state returned by mark
+        :type mark: object
+        """
+        pass
+
+    @contextmanager
+    def lock(self, shared=False):
+        """
+        locks the stored hosts against writers of other processes
+
+        :param shared: if True other readers are not blocked
+        :type shared: bool
+        """
+        yield
+
+    def changed(self):
+        """
+        returns True if another process has written the hosts since they
+        were loaded
+
+        :rtype: bool
+        """
+        return False
+
+    def append(self, data, changes):
+        """
+        records the changes without writing all hosts
+
+        :param data: the hosts including the changes
+        :type data: dict
+        :param changes: the changes since the last save
+        :type changes: list of tuples
+        :return: False if the hosts have to be saved instead
+        :rtype: bool
+        """
+        return False
+
+    def poll(self):
+        """
+        returns the changes other processes have made since the hosts were
+        loaded. Storages that read the hosts on access are always current.
+
+        :return: the records appended to the journal, which are empty if
+                 nothing has changed, or None if the hosts have to be
+                 loaded again
+        :rtype: list
+        """
+        return []
+
+
+class YamlStorage(Storage):
+    """
+    Stores the hosts in a YAML document with a snapshot beside it.
+    """
+
+    kind = "yaml"
+
+    def __init__(self, filename):
+        super().__init__(filename)
+        self.version = None
+        self.base = 0
+        self.journal_size = 0
+        self.journal_limit = journal.LIMIT
+        self.identity = None
+        self._locks = 0
+
+    @contextmanager
+    def lock(self, shared=False):
+        """
+        takes an advisory lock on the file filename.lock. The lock is
+        reentrant, a nested lock keeps the mode of the outer lock.
+        Without fcntl the lock does nothing.
+
+        :param shared: if True other readers are not blocked
+        :type shared: bool
+        """
+        if fcntl is None or self._locks:
+            self._locks += 1
+            try:
+                yield
+            finally:
+                self._locks -= 1
+            return
+        with open(self.filename + ".lock", "a") as stream:
+            fcntl.flock(stream.fileno(),
+                        fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            self._locks = 1
+            try:
+                yield
+            finally:
+                self._locks = 0
+                fcntl.flock(stream.fileno(), fcntl.LOCK_UN)
+
+    def changed(self):
+        return version(self.filename) != self.base or \
+            journal.size(self.filename) != self.journal_size
+
+    def mark(self):
+        return self.base, self.version, self.journal_size, self.identity
+
+    def reset(self, mark):
+        self.base, self.version, self.journal_size, self.identity = mark
+
+    def load(self):
+        with self.lock(shared=True):
+            data, timing = snapshot.load(self.filename)
+            self.base = version(self.filename)
+            data, self.version, timing["journal"] = journal.replay(
+                self.filename, data, self.base)
+            self.journal_size = journal.size(self.filename)
+            self.identity = identity(self.filename)
+        if timing["source"] == "yaml" or metadata.read(self.filename) is None:
+            metadata.write(self.filename, data, timing=timing,
+                           journal=self.journal_size)
+        return data, timing
+
+    def append(self, data, changes):
+        """
+        appends the changes to the journal unless it is larger than the
+        limit, in which case the inventory file has to be written. The
+        caller holds the lock.
+        """
+        if self.journal_size >= self.journal_limit:
+            return False
+        if not changes:
+            return True
+        current = not self.changed()
+        # the load times of the file do not change with the journal
+        meta = metadata.read(self.filename) if current else None
+        number = max(self.version or 0, version(self.filename),
+                     journal.last_version(self.filename)) + 1
+        with profile.phase("journal"):
+            size = journal.append(self.filename, changes, number)
+        self.version = number
+        if current:
+            # the data is what the file and the journal contain
+            self.journal_size = size
+            metadata.write(self.filename, data,
+                           timing=meta and meta.get("timing"), journal=size)
+        else:
+            metadata.remove(self.filename)
+        return True
+
+    def poll(self):
+        with self.lock(shared=True):
+            size = journal.size(self.filename)
+            if identity(self.filename) != self.identity or \
+                    size < self.journal_size:
+                return None
+            if size == self.journal_size:
+                return []
+            records, self.journal_size = journal.follow(
+                self.filename, self.journal_size)
+        if records:
+            self.version = max(self.version or 0, records[-1]["v"])
+        return records
+
+    def save(self, data, timing=None):
+        with self.lock():
+            self._save(data, timing)
+
+    def _save(self, data, timing):
+        number = max(self.version or 0, version(self.filename),
+                     journal.last_version(self.filename)) + 1
+        with profile.phase("yaml"), atomic_writer(self.filename) as stream:
+            writer = streaming.HashWriter(stream)
+            writer.write(VERSION.format(number))
+            if isinstance(data, RangeData):
+                hosts = data.compact()
+            else:
+                hosts = sorted_hosts(data)
+            profile.count("hosts saved",
+                          streaming.write_yaml(hosts, writer))
+        status = os.stat(self.filename)
+        self.identity = status.st_ino, status.st_mtime_ns, status.st_size
+        # the changes in the journal are now contained in the file
+        journal.remove(self.filename)
+        self.version = self.base = number
+        self.journal_size = 0
+        key = snapshot.signature(None, status, digest=writer.hexdigest())
+        parse_time = timing.get("parse") if timing else None
+        with profile.phase("snapshot write"):
+            snapshot.write(self.filename, key, data, parse_time=parse_time)
+        with profile.phase("metadata"):
+            metadata.write(self.filename, data, timing=timing, status=status)
+
+    def metadata(self, names=False):
+        return metadata.read(self.filename, names=names)
+
+    def measure(self, timing):
+        """
+        measures the time to load the inventory file cold, by parsing the
+        YAML file, and warm, from the snapshot. The cold time is kept in
+        the snapshot so it does not have to be measured again.
+
+        :param timing: the timing to update
+        :type timing: dict
+        :return: the timing
+        :rtype: dict
+        """
+        with open(self.filename, "rb") as stream:
+            content = stream.read()
+            status = os.fstat(stream.fileno())
+        start = time.perf_counter()
+        data = snapshot.parse(content)
+        timing["parse"] = time.perf_counter() - start
+        key = snapshot.signature(content, status)
+        snapshot.write(self.filename, key, data, parse_time=timing["parse"])
+        start = time.perf_counter()
+        snapshot.read(self.filename, key)
+        timing["snapshot"] = time.perf_counter() - start
+        data, _, _ = journal.replay(self.filename, data, version(self.filename))
+        metadata.write(self.filename, data, timing=timing, status=status,
+                       journal=journal.size(self.filename))
+        return timing
+
+
+class SqliteStorage(Storage):
+    """
+    Stores one host per row in a SQLite database. The attributes listed in
+    columns are kept in their own indexed columns, all other attributes
+    in a JSON document in the column extra. Values are stored JSON
+    encoded, so lists and None survive the round trip and SQL NULL marks
+    an attribute that is not set.
+    """
+
+    kind = "sqlite"
+
+    columns = list(record.columns) + ["status", "name"]
+
+    indexed = ["service", "cluster", "tag", "status", "ip"]
+
+    def __init__(self, filename):
+        import sqlite3
+        super().__init__(filename)
+        self.data = None
+        self.connection = sqlite3.connect(filename)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.create()
+
+    def create(self):
+        names = ", ".join('"{:}" TEXT'.format(column) for column in self.columns)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS hosts "
+            "(_name TEXT PRIMARY KEY, {:}, extra TEXT)".format(names))
+        for column in self.indexed:
+            self.connection.execute(
+                'CREATE INDEX IF NOT EXISTS hosts_{0} ON hosts ("{0}")'.format(
+                    column))
+        self.connection.commit()
+
+    def encode(self, name, entry):
+        row = [name]
+        extra = {}
+        for column in self.columns:
+            row.append(json.dumps(entry[column]) if column in entry else None)
+        for attribute, value in entry.items():
+            if attribute not in self.columns:
+                extra[attribute] = value
+        row.append(json.dumps(extra) if extra else None)
+        return tuple(row)
+
+    def decode(self, row):
+        entry = {}
+        for column, value in zip(self.columns, row[1:-1]):
+            if value is not None:
+                entry[column] = json.loads(value)
+        if row[-1] is not None:
+            entry.update(json.loads(row[-1]))
+        return entry
+
+    def select(self, where="", parameters=()):
+        return self.connection.execute(
+            "SELECT * FROM hosts {:} ORDER BY _name".format(where), parameters)
+
+    def load(self):
+        start = time.perf_counter()
+        if self.data is None:
+            self.data = SqliteData(self)
+        return self.data, {
+            "source": "sqlite",
+            "load": time.perf_counter() - start
+        }
+
+    def save(self, data, timing=None):
+        if data is self.data:
+            data.flush()
+        else:
+            # the data replaces all hosts, including those not in it
+            self.connection.execute("DELETE FROM hosts")
+            if self.data is not None:
+                self.data.cache.clear()
+            for name, entry in data.items():
+                self.update(name, entry)
+        self.connection.commit()
+
+    def write(self, data):
+        self.connection.execute("DELETE FROM hosts")
+        rows = (self.encode(name, entry) for name, entry in data.items())
+        marks = ", ".join(["?"] * (len(self.columns) + 2))
+        self.connection.executemany(
+            "INSERT INTO hosts VALUES ({:})".format(marks), rows)
+        self.connection.commit()
+
+    def metadata(self, names=False):
+        meta = {
+            "schema": metadata.SCHEMA,
+            "hosts": self.connection.execute(
+                "SELECT COUNT(*) FROM hosts").fetchone()[0],
+            "clusters": sorted(
+                str(json.loads(cluster)) for (cluster,) in
+                self.connection.execute(
+                    "SELECT DISTINCT cluster FROM hosts "
+                    "WHERE cluster IS NOT NULL AND cluster != '\"\"'"))
+        }
+        if names:
+            meta["names"] = {name for (name,) in self.connection.execute(
+                "SELECT _name FROM hosts")}
+        return meta
+
+    def find(self, kwargs):
+        conditions = []
+        parameters = []
+        scan = {}
+        for attribute, value in kwargs.items():
+            if attribute in self.columns:
+                conditions.append('"{:}" = ?'.format(attribute))
+                parameters.append(json.dumps(value))
+            else:
+                scan[attribute] = value
+        where = "WHERE " + " AND ".join(conditions) if conditions else ""
+        missing = object()
+        found = []
+        for row in self.select(where, parameters).fetchall():
+            entry = self.data.row(row)
+            if all(entry.get(t, missing) == v for t, v in scan.items()):
+                found.append(entry)
+        return found
+
+    def update(self, name, entry):
+        marks = ", ".join(["?"] * (len(self.columns) + 2))
+        row = self.encode(name, entry)
+        self.connection.execute(
+            "INSERT OR REPLACE INTO hosts VALUES ({:})".format(marks), row)
+        if self.data is not None:
+            self.data.written(name, entry, row)
+
+    def delete(self, name):
+        self.connection.execute("DELETE FROM hosts WHERE _name = ?", (name,))
+
+    def rollback(self):
+        self.connection.rollback()
+        if self.data is not None:
+            self.data.cache.clear()
+
+
+class SqliteData(MutableMapping):
+    """
+    A mapping from host names to entries that reads the entries from the
+    database on access. Entries that were handed out are remembered, so
+    changes made to them directly are written on save.
+    """
+
+    def __init__(self, storage):
+        self.storage = storage
+        self.cache = {}
+
+    def row(self, row):
+        name = row[0]
+        if name in self.cache:
+            return self.cache[name][0]
+        entry = self.storage.decode(row)
+        self.cache[name] = (entry, row)
+        return entry
+
+    def written(self, name, entry, row):
+        self.cache[name] = (entry, row)
+
+    def flush(self):
+        for name, (entry, row) in list(self.cache.items()):
+            if self.storage.encode(name, entry) != row:
+                self.storage.update(name, entry)
+
+    def __getitem__(self, name):
+        if name in self.cache:
+            return self.cache[name][0]
+        row = self.storage.connection.execute(
+            "SELECT * FROM hosts WHERE _name = ?", (name,)).fetchone()
+        if row is None:
+            raise KeyError(name)
+        return self.row(row)
+
+    def __setitem__(self, name, entry):
+        self.storage.update(name, entry)
+
+    def __delitem__(self, name):
+        if name not in self:
+            raise KeyError(name)
+        self.storage.delete(name)
+        self.cache.pop(name, None)
+
+    def __contains__(self, name):
+        if name in self.cache:
+            return True
+        return self.storage.connection.execute(
+            "SELECT 1 FROM hosts WHERE _name = ?", (name,)).fetchone() \
+            is not None
+
+    def __iter__(self):
+        for (name,) in self.storage.connection.execute(
+                "SELECT _name FROM hosts ORDER BY _name").fetchall():
+            yield name
+
+    def __len__(self):
+        return self.storage.connection.execute(
+            "SELECT COUNT(*) FROM hosts").fetchone()[0]
+
+    def items(self):
+        return [(row[0], self.row(row))
+                for row in self.storage.select().fetchall()]
+
+    def __eq__(self, other):
+        if isinstance(other, SqliteData):
+            return other is self
+        return dict(self.items()) == other
+
+
+class ColumnarStorage(Storage):
+    """
+    Stores the hosts in a read-only columnar file. The file can only be
+    written as a whole, for example with Inventory.convert.
+    """
+
+    kind = "columnar"
+
+    def __init__(self, filename):
+        super().__init__(filename)
+        self.data = None
+        self.identity = None
+
+    def load(self):
+        start = time.perf_counter()
+        if self.data is not None:
+            self.data.close()
+        self.identity = identity(self.filename)
+        self.data = columnar.ColumnarData(self.filename)
+        return self.data, {
+            "source": "columnar",
+            "load": time.perf_counter() - start
+        }
+
+    def poll(self):
+        if identity(self.filename) != self.identity:
+            return None
+        return []
+
+    def save(self, data, timing=None):
+        if data is self.data:
+            return
+        if self.data is not None and len(self.data):
+            raise ValueError(
+                "The columnar inventory {:} is read only".format(self.filename))
+        self.write(data)
+
+    def write(self, data):
+        atomic_write(self.filename, columnar.dumps(data))
+
+    def metadata(self, names=False):
+        if self.data is None:
+            self.load()
+        meta = {
+            "schema": metadata.SCHEMA,
+            "hosts": len(self.data),
+            "clusters": sorted(
+                str(cluster) for cluster in self.data.distinct("cluster")
+                if cluster)
+        }
+        if names:
+            meta["names"] = set(self.data)
+        return meta
+
+    def find(self, kwargs):
+        return self.data.find(kwargs)
@@ -0,0 +1,227 @@
+"""
+Streaming reader and writers for inventory files.
+
+iter_hosts parses an inventory file event by event and yields one host at
+a time, so only a single entry is held in memory. The writers produce one
+YAML or JSON fragment per host, which together form the same document as
+a complete dump, so exports and filters over very large inventories run
+in constant memory. The table writer takes only the listed columns of
+each host and sizes the columns from the first SAMPLE rows, so the first
+rows are printed before the remaining hosts are read.
+"""
+import hashlib
+import itertools
+import json
+
+import yaml
+from yaml.composer import Composer
+from yaml.constructor import SafeConstructor
+from yaml.resolver import Resolver
+from cloudmesh.inventory import profiles
+from cloudmesh.inventory import ranges
+from cloudmesh.inventory.record import HostRecord
+from cloudmesh.inventory.record import columns
+from cloudmesh.inventory.snapshot import SafeDumper
+
+SAMPLE = 1000
+
+try:
+    from yaml._yaml import CParser
+except ImportError:  # pragma: no cover
+    _HostLoader = yaml.SafeLoader
+else:
+    class _HostLoader(CParser, Composer, SafeConstructor, Resolver):
+        """
+        A loader that composes the nodes of the top level mapping one by
+        one from the events of the libyaml parser.
+        """
+
+        def __init__(self, stream):
+            CParser.__init__(self, stream)
+            Composer.__init__(self)
+            SafeConstructor.__init__(self)
+            Resolver.__init__(self)
+
+
+def iter_hosts(filename):
+    """
+    yields the hosts of the inventory file one at a time
+
+    :param filename: the name of the inventory file
+    :type filename: str
+    :return: the name and the entry of each host
+    :rtype: generator of tuples
+    """
+    shared = {}
+    with open(filename, "rb") as stream:
+        loader = _HostLoader(stream)
+        try:
+            loader.get_event()
+            if loader.check_event(yaml.StreamEndEvent):
+                return
+            loader.get_event()
+            if not loader.check_event(yaml.MappingStartEvent):
+                return
+            loader.get_event()
+            while not loader.check_event(yaml.MappingEndEvent):
+                key = loader.compose_node(None, None)
+                value = loader.compose_node(None, None)
+                name = loader.construct_object(key, deep=True)
+                entry = loader.construct_object(value, deep=True)
+                # anchors are kept as later hosts may refer to them
+                loader.constructed_objects = {}
+                if name == ranges.KEY:
+                    for dump in entry or []:
+                        yield from ranges.iter_group(dump)
+                    continue
+                if name == profiles.KEY:
+                    # the profiles are written before the hosts
+                    shared = profiles.load(entry)
+                    continue
+                if isinstance(entry, dict):
+                    entry = profiles.resolve(shared, HostRecord(entry))
+                yield name, entry
+        finally:
+            loader.dispose()
+
+
+class HashWriter(object):
+    """
+    A text stream on top of a binary stream that computes the hash of
+    everything written, as used by the snapshot signature.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.hash = hashlib.blake2b(digest_size=16)
+
+    def write(self, text):
+        content = text.encode("utf-8")
+        self.hash.update(content)
+        self.stream.write(content)
+
+    def hexdigest(self):
+        return self.hash.hexdigest()
+
+
+def write_yaml(hosts, stream):
+    """
+    writes the hosts as one YAML mapping, one host at a time
+
+    :param hosts: the names and entries of the hosts
+    :type hosts: iterable of tuples
+    :param stream: the text stream to write to
+    :type stream: file
+    :return: the number of hosts written
+    :rtype: int
+    """
+    count = 0
+    for name, entry in hosts:
+        stream.write(yaml.dump({name: entry},
+                               Dumper=SafeDumper,
+                               default_flow_style=False))
+        count += 1
+    if count == 0:
+        stream.write("{}\n")
+    return count
+
+
+def write_json(hosts, stream):
+    """
+    writes the hosts as one JSON object, one host at a time. The output
+    is the same as json.dumps(data, indent=4, sort_keys=True) for sorted
+    hosts.
+
+    :param hosts: the names and entries of the hosts
+    :type hosts: iterable of tuples
+    :param stream: the text stream to write to
+    :type stream: file
+    :return: the number of hosts written
+    :rtype: int
+    """
+    count = 0
+    for name, entry in hosts:
+        stream.write("{\n    " if count == 0 else ",\n    ")
+        stream.write(json.dumps(str(name)))
+        stream.write(": ")
+        stream.write(json.dumps(dict(entry), indent=4, sort_keys=True)
+                     .replace("\n", "\n    "))
+        count += 1
+    stream.write("{}\n" if count == 0 else "\n}\n")
+    return count
+
+
+def _cell(value):
+    if value is None:
+        return ""
+    return str(value).replace("\n", " ")
+
+
+def _line(cells, widths):
+    parts = []
+    for cell, width in zip(cells, widths):
+        if len(cell) > width:
+            cell = cell[:max(0, width - 3)] + "..."[:width]
+        parts.append(cell.ljust(width))
+    return "| " + " | ".join(parts) + " |\n"
+
+
+def write_table(hosts, stream, order=None, sample=SAMPLE, max_width=48):
+    """
+    writes the hosts as a table, one row at a time. Only the columns in
+    the order are formatted. The widths of the columns are taken from the
+    first sample rows; longer values in later rows are cut.
+
+    :param hosts: the names and entries of the hosts
+    :type hosts: iterable of tuples
+    :param stream: the text stream to write to
+    :type stream: file
+    :param order: the columns, by default the columns of HostRecord
+    :type order: list
+    :param sample: the number of rows that determine the widths
+    :type sample: int
+    :param max_width: the maximal width of a column
+    :type max_width: int
+    :return: the number of hosts written
+    :rtype: int
+    """
+    order = list(order or columns)
+    rows = ([_cell(entry.get(column)) for column in order]
+            for _, entry in hosts)
+    head = list(itertools.islice(rows, sample))
+    widths = [min(max_width, max([len(column)] + [len(row[i]) for row in head]))
+              for i, column in enumerate(order)]
+    border = "+" + "+".join("-" * (width + 2) for width in widths) + "+\n"
+    stream.write(border)
+    stream.write(_line(order, widths))
+    stream.write(border)
+    count = 0
+    for row in itertools.chain(head, rows):
+        stream.write(_line(row, widths))
+        count += 1
+    stream.write(border)
+    return count
+
+
+def page(hosts, limit=None, offset=0):
+    """
+    returns the hosts from the offset on, at most limit of them
+
+    :param hosts: the names and entries of the hosts
+    :type hosts: iterable of tuples
+    :param limit: the number of hosts, all if None
+    :type limit: int
+    :param offset: the number of hosts to skip
+    :type offset: int
+    :return: the hosts
+    :rtype: iterator of tuples
+    """
+    stop = None if limit is None else (offset or 0) + limit
+    return itertools.islice(hosts, offset or 0, stop)
+
+
+writers = {
+    "yaml": write_yaml,
+    "json": write_json,
+    "table": write_table
+}
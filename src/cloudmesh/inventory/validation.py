@@ -0,0 +1,275 @@
+"""
+Validation of the hosts with the schema in schema/inventory.settings.py.
+
+The schema uses the rules of Cerberus, as it is also the schema of the
+Eve service: type, nullable, required, empty, allowed, regex, schema for
+the items of lists and the fields of dicts, and check_with, where the
+only check is ip. Instead of interpreting the rules for every host, the
+schema is compiled once into the source of a Python function with one
+inlined test per rule, which is cached for the schema file. All
+violations of all hosts are reported in one pass.
+
+    validator = validation.validator()
+    violations = validator.validate(data.items())
+
+Each violation is a dict with the host, the attribute and the message.
+"""
+import os
+import re
+import runpy
+from collections.abc import Mapping
+
+from cloudmesh.inventory.index import address
+
+SCHEMA = os.path.join(os.path.dirname(__file__), "schema",
+                      "inventory.settings.py")
+
+types = {
+    "string": "str",
+    "integer": "int",
+    "float": "float",
+    "number": "(int, float)",
+    "boolean": "bool",
+    "list": "(list, tuple)",
+    "dict": "Mapping",
+}
+
+
+_octet = r"(25[0-5]|2[0-4][0-9]|1[0-9][0-9]|[1-9]?[0-9])"
+_ipv4 = re.compile(r"{:}(\.{:}){{3}}".format(_octet, _octet))
+
+
+# the values that stand for an address that is not fixed
+keywords = ("dhcp",)
+
+
+def check_ip(value):
+    """
+    returns True if the value is empty, a keyword such as dhcp or an ip
+    address
+    """
+    if not isinstance(value, str) or value == "" or value in keywords:
+        return True
+    if _ipv4.fullmatch(value):
+        return True
+    return address(value) is not None
+
+
+checks = {
+    "ip": (check_ip, "is not an ip address")
+}
+
+
+class Compiler(object):
+    """
+    Creates the source of the function that checks the rules of a
+    schema
+    """
+
+    def __init__(self):
+        self.lines = []
+        self.constants = {}
+        self.names = 0
+
+    def name(self, prefix):
+        self.names += 1
+        return "{:}{:}".format(prefix, self.names)
+
+    def constant(self, value):
+        name = self.name("c")
+        self.constants[name] = value
+        return name
+
+    def emit(self, depth, line):
+        self.lines.append("    " * depth + line)
+
+    def error(self, depth, attribute, message, value="value"):
+        self.emit(depth, "errors.append({{'host': host, 'attribute': {:}, "
+                         "'value': {:}, 'message': {!r}}})".format(
+                             attribute, value, message))
+
+    def fields(self, depth, schema, variable, prefix):
+        """
+        emits the tests of the fields of a dict in the variable
+        """
+        get = self.name("get")
+        self.emit(depth, "{:} = {:}.get".format(get, variable))
+        for field, rules in schema.items():
+            value = self.name("v")
+            attribute = repr(field) if prefix is None else \
+                "{:} + {!r}".format(prefix, "." + field)
+            self.emit(depth, "{:} = {:}({!r}, missing)".format(
+                value, get, field))
+            self.emit(depth, "if {:} is not missing:".format(value))
+            self.rules(depth + 1, rules, value, attribute)
+            if rules.get("required"):
+                self.emit(depth, "else:")
+                self.error(depth + 1, attribute, "required field",
+                           value="None")
+
+    def rules(self, depth, rules, value, attribute):
+        """
+        emits the tests of the rules for the value
+        """
+        if rules.get("nullable"):
+            self.emit(depth, "if {:} is None:".format(value))
+            self.emit(depth + 1, "pass")
+        else:
+            self.emit(depth, "if {:} is None:".format(value))
+            self.error(depth + 1, attribute, "null value not allowed", value)
+        kinds = rules.get("type") or []
+        if isinstance(kinds, str):
+            kinds = [kinds]
+        if kinds:
+            test = "not isinstance({:}, ({:},))".format(
+                value, ", ".join(types[kind] for kind in kinds))
+            if "boolean" not in kinds and {"integer", "number"} & set(kinds):
+                # True and False are integers in Python
+                test += " or isinstance({:}, bool)".format(value)
+            self.emit(depth, "elif {:}:".format(test))
+            self.error(depth + 1, attribute,
+                       "must be of {:} type".format(" or ".join(kinds)),
+                       value)
+        if rules.get("empty") is False:
+            self.emit(depth, "elif {:} == '':".format(value))
+            self.error(depth + 1, attribute, "empty values not allowed",
+                       value)
+        if "allowed" in rules:
+            allowed = self.constant(frozenset(rules["allowed"]))
+            self.emit(depth, "elif isinstance({:}, str) and "
+                             "{:} not in {:}:".format(value, value, allowed))
+            self.error(depth + 1, attribute, "unallowed value", value)
+        if "regex" in rules:
+            regex = self.constant(re.compile(rules["regex"]))
+            self.emit(depth, "elif isinstance({:}, str) and "
+                             "not {:}.fullmatch({:}):".format(
+                                 value, regex, value))
+            self.error(depth + 1, attribute,
+                       "value does not match regex '{:}'".format(
+                           rules["regex"]), value)
+        if "check_with" in rules:
+            function, message = checks[rules["check_with"]]
+            check = self.constant(function)
+            self.emit(depth, "elif not {:}({:}):".format(check, value))
+            self.error(depth + 1, attribute, message, value)
+        schema = rules.get("schema")
+        if schema is None:
+            return
+        if "list" in kinds:
+            # the rules of the items of a list
+            item = self.name("i")
+            position = self.name("p")
+            self.emit(depth, "elif isinstance({:}, (list, tuple)):".format(
+                value))
+            self.emit(depth + 1, "for {:}, {:} in enumerate({:}):".format(
+                position, item, value))
+            self.rules(depth + 2, schema, item,
+                       "{:} + '[%d]' % {:}".format(attribute, position))
+        else:
+            self.emit(depth, "elif isinstance({:}, Mapping):".format(value))
+            self.fields(depth + 1, schema, value, attribute)
+
+
+class Validator(object):
+    """
+    The compiled tests of a host schema
+    """
+
+    def __init__(self, resource):
+        """
+        :param resource: the definition of the hosts with the schema and
+                         allow_unknown
+        :type resource: dict
+        """
+        self.schema = resource["schema"]
+        compiler = Compiler()
+        compiler.emit(0, "def validate(host, entry, errors):")
+        compiler.fields(1, self.schema, "entry", None)
+        if not resource.get("allow_unknown"):
+            compiler.emit(1, "for key in entry:")
+            compiler.emit(2, "if key not in known:")
+            compiler.error(3, "key", "unknown field", value="entry[key]")
+        self.source = "\n".join(compiler.lines) + "\n"
+        namespace = dict(compiler.constants, missing=object(),
+                         Mapping=Mapping, known=frozenset(self.schema))
+        exec(compile(self.source, "<schema {:}>".format(SCHEMA), "exec"),
+             namespace)
+        self.entry = namespace["validate"]
+
+    def validate(self, hosts):
+        """
+        returns the violations of all hosts
+
+        :param hosts: the names and the entries of the hosts
+        :type hosts: iterable of tuples
+        :return: the violations with host, attribute, value and message
+        :rtype: list of dict
+        """
+        errors = []
+        entry = self.entry
+        for name, values in hosts:
+            entry(name, values, errors)
+        return errors
+
+    def values(self, host, values):
+        """
+        returns the violations of some of the attributes of a host, for
+        example of the attributes that are set
+
+        :param host: the name of the host
+        :type host: str
+        :param values: the attributes and their values
+        :type values: dict
+        :return: the violations
+        :rtype: list of dict
+        """
+        errors = []
+        self.entry(host, values, errors)
+        return [error for error in errors
+                if error["message"] != "required field"]
+
+
+_cache = {}
+
+
+def validator(filename=SCHEMA, check=False):
+    """
+    returns the validator of the schema file. It is compiled once, so
+    the validation of each set and add does not read the file. With
+    check the modification time of the file is compared and the
+    validator is compiled again if the file was changed.
+
+    :param filename: the file with the host schema
+    :type filename: str
+    :param check: if True a changed file is compiled again
+    :type check: bool
+    :return: the validator
+    :rtype: Validator
+    """
+    cached = _cache.get(filename)
+    if cached is not None and not check:
+        return cached[1]
+    mtime = os.stat(filename).st_mtime_ns
+    if cached is None or cached[0] != mtime:
+        cached = _cache[filename] = (
+            mtime, Validator(runpy.run_path(filename)["host"]))
+    return cached[1]
+
+
+def message(violations, limit=10):
+    """
+    returns the violations as one message, for example for a ValueError
+
+    :param violations: the violations
+    :type violations: list of dict
+    :param limit: the number of violations that are listed
+    :type limit: int
+    :return: the message
+    :rtype: str
+    """
+    lines = ["{:} {:}: {:} ({!r})".format(
+        violation["host"], violation["attribute"], violation["message"],
+        violation["value"]) for violation in violations[:limit]]
+    if len(violations) > limit:
+        lines.append("and {:} more".format(len(violations) - limit))
+    return "\n".join(lines)
@@ -0,0 +1,55 @@
+"""
+A background thread that keeps an inventory current.
+
+The watcher polls the inventory file every interval seconds by comparing
+its inode, modification time and size and the size of its journal, see
+Inventory.refresh. Polling a stat is cheap enough that no platform
+specific notification such as inotify is needed.
+"""
+import threading
+
+from cloudmesh.common.console import Console
+
+
+class Watcher(threading.Thread):
+    """
+    Refreshes an inventory until it is stopped
+
+    Example:
+
+        def changed(inventory, names):
+            print("changed:", sorted(names))
+
+        inventory = Inventory()
+        inventory.watch(changed, interval=2)
+        ...
+        inventory.unwatch()
+    """
+
+    def __init__(self, inventory, interval=1.0):
+        """
+        :param inventory: the inventory
+        :type inventory: Inventory
+        :param interval: the seconds between two polls
+        :type interval: float
+        """
+        super().__init__(name="inventory-watch", daemon=True)
+        self.inventory = inventory
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                self.inventory.refresh()
+            except Exception as e:
+                Console.error("Refreshing {:} failed: {:}".format(
+                    self.inventory.filename, e))
+
+    def stop(self):
+        """
+        stops the thread and waits for it to end
+        """
+        self.stopped.set()
+        if self.is_alive() and self is not threading.current_thread():
+            self.join()
@@ -0,0 +1,106 @@
+###############################################################
+# pytest -v --capture=no  tests/test_import_time.py::Test_import_time.test_inventory
+# pytest -v --capture=no  tests/test_import_time.py
+# pytest -v tests/test_import_time.py
+###############################################################
+
+import os
+import subprocess
+import sys
+
+import pytest
+from cloudmesh.common.util import HEADING
+from cloudmesh.common.util import path_expand
+import cloudmesh.inventory
+from cloudmesh.inventory import storage
+
+# cms loads every plugin on startup. The modules imported by a plugin
+# after cloudmesh.shell.command, which all plugins share, must not
+# include the heavy modules, which are only imported when the command
+# runs.
+heavy = [
+    "yaml",
+    "sqlite3",
+    "cloudmesh.common.util",
+    "cloudmesh.common.Host",
+    "cloudmesh.common.Printer",
+    "cloudmesh.common.Shell",
+    "cloudmesh.common.variables",
+    "cloudmesh.inventory.inventory",
+]
+
+# the modules that cloudmesh.inventory.inventory imports in the methods
+# that use them
+lazy = [
+    "sqlite3",
+    "cloudmesh.inventory.diff",
+    "cloudmesh.inventory.index",
+    "cloudmesh.inventory.journal",
+    "cloudmesh.inventory.metadata",
+    "cloudmesh.inventory.profiles",
+    "cloudmesh.inventory.query",
+    "cloudmesh.inventory.ranges",
+    "cloudmesh.inventory.sorting",
+    "cloudmesh.inventory.storage",
+    "cloudmesh.inventory.streaming",
+    "cloudmesh.inventory.validation",
+    "cloudmesh.inventory.watch",
+]
+
+src = os.path.dirname(os.path.dirname(os.path.dirname(
+    cloudmesh.inventory.__file__)))
+
+
+def imported(code, after="import cloudmesh.shell.command"):
+    """
+    runs the code in a new interpreter after the statement after and
+    returns the names of the modules the code added to sys.modules
+    """
+    environment = dict(os.environ)
+    environment["PYTHONPATH"] = os.pathsep.join(
+        [src] + [path for path in [os.environ.get("PYTHONPATH")] if path])
+    script = "\n".join([
+        "import sys",
+        after,
+        "before = set(sys.modules)",
+        code,
+        "print('\\n'.join(sorted(set(sys.modules) - before)))"])
+    process = subprocess.run(
+        [sys.executable, "-c", script],
+        capture_output=True, text=True, env=environment, check=True)
+    return set(process.stdout.split())
+
+
+@pytest.mark.incremental
+class Test_import_time:
+
+    def check(self, plugin):
+        modules = imported("import " + plugin)
+        assert plugin in modules
+        assert not [name for name in heavy if name in modules]
+
+    def test_inventory(self):
+        HEADING()
+        self.check("cloudmesh.inventory.command.inventory")
+
+    def test_host(self):
+        HEADING()
+        if not os.path.exists(os.path.join(src, "cloudmesh", "host")):
+            pytest.skip("cloudmesh.host is not in the source tree")
+        self.check("cloudmesh.host.command.host")
+
+    def test_lazy(self):
+        HEADING()
+        modules = imported(
+            "import cloudmesh.inventory.inventory", after="pass")
+        assert "cloudmesh.inventory.inventory" in modules
+        assert not [name for name in lazy if name in modules]
+
+        filename = path_expand("~/.cloudmesh/test-import.yaml")
+        modules = imported(
+            "from cloudmesh.inventory.inventory import Inventory\n"
+            "Inventory({!r}).find(service='worker')".format(filename),
+            after="pass")
+        storage.remove(filename)
+        assert "cloudmesh.inventory.storage" in modules
+        assert "sqlite3" not in modules
@@ -4,21 +4,58 @@
 # pytest -v tests/test_inventory.py
 ###############################################################
 
+import io
+import json
+import os
+
 import pytest
 from cloudmesh.common.util import HEADING
 from cloudmesh.common.util import banner
+from cloudmesh.common.util import path_expand
+from cloudmesh.inventory import snapshot
+from cloudmesh.inventory import sorting
+from cloudmesh.inventory import storage
+from cloudmesh.inventory import streaming
+from cloudmesh.inventory.index import AttributeIndex
+from cloudmesh.inventory.index import IPIndex
 from cloudmesh.inventory.inventory import Inventory
+from cloudmesh.inventory.names import NameMatcher
+from cloudmesh.inventory.query import Query
+from cloudmesh.inventory.record import HostRecord
+from cloudmesh.inventory.sorting import natural
+
+filename = path_expand('~/.cloudmesh/test.yaml')
+
+
+def hosts(name):
+    """
+    returns an inventory in its own new file with the hosts that test_add
+    and test_set create
+    """
+    path = path_expand('~/.cloudmesh/test-{:}.yaml'.format(name))
+    storage.remove(path)
+    i = Inventory(path)
+    for j in range(1, 4):
+        i.add(host="red00{:}".format(j), cluster="test_cluster",
+              dns="8.8.8.8", label="test{:}".format(j),
+              ip="10.1.1.{:}".format(j))
+    i.add(host="red00[4-7]", cluster="test_cluster", ip="10.1.1.[4-7]")
+    i.set("red002", "service", "worker")
+    i.save()
+    return i
 
 
 @pytest.mark.incremental
 class Test_inventory:
 
     def setup(self):
-        self.i = Inventory('~/.cloudmesh/test.yaml')
+        self.i = Inventory(filename)
         self.i.info()
 
     def test_add(self):
         HEADING(txt="cms inventory add")
+        storage.remove(filename)
+        self.i = Inventory(filename)
         cluster = "test_cluster"
         label = "test{j}"
         host = "red00{j}"
@@ -74,6 +111,279 @@ class Test_inventory:
         HEADING()
         assert len(self.i.find(host="red002")) > 0
 
+    def test_find_index(self):
+        HEADING()
+        i = hosts("find-index")
+        assert i.index.indexed("service")
+        workers = i.find(service="worker")
+        assert [entry["host"] for entry in workers] == ["red002"]
+
+        i.set("red003", "service", "worker")
+        assert len(json.loads(json.dumps(i.workers()))) == 2
+        assert len(i.find(service="worker", cluster="test_cluster")) == 2
+        assert len(i.find(service="worker", dns="8.8.8.8")) == 2
+
+        i.delete("red003")
+        assert len(i.workers()) == 1
+
+        with pytest.raises(ValueError):
+            i.clone("red008", "red002")
+        i.unset("red002", "ip")
+        i.clone("red008", "red002")
+        assert len(i.workers()) == 2
+        assert len(i.find(service="worker", host="red008")) == 1
+        assert i.find(service="manager") == []
+        storage.remove(i.filename)
+
+    def test_query(self):
+        HEADING()
+        i = hosts("query")
+        found = i.query("service = worker and host ~ red*")
+        assert list(found) == ["red002"]
+        found = i.query("cluster in (test_cluster,blue) "
+                        "and ip in 10.1.1.0/24 and service != worker")
+        assert "red001" in found and "red002" not in found
+        found = i.query("label contains test1 or (host=red002)")
+        assert list(found) == ["red001", "red002"]
+
+        query = Query("service = worker and dns = '8.8.8.8'")
+        assert query.plan(i.index).startswith("index gives 1")
+        assert Query("not service = worker").plan(i.index).startswith(
+            "scan")
+        with pytest.raises(ValueError):
+            Query("service = worker and (")
+        storage.remove(i.filename)
+
+        data = {"a": HostRecord(host="a", status=True, tag=1.5),
+                "b": HostRecord(host="b", status=False, tag=1),
+                "c": HostRecord(host="c", status="true", tag="1.50"),
+                "d": HostRecord(host="d", status=None, tag=["x", "y"]),
+                "e": HostRecord(host="e", status="None", tag="x")}
+        index = AttributeIndex()
+        index.build(data)
+        for expression in ["status = true", "status in (false)",
+                           "tag = 1.5", "tag = 1", "tag = 1.50",
+                           "status = None", "tag = \"['x', 'y']\"",
+                           "tag in (x, 1)"]:
+            query = Query(expression)
+            assert query.plan(index).startswith("index")
+            assert query.select(data, index) == query.select(data)
+        assert [name for name, _ in Query("status = true").select(
+            data, index)] == ["a", "c"]
+
+    def test_ip_index(self):
+        HEADING()
+        assert self.i.owner("10.1.1.2") == {"red002"}
+        addresses = self.i.index.addresses
+        assert addresses.range("10.1.1.3", "10.1.1.5") == \
+            {"red003", "red004", "red005"}
+        assert addresses.network("10.1.1.0/30") == {"red001", "red002", "red003"}
+
+        with pytest.raises(ValueError):
+            self.i.add(host="red009", ip="10.1.1.2")
+        with pytest.raises(ValueError):
+            self.i.set("red003", "ip", "10.1.1.1")
+        assert not self.i.has_host("red009")
+
+        self.i.set("red003", "ip", "10.2.0.1")
+        assert self.i.owner("10.1.1.3") == set()
+        assert addresses.network("10.2.0.0/16") == {"red003"}
+        with pytest.raises(ValueError):
+            self.i.clone("red009", "red003")
+        assert addresses.duplicates() == {}
+        other = IPIndex()
+        other.insert_many([("a", "::5"), ("b", "::5"), ("c", "10.2.0.1")])
+        other.insert("d", "10.2.0.1")
+        assert other.duplicates() == {"::5": {"a", "b"},
+                                      "10.2.0.1": {"c", "d"}}
+        assert other.range("::1", "::5") == {"a", "b"}
+        assert Query("ip in 10.2.0.0/16").plan(self.i.index).startswith(
+            "index gives 1")
+
+    def test_add_many(self):
+        HEADING()
+        count = self.i.add_many(columns={"host": "green[01-50]",
+                                         "ip": "10.3.0.[1-50]",
+                                         "tag": ["t{:}".format(j)
+                                                 for j in range(50)]},
+                                service="worker", cluster="green")
+        assert count == 50
+        assert self.i.get("green50", "ip") == "10.3.0.50"
+        assert self.i.get("green02", "tag") == "t1"
+        assert len(self.i.find(cluster="green")) == 50
+        assert self.i.owner("10.3.0.7") == {"green07"}
+
+        self.i.add_many([{"host": "green01", "service": "manager"}])
+        assert self.i.get("green01", "service") == "manager"
+        assert self.i.get("green01", "ip") == "10.3.0.1"
+        with pytest.raises(ValueError):
+            self.i.add_many(columns={"host": "green[51-52]", "ip": ["10.3.0.51"]})
+        with pytest.raises(ValueError):
+            self.i.add_many([{"host": "green51", "ip": "10.3.0.2"}])
+        assert not self.i.has_host("green51")
+
+    def test_names(self):
+        HEADING()
+        matcher = NameMatcher("red[001-005,007],green[01-10]")
+        assert matcher.count == 16
+        assert "red007" in matcher and "green10" in matcher
+        assert "red7" not in matcher and "red006" not in matcher
+        assert list(matcher.expand())[:2] == ["red001", "red002"]
+        assert matcher.select(self.i.data) == ["red001", "red002", "red003",
+                                               "red004", "red005", "red007"]
+        assert NameMatcher("red[001-999]").select(self.i.data)[0] == "red001"
+
+    def test_batch(self):
+        HEADING()
+        filename = path_expand('~/.cloudmesh/test-batch.yaml')
+        storage.remove(filename)
+        batch = Inventory(filename)
+        with batch.batch():
+            batch.add(host="blue[01-20]", service="worker")
+            batch.set("blue01", "service", "manager")
+            batch.save()
+            assert not Inventory(filename).has_host("blue01")
+        i = Inventory(filename)
+        assert i.get("blue01", "service") == "manager"
+        assert len(i.find(service="worker", host="blue20")) == 1
+
+        with pytest.raises(ValueError):
+            with batch.batch():
+                batch.set("blue02", "service", "manager")
+                batch.delete("blue01")
+                raise ValueError("abort")
+        assert Inventory(filename).has_host("blue01")
+        # the changes of the aborted batch are not saved later
+        assert batch.has_host("blue01")
+        batch.set("blue03", "status", "active")
+        batch.save()
+        i = Inventory(filename)
+        assert i.has_host("blue01")
+        assert i.get("blue02", "service") == "worker"
+        assert i.get("blue03", "status") == "active"
+        assert not [name for name in os.listdir(os.path.dirname(filename))
+                    if name.endswith(".tmp")]
+        storage.remove(filename)
+
+    def test_record(self):
+        HEADING()
+        entry = self.i.data["red002"]
+        assert isinstance(entry, HostRecord)
+        assert not hasattr(entry, "__dict__")
+        assert entry == dict(entry)
+        assert entry["label"] == "test2"
+        assert "label" in entry and "status" not in entry
+        assert list(entry)[:2] == ["host", "tag"]
+        assert "label: test2" in self.i.list(format="yaml")
+
+    def test_snapshot(self):
+        HEADING()
+        filename = self.i.filename
+        assert os.path.exists(snapshot.sidecar(filename))
+        i = Inventory(filename)
+        assert i.data == self.i.data
+        assert i.timing["source"] == "snapshot"
+
+        # the hosts are written to the file and not to the journal
+        i.compact()
+        with open(filename, "a") as stream:
+            stream.write("green:\n  host: green\n")
+        i = Inventory(filename)
+        assert "green" in i.data
+        assert i.timing["source"] == "yaml"
+        i = Inventory(filename)
+        assert "green" in i.data
+        assert i.timing["source"] == "snapshot"
+        i.delete("green")
+        i.save()
+        # the journal keeps the load times of the file
+        assert i.storage.metadata()["timing"]["parse"] is not None
+        i.info(measure=True)
+
+    def test_lazy(self):
+        HEADING()
+        filename = self.i.filename
+        i = Inventory(filename)
+        assert i.has_host("red002")
+        assert not i.has_host("green")
+        meta = i.metadata()
+        assert meta["hosts"] == len(self.i.data)
+        assert meta["clusters"] == ["test_cluster"]
+        i.info()
+        assert i._data is None
+
+    def test_stream(self):
+        HEADING()
+        filename = self.i.filename
+        Inventory(filename).compact()
+        i = Inventory(filename)
+        hosts = dict(i.iter_hosts())
+        assert i._data is None
+        assert hosts == dict(self.i.data)
+        with open(filename) as stream:
+            assert stream.readline().startswith("# cloudmesh inventory version:")
+            assert stream.read() == snapshot.dump(self.i._dict())
+
+        export = os.path.expanduser("~/.cloudmesh/test-export.json")
+        i.save(filename=export, format="json")
+        with open(export) as stream:
+            assert json.load(stream) == json.loads(i.list(format="json"))
+        os.remove(export)
+
+        output = io.StringIO()
+        assert i.write(output, format="json") == len(hosts)
+        empty = io.StringIO()
+        assert streaming.write_yaml([], empty) == 0
+        assert empty.getvalue() == "{}\n"
+
+    def test_sort(self):
+        HEADING()
+        assert sorted(["red10", "10.1.1.10", "", "red2", "10.1.1.9", "32"],
+                      key=natural) == \
+            ["32", "10.1.1.9", "10.1.1.10", "red2", "red10", ""]
+        data = {}
+        for j in range(1, 13):
+            data["blue{:}".format(j)] = HostRecord(
+                host="blue{:}".format(j),
+                ip={5: None, 7: "32", 8: "dhcp"}.get(
+                    j, "10.2.0.{:}".format(20 - j)),
+                service="worker" if j % 3 else "manager")
+        index = AttributeIndex()
+        index.build(data)
+        for columns in [["ip"], ["service", "ip"], ["host"]]:
+            expected = sorting.top(data.items(), columns)
+            assert sorting.top(data.items(), columns, limit=4) == expected[:4]
+            for limit in [None, 1, 4]:
+                found = sorting.indexed(data, index, columns, limit=limit)
+                assert found is None or found == expected[:limit]
+        names = [name for name, _ in sorting.top(data.items(), ["ip"])]
+        assert names[:2] == ["blue7", "blue12"]
+        assert names[-3:] == ["blue1", "blue8", "blue5"]
+
+        i = Inventory(self.i.filename)
+        workers = i.sort("service,host", limit=2,
+                         match=lambda name, entry: name.startswith("red"))
+        assert [name for name, _ in workers] == ["red002", "red001"]
+
+    def test_table(self):
+        HEADING()
+        offset = sorted(self.i.data).index("red002")
+        i = Inventory(self.i.filename)
+        output = io.StringIO()
+        assert i.write(output, format="table", order=["host", "cluster"],
+                       limit=2, offset=offset) == 2
+        lines = output.getvalue().splitlines()
+        assert lines[1] == "| host   | cluster      |"
+        assert lines[3] == "| red002 | test_cluster |"
+        assert lines[4] == "| red003 | test_cluster |"
+        assert len(lines) == 6
+        assert i._data is None
+
+        output = io.StringIO()
+        hosts = [("a", {"host": "a"}), ("b", {"host": "b" * 10})]
+        streaming.write_table(hosts, output, order=["host"], sample=1)
+        assert output.getvalue().splitlines()[4] == "| b... |"
+
 
 """
 # We need nostest for this
@@ -0,0 +1,37 @@
+###############################################################
+# pytest -v --capture=no  tests/test_inventory_benchmark.py::Test_inventory_benchmark.test_run
+# pytest -v --capture=no  tests/test_inventory_benchmark.py
+# pytest -v tests/test_inventory_benchmark.py
+###############################################################
+
+import json
+
+import pytest
+from cloudmesh.common.util import HEADING
+from cloudmesh.inventory import benchmark
+
+
+@pytest.mark.incremental
+class Test_inventory_benchmark:
+
+    def test_ips(self):
+        HEADING()
+        assert benchmark.ips(3) == "10.0.0.[1-3]"
+        assert benchmark.ips(300) == "10.0.0.[1-255],10.0.1.[0-44]"
+
+    def test_run(self, tmp_path, capsys):
+        HEADING()
+        results = benchmark.run(sizes=[100], memory=False,
+                                directory=str(tmp_path), verbose=False)
+        operations = [result["operation"] for result in results["results"]]
+        assert operations[:3] == ["add", "save", "add compressed"]
+        assert "list table" in operations and "info" in operations
+        assert all(result["hosts"] == 100 and result["time"] > 0
+                   for result in results["results"])
+        results = json.loads(json.dumps(results))
+
+        benchmark.compare(results, results)
+        lines = [line for line in capsys.readouterr().out.splitlines()
+                 if line.endswith("x")]
+        assert len(lines) == len(operations)
+        assert all(line.endswith(" 1.00x") for line in lines)
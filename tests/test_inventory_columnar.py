@@ -0,0 +1,62 @@
+###############################################################
+# pytest -v --capture=no  tests/test_inventory_columnar.py::Test_inventory_columnar.test_convert
+# pytest -v --capture=no  tests/test_inventory_columnar.py
+# pytest -v tests/test_inventory_columnar.py
+###############################################################
+
+import pytest
+from cloudmesh.common.util import HEADING
+from cloudmesh.common.util import path_expand
+from cloudmesh.inventory.inventory import Inventory
+
+source = path_expand('~/.cloudmesh/test-columnar.yaml')
+filename = path_expand('~/.cloudmesh/test-columnar.columnar')
+
+
+@pytest.mark.incremental
+class Test_inventory_columnar:
+
+    def test_convert(self):
+        HEADING()
+        i = Inventory(source)
+        with i.batch():
+            i.add(host="red", service="manager", ip="10.1.1.1")
+            i.add(host="red[001-100]", service="worker", cluster="red",
+                  ip="10.1.1.[2-101]")
+            i.set("red001", "services", ["kubernetes", "bridge"])
+            i.set("red002", "temperature", 32)
+        i = Inventory.convert(source, filename)
+        assert i.storage.kind == "columnar"
+        assert len(i.data) == 101
+
+    def test_read(self):
+        HEADING()
+        i = Inventory(filename)
+        assert i.has_host("red050")
+        assert not i.has_host("red101")
+        assert i.get("red001", "services") == ["kubernetes", "bridge"]
+        assert i.get("red002", "temperature") == 32
+        assert "temperature" not in i.data["red003"]
+        assert i.data["red003"]["ip"] == "10.1.1.4"
+        assert list(i.data)[:2] == ["red", "red001"]
+
+    def test_find(self):
+        HEADING()
+        i = Inventory(filename)
+        assert len(i.workers()) == 100
+        assert i.manager()["host"] == "red"
+        assert [e["host"] for e in i.find(service="worker", ip="10.1.1.51")] \
+            == ["red050"]
+        assert i.find(service="worker", cluster="blue") == []
+
+    def test_list(self):
+        HEADING()
+        i = Inventory(filename)
+        t = str(i.list("table", order=["host", "ip", "services"]))
+        assert "red100" in t
+        assert "kubernetes" in t
+        hosts = list(i.iter_hosts())
+        assert [name for name, _ in hosts] == list(i.data)
+        assert hosts[1][1]["services"] == ["kubernetes", "bridge"]
+        with pytest.raises(TypeError):
+            i.set("red001", "service", "manager")
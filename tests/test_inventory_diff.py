@@ -0,0 +1,86 @@
+###############################################################
+# pytest -v --capture=no  tests/test_inventory_diff.py::Test_inventory_diff.test_diff
+# pytest -v --capture=no  tests/test_inventory_diff.py
+# pytest -v tests/test_inventory_diff.py
+###############################################################
+
+import os
+import shutil
+
+import pytest
+from cloudmesh.common.util import HEADING
+from cloudmesh.common.util import path_expand
+from cloudmesh.inventory import diff
+from cloudmesh.inventory import storage
+from cloudmesh.inventory.inventory import Inventory
+
+base = path_expand('~/.cloudmesh/test-base.yaml')
+ours = path_expand('~/.cloudmesh/test-ours.yaml')
+theirs = path_expand('~/.cloudmesh/test-theirs.yaml')
+
+
+def copy(source, destination):
+    # the hosts in the journal are not copied with the file
+    Inventory(source).compact()
+    storage.remove(destination)
+    shutil.copyfile(source, destination)
+    return Inventory(destination)
+
+
+@pytest.mark.incremental
+class Test_inventory_diff:
+
+    def test_diff(self):
+        HEADING()
+        storage.remove(base)
+        i = Inventory(base)
+        i.add_many(columns={"host": "red[01-10]"}, service="worker")
+        i.set("red01", "comment", "first")
+        i.compact()
+
+        i = copy(base, theirs)
+        assert not diff.diff(Inventory(base), i)
+        assert os.path.exists(diff.sidecar(base))
+
+        i.set("red02", "status", "active")
+        i.unset("red01", "comment")
+        i.delete("red03")
+        i.add(host="red11", service="worker")
+        i.save()
+        changes = diff.diff(Inventory(base), Inventory(theirs))
+        assert changes.changed == {"red02": {"status": "active"}}
+        assert changes.unset == {"red01": ["comment"]}
+        assert changes.removed == ["red03"]
+        assert list(changes.added) == ["red11"]
+
+        i = Inventory(base)
+        changes.apply(i)
+        assert not diff.diff(Inventory(base), Inventory(theirs))
+
+    def test_merge(self):
+        HEADING()
+        i = copy(theirs, ours)
+        i.set("red02", "status", "down")
+        i.set("red04", "status", "active")
+        i.delete("red05")
+        i.save()
+        i = Inventory(theirs)
+        i.set("red04", "comment", "rack 2")
+        i.set("red05", "status", "active")
+        i.set("red06", "status", "active")
+        i.save()
+
+        changes, conflicts = diff.merge(
+            Inventory(base), Inventory(ours), Inventory(theirs))
+        assert changes.changed == {"red04": {"comment": "rack 2"},
+                                   "red06": {"status": "active"}}
+        assert conflicts == [{"host": "red05", "attribute": None,
+                              "ours": "removed", "theirs": "changed"}]
+        i = Inventory(ours)
+        changes.apply(i)
+        i = Inventory(ours)
+        assert i.get("red04", "status") == "active"
+        assert i.get("red04", "comment") == "rack 2"
+        assert not i.has_host("red05")
+        for filename in [base, ours, theirs]:
+            storage.remove(filename)
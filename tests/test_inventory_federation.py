@@ -0,0 +1,69 @@
+###############################################################
+# pytest -v --capture=no  tests/test_inventory_federation.py::Test_inventory_federation.test_where
+# pytest -v --capture=no  tests/test_inventory_federation.py
+# pytest -v tests/test_inventory_federation.py
+###############################################################
+
+import os
+
+import pytest
+from cloudmesh.common.util import HEADING
+from cloudmesh.common.util import path_expand
+from cloudmesh.inventory.federation import Federation
+from cloudmesh.inventory.inventory import Inventory
+
+directory = path_expand('~/.cloudmesh/test-federation')
+
+
+def inventory(name):
+    return Inventory(os.path.join(directory, name))
+
+
+@pytest.mark.incremental
+class Test_inventory_federation:
+
+    def test_where(self):
+        HEADING()
+        os.makedirs(directory, exist_ok=True)
+        for filename in os.listdir(directory):
+            os.remove(os.path.join(directory, filename))
+        i = inventory("inventory.yaml")
+        i.add(host="red[01-03]", service="worker")
+        i.save()
+        i = inventory("inventory-red.yaml")
+        i.add(host="red", service="manager")
+        i.save()
+        i = inventory("inventory-blue.yaml")
+        i.add(host="blue,red03", service="manager")
+        i.save()
+        inventory("other.yaml")
+
+        federation = Federation(directory)
+        assert [os.path.basename(filename)
+                for filename in federation.files()] == [
+            "inventory-blue.yaml", "inventory-red.yaml", "inventory.yaml"]
+        found = federation.where("red,red03,green")
+        assert {name: [os.path.basename(filename) for filename in files]
+                for name, files in found.items()} == {
+            "red": ["inventory-red.yaml"],
+            "red03": ["inventory-blue.yaml", "inventory.yaml"]}
+        assert os.path.exists(federation.filename)
+
+        i = inventory("inventory-red.yaml")
+        i.add(host="red04", service="worker")
+        i.save()
+        assert "red04" in Federation(directory).where("red04")
+
+    def test_hosts(self):
+        HEADING()
+        federation = Federation(directory)
+        found = federation.hosts(where="service=manager")
+        assert sorted((os.path.basename(filename), name)
+                      for filename, name, _ in found) == [
+            ("inventory-blue.yaml", "blue"),
+            ("inventory-blue.yaml", "red03"),
+            ("inventory-red.yaml", "red")]
+        found = federation.hosts(names="red0[1-2]")
+        assert [name for _, name, _ in found] == ["red01", "red02"]
+        with pytest.raises(ValueError):
+            federation.hosts(where="service=")
@@ -0,0 +1,101 @@
+###############################################################
+# pytest -v --capture=no  tests/test_inventory_journal.py::Test_inventory_journal.test_append
+# pytest -v --capture=no  tests/test_inventory_journal.py
+# pytest -v tests/test_inventory_journal.py
+###############################################################
+
+import os
+import time
+
+import pytest
+from cloudmesh.common.util import HEADING
+from cloudmesh.common.util import path_expand
+from cloudmesh.inventory import journal
+from cloudmesh.inventory import storage
+from cloudmesh.inventory.inventory import Inventory
+
+filename = path_expand('~/.cloudmesh/test-journal.yaml')
+
+
+@pytest.mark.incremental
+class Test_inventory_journal:
+
+    def test_append(self):
+        HEADING()
+        storage.remove(filename)
+        i = Inventory(filename)
+        i.add(host="red[01-10]", service="worker")
+        i.compact()
+        assert not os.path.exists(journal.sidecar(filename))
+        version = storage.version(filename)
+        with open(filename) as stream:
+            content = stream.read()
+
+        i.set("red01", "status", "active")
+        i.delete("red02")
+        i.save()
+        with open(filename) as stream:
+            assert stream.read() == content
+        assert journal.size(filename) > 0
+        assert journal.last_version(filename) == version + 1
+
+        i = Inventory(filename)
+        assert i.get("red01", "status") == "active"
+        assert not i.has_host("red02")
+        assert i.metadata()["hosts"] == 9
+
+    def test_compact(self):
+        HEADING()
+        i = Inventory(filename)
+        i.storage.journal_limit = journal.size(filename)
+        i.set("red03", "status", "active")
+        i.save()
+        assert not os.path.exists(journal.sidecar(filename))
+        assert storage.version(filename) == 4
+
+        i = Inventory(filename)
+        assert i.get("red01", "status") == "active"
+        assert i.get("red03", "status") == "active"
+        assert not i.has_host("red02")
+        i.set("red04", "status", "active")
+        i.save()
+        i.compact()
+        assert not os.path.exists(journal.sidecar(filename))
+        assert Inventory(filename).get("red04", "status") == "active"
+        storage.remove(filename)
+
+    def test_refresh(self):
+        HEADING()
+        storage.remove(filename)
+        reader = Inventory(filename)
+        reader.add(host="red[01-03]", service="worker")
+        reader.compact()
+        assert len(reader.find(service="worker")) == 3
+
+        writer = Inventory(filename)
+        writer.set("red01", "service", "manager")
+        writer.delete("red02")
+        writer.save()
+        assert reader.refresh() == {"red01", "red02"}
+        assert reader.get("red01", "service") == "manager"
+        assert len(reader.find(service="worker")) == 1
+
+        seen = []
+        reader.watch(lambda inventory, names: seen.append(names),
+                     interval=0.05)
+        with reader.batch():
+            # the watcher waits until the batch has ended
+            writer.set("red03", "status", "active")
+            writer.compact()
+            time.sleep(0.3)
+            assert seen == []
+            assert "status" not in reader.data["red03"]
+        for _ in range(100):
+            if seen:
+                break
+            time.sleep(0.05)
+        reader.unwatch()
+        assert seen == [{"red03"}]
+        assert reader.get("red03", "status") == "active"
+        assert reader.refresh() == set()
+        storage.remove(filename)
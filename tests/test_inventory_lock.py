@@ -0,0 +1,92 @@
+###############################################################
+# pytest -v --capture=no  tests/test_inventory_lock.py::Test_inventory_lock.test_merge
+# pytest -v --capture=no  tests/test_inventory_lock.py
+# pytest -v tests/test_inventory_lock.py
+###############################################################
+
+import time
+from multiprocessing import Pool
+
+import pytest
+from cloudmesh.common.util import HEADING
+from cloudmesh.common.util import banner
+from cloudmesh.common.util import path_expand
+from cloudmesh.inventory import journal
+from cloudmesh.inventory import storage
+from cloudmesh.inventory.inventory import Inventory
+
+filename = path_expand('~/.cloudmesh/test-lock.yaml')
+
+writers = 4
+updates = 25
+
+
+def write(number):
+    for j in range(updates):
+        i = Inventory(filename)
+        i.set("red{:02d}".format(j), "writer{:}".format(number), j)
+        i.save()
+    return updates
+
+
+@pytest.mark.incremental
+class Test_inventory_lock:
+
+    def test_merge(self):
+        HEADING()
+        storage.remove(filename)
+        i = Inventory(filename)
+        i.add(host="red[00-{:02d}]".format(updates - 1), service="worker")
+        i.save()
+        assert journal.last_version(filename) == 2
+
+        a = Inventory(filename)
+        b = Inventory(filename)
+        a.set("red01", "status", "active")
+        b.set("red02", "status", "active")
+        b.delete("red03")
+        a.save()
+        b.save()
+        assert journal.last_version(filename) == 4
+
+        i = Inventory(filename)
+        assert i.get("red01", "status") == "active"
+        assert i.get("red02", "status") == "active"
+        assert not i.has_host("red03")
+        i.add(host="red03", service="worker")
+        i.save()
+
+        # a change that conflicts with another writer is not lost when
+        # the file is written completely
+        a = Inventory(filename)
+        b = Inventory(filename)
+        a.set("red04", "ip", "10.0.0.4")
+        a.set("red05", "status", "active")
+        b.set("red06", "ip", "10.0.0.4")
+        b.save()
+        with pytest.raises(ValueError, match="already used by red06"):
+            a.compact()
+        assert a.get("red05", "status") == "active"
+        assert "status" not in Inventory(filename).data["red05"]
+        b.unset("red06", "ip")
+        b.save()
+        a.compact()
+        i = Inventory(filename)
+        assert i.get("red04", "ip") == "10.0.0.4"
+        assert i.get("red05", "status") == "active"
+
+    def test_stress(self):
+        HEADING()
+        start = time.perf_counter()
+        with Pool(writers) as pool:
+            total = sum(pool.map(write, range(writers)))
+        elapsed = time.perf_counter() - start
+        banner("{:} writers, {:} updates in {:.2f}s, {:.0f} updates/s".format(
+            writers, total, elapsed, total / elapsed))
+
+        i = Inventory(filename)
+        for number in range(writers):
+            for j in range(updates):
+                assert i.get("red{:02d}".format(j),
+                             "writer{:}".format(number)) == j
+        storage.remove(filename)
@@ -0,0 +1,69 @@
+###############################################################
+# pytest -v --capture=no  tests/test_inventory_profile.py::Test_inventory_profile.test_phases
+# pytest -v --capture=no  tests/test_inventory_profile.py
+# pytest -v tests/test_inventory_profile.py
+###############################################################
+
+import json
+import threading
+
+import pytest
+from cloudmesh.common.util import HEADING
+from cloudmesh.common.util import path_expand
+from cloudmesh.inventory import storage
+from cloudmesh.inventory.inventory import Inventory
+from cloudmesh.inventory.profiling import profile
+from cloudmesh.inventory.profiling import session
+
+filename = path_expand('~/.cloudmesh/test-profile.yaml')
+
+
+@pytest.mark.incremental
+class Test_inventory_profile:
+
+    def test_phases(self):
+        HEADING()
+        storage.remove(filename)
+        i = Inventory(filename)
+        with session(enabled=True):
+            with profile.phase("command"):
+                i.add(host="red[01-10]", ip="10.0.0.[1-10]", service="worker")
+                i.save()
+                i = Inventory(filename)
+                assert len(i.find(service="worker")) == 10
+            # a refresh in the thread of watch is not recorded
+            thread = threading.Thread(
+                target=lambda: Inventory(filename).find(service="worker"))
+            thread.start()
+            thread.join()
+            report = profile.report()
+        assert not profile.enabled
+        timers = report["timers"]
+        assert list(timers)[:3] == ["command", "command/add",
+                                    "command/add/expand"]
+        assert timers["command/save/journal"]["calls"] == 1
+        assert timers["command/find/read"]["calls"] == 1
+        assert report["counters"]["hosts added"] == 10
+        assert report["counters"]["hosts found"] == 10
+
+    def test_output(self, tmp_path, capsys):
+        HEADING()
+        profile.start()
+        Inventory(filename).list(format="table")
+        profile.stop()
+        summary = capsys.readouterr().err
+        assert "list" in summary and "format" in summary
+
+        trace = str(tmp_path / "trace.json")
+        profile.start(trace)
+        Inventory(filename).read()
+        profile.stop()
+        with open(trace) as stream:
+            assert json.load(stream)["counters"]["hosts read"] == 10
+
+        trace = str(tmp_path / "trace.prof")
+        profile.start(trace)
+        Inventory(filename).read()
+        profile.stop()
+        assert (tmp_path / "trace.prof").exists()
+        storage.remove(filename)
@@ -0,0 +1,65 @@
+###############################################################
+# pytest -v --capture=no  tests/test_inventory_profiles.py::Test_inventory_profiles.test_clone
+# pytest -v --capture=no  tests/test_inventory_profiles.py
+# pytest -v tests/test_inventory_profiles.py
+###############################################################
+
+import os
+
+import pytest
+from cloudmesh.common.util import HEADING
+from cloudmesh.common.util import path_expand
+from cloudmesh.inventory import storage
+from cloudmesh.inventory.inventory import Inventory
+
+filename = path_expand('~/.cloudmesh/test-profiles.yaml')
+
+
+@pytest.mark.incremental
+class Test_inventory_profiles:
+
+    def test_clone(self):
+        HEADING()
+        if os.path.exists(filename):
+            os.remove(filename)
+        i = Inventory(filename)
+        with i.batch():
+            i.define("worker-default", service="worker", cluster="red")
+            for number in range(1, 101):
+                i.clone("red{:03}".format(number), "worker-default")
+            i.set("red002", "service", "manager")
+        i.compact()
+        assert i.get("red001", "cluster") == "red"
+        assert i.data.hosts["red001"] == {"host": "red001",
+                                          "profile": "worker-default"}
+        with open(filename) as stream:
+            assert len(stream.read().splitlines()) < 400
+
+    def test_define(self):
+        HEADING()
+        i = Inventory(filename)
+        assert len(i.find(service="worker")) == 99
+        i.define("worker-default", os="ubuntu")
+        i.save()
+        assert os.path.getsize(filename + ".journal") < 1000
+
+        i = Inventory(filename)
+        assert i.get("red050", "os") == "ubuntu"
+        assert i.get("red002", "service") == "manager"
+        assert len(i.query("os=ubuntu")) == 100
+        assert [entry["os"] for _, entry in i.iter_hosts()] == \
+            ["ubuntu"] * 100
+        with pytest.raises(ValueError):
+            i.define("worker-default", router="not an ip")
+
+    def test_unset(self):
+        HEADING()
+        i = Inventory(filename)
+        i.unset("red003", "os")
+        i.compact()
+
+        i = Inventory(filename)
+        assert "profile" not in i.data["red003"]
+        assert i.get("red003", "service") == "worker"
+        assert i.list(format="table")
+        storage.remove(filename)
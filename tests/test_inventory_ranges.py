@@ -0,0 +1,70 @@
+###############################################################
+# pytest -v --capture=no  tests/test_inventory_ranges.py::Test_inventory_ranges.test_add
+# pytest -v --capture=no  tests/test_inventory_ranges.py
+# pytest -v tests/test_inventory_ranges.py
+###############################################################
+
+import os
+
+import pytest
+from cloudmesh.common.util import HEADING
+from cloudmesh.common.util import path_expand
+from cloudmesh.inventory import storage
+from cloudmesh.inventory.inventory import Inventory
+from cloudmesh.inventory.ranges import RangeData
+
+filename = path_expand('~/.cloudmesh/test-ranges.yaml')
+
+
+@pytest.mark.incremental
+class Test_inventory_ranges:
+
+    def test_add(self):
+        HEADING()
+        if os.path.exists(filename):
+            os.remove(filename)
+        i = Inventory(filename)
+        with i.batch():
+            i.add(host="red", service="manager", ip="10.1.0.1")
+            i.add(host="red[0001-1000]", service="worker", cluster="red",
+                  ip="10.1.0.[2-255],10.1.1.[0-255],10.1.2.[0-255],"
+                     "10.1.3.[0-233]",
+                  compress=True)
+        assert isinstance(i.data, RangeData)
+        assert len(i.data) == 1001
+        assert i.data["red0255"]["ip"] == "10.1.1.0"
+        assert i.owner("10.1.3.233") == {"red1000"}
+        with open(filename) as stream:
+            assert len(stream.read().splitlines()) < 60
+
+    def test_update(self):
+        HEADING()
+        i = Inventory(filename)
+        assert i.get("red0500", "service") == "worker"
+        i.set("red0500", "status", "active")
+        i.delete("red0501")
+        with pytest.raises(ValueError):
+            i.clone("blue", "red0502")
+        i.add(host="blue", service="worker", ip="10.1.1.246")
+        i.save()
+
+        i = Inventory(filename)
+        assert i.get("red0500", "status") == "active"
+        assert not i.has_host("red0501")
+        assert i.get("blue", "ip") == "10.1.1.246"
+        assert i.data.groups[0].overrides == {"red0500": {"status": "active"}}
+        assert len(i.find(service="worker")) == 1000
+        assert [name for name, _ in i.iter_hosts()] == \
+            [name for name, _ in Inventory(filename).iter_hosts()]
+        assert len(list(Inventory(filename).iter_hosts())) == 1001
+
+    def test_collapse(self):
+        HEADING()
+        i = Inventory(filename)
+        rows = i.list(format="dict", order=["host", "ip", "service"],
+                      collapse=True)
+        assert rows["red[0001-0500]"]["ip"] == "10.1.0.2-10.1.1.245"
+        assert rows["red[0502-1000]"]["service"] == "worker"
+        assert rows["blue"]["ip"] == "10.1.1.246"
+        assert i.list(format="table", collapse=True)
+        storage.remove(filename)
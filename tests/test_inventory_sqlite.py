@@ -0,0 +1,105 @@
+###############################################################
+# pytest -v --capture=no  tests/test_inventory_sqlite.py::Test_inventory_sqlite.test_add
+# pytest -v --capture=no  tests/test_inventory_sqlite.py
+# pytest -v tests/test_inventory_sqlite.py
+###############################################################
+
+import os
+
+import pytest
+from cloudmesh.common.util import HEADING
+from cloudmesh.common.util import path_expand
+from cloudmesh.inventory import storage
+from cloudmesh.inventory.inventory import Inventory
+
+filename = path_expand('~/.cloudmesh/test-sqlite.db')
+
+
+@pytest.mark.incremental
+class Test_inventory_sqlite:
+
+    def setup(self):
+        self.i = Inventory(filename)
+
+    def test_add(self):
+        HEADING()
+        assert self.i.storage.kind == "sqlite"
+        with self.i.batch():
+            self.i.add(host="red", service="manager", ip="10.1.1.1")
+            self.i.add(host="red0[1-4]", service="worker",
+                       ip="10.1.1.[2-5]", cluster="red")
+            self.i.set("red01", "services", ["kubernetes"])
+        i = Inventory(filename)
+        assert len(i.data) == 5
+        assert i.get("red02", "ip") == "10.1.1.3"
+        assert i.get("red01", "services") == ["kubernetes"]
+        assert i.get("red01", "comment") == ""
+
+    def test_find(self):
+        HEADING()
+        assert len(self.i.workers()) == 4
+        assert self.i.manager()["host"] == "red"
+        assert len(self.i.find(service="worker", cluster="red")) == 4
+        assert len(self.i.find(service="worker", ip="10.1.1.3")) == 1
+        assert self.i.find(service="worker", cluster="blue") == []
+
+    def test_set_delete(self):
+        HEADING()
+        with self.i.batch():
+            self.i.set("red04", "status", "active")
+            self.i.set("red04", "temperature", 32)
+            self.i.delete("red03")
+        i = Inventory(filename)
+        assert i.get("red04", "status") == "active"
+        assert i.get("red04", "temperature") == 32
+        assert not i.has_host("red03")
+
+        with pytest.raises(ValueError):
+            with i.batch():
+                i.delete("red04")
+                raise ValueError("abort")
+        assert Inventory(filename).has_host("red04")
+
+    def test_convert(self):
+        HEADING()
+        yaml_file = path_expand('~/.cloudmesh/test-sqlite.yaml')
+        i = Inventory.convert(filename, yaml_file)
+        assert i.storage.kind == "yaml"
+        assert i.get("red04", "temperature") == 32
+        assert len(i.data) == 4
+
+        back = filename + ".back.db"
+        i = Inventory.convert(yaml_file, back)
+        assert len(i.find(service="worker")) == 3
+        i.storage.connection.close()
+        for name in [back, yaml_file]:
+            os.remove(name)
+
+    def test_list(self):
+        HEADING()
+        t = str(self.i.list("table"))
+        assert "red04" in t
+        assert "red04" in self.i.list("yaml")
+
+    def test_fresh(self):
+        HEADING()
+        fresh = path_expand('~/.cloudmesh/test-sqlite-fresh.db')
+        storage.remove(fresh)
+        i = Inventory(fresh)
+        i.add(host="red[1-3]", service="worker")
+        i.save()
+        assert len(i.find(service="worker")) == 3
+        i.delete("red1")
+        i.save()
+        i.storage.connection.close()
+        i = Inventory(fresh)
+        assert sorted(i.data) == ["red2", "red3"]
+
+        # hosts that are not in replaced data are removed on save
+        i.data = {"red2": dict(i.data["red2"])}
+        i.save()
+        i.storage.connection.close()
+        i = Inventory(fresh)
+        assert sorted(i.data) == ["red2"]
+        i.storage.connection.close()
+        storage.remove(fresh)
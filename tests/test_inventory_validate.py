@@ -0,0 +1,71 @@
+###############################################################
+# pytest -v --capture=no  tests/test_inventory_validate.py::Test_inventory_validate.test_validate
+# pytest -v --capture=no  tests/test_inventory_validate.py
+# pytest -v tests/test_inventory_validate.py
+###############################################################
+
+import pytest
+from cloudmesh.common.util import HEADING
+from cloudmesh.common.util import path_expand
+from cloudmesh.inventory import storage
+from cloudmesh.inventory import validation
+from cloudmesh.inventory.inventory import Inventory
+
+filename = path_expand('~/.cloudmesh/test-validate.yaml')
+
+
+@pytest.mark.incremental
+class Test_inventory_validate:
+
+    def test_validator(self):
+        HEADING()
+        validator = validation.validator()
+        assert validator is validation.validator()
+        assert validator is validation.validator(check=True)
+        violations = validator.validate([
+            ("red01", {"host": "red01", "ip": "10.0.0.1", "dns": ["8.8.8.8"],
+                       "services": ["bridge"], "temperature": 32}),
+            ("red02", {"host": "red02", "ip": "10.0.0.300", "owners": [1],
+                       "services": 5, "router": None}),
+            ("red03", {"ip": {"public": "x", "private": "10.0.0.3"}}),
+        ])
+        assert [(v["host"], v["attribute"], v["message"])
+                for v in violations] == [
+            ("red02", "services", "must be of list or string type"),
+            ("red02", "ip", "is not an ip address"),
+            ("red02", "owners[0]", "must be of string type"),
+            ("red03", "host", "required field"),
+            ("red03", "ip.public", "is not an ip address"),
+        ]
+
+    def test_ip(self):
+        HEADING()
+        validator = validation.validator()
+        accepted = ["10.0.0.1", "fe80::1", "", None, "dhcp",
+                    {"public": "10.0.0.1", "private": "fe80::1"}]
+        rejected = ["10.0.0.256", "not an ip", {"public": "dhcp4"}]
+        for ip in accepted:
+            assert validator.values("red01", {"ip": ip}) == []
+        for ip in rejected:
+            assert validator.values("red01", {"ip": ip}) != []
+
+    def test_validate(self):
+        HEADING()
+        storage.remove(filename)
+        i = Inventory(filename)
+        i.add(host="red[01-10]", ip="10.0.0.[1-10]", service="worker")
+        with pytest.raises(ValueError, match="red01 router"):
+            i.set("red01", "router", "10.0.0.300")
+        with pytest.raises(ValueError, match=r"red\[11-12\] cluster"):
+            i.add(host="red[11-12]", cluster=["red"])
+        with pytest.raises(ValueError, match="red12 ip"):
+            i.add(host="red[11-12]", ip="10.0.0.[255-256]", compress=True)
+        assert len(i.data) == 10
+        i.set("red10", "ip", "dhcp")
+        i.save()
+
+        i = Inventory(filename)
+        assert i.validate() == []
+        i.data["red05"]["comment"] = 5
+        assert [v["host"] for v in i.validate()] == ["red05"]
+        storage.remove(filename)